@@ -0,0 +1,213 @@
+# end to end benchmark of the commands against a local mock schedula (see mockSchedula.py), no network needed
+#
+# Starts the mock in its own process, then runs pullAll, pullP, pullN, push, pullAll again (with the cache and saved
+# session of the first run) and export of every season through schedulaMain.main, each in a new process as the workbook runs them. Reports
+# the wall time, requests, requests per second, bytes received and peak memory of each command.
+#
+# The results can be saved and later runs compared against them. A command that makes more requests than the saved
+# run, or takes longer by more than the tolerance, is reported as a regression and the exit code is 1.
+#
+# Usage: python benchE2E.py [options]
+#   --orgs, --seasons, --weeks, --fixtures, --people   size of the mock's data (see mockSchedula.py)
+#   --latency     time taken by each mock response in ms (default 20)
+#   -j            number of concurrent requests (default the tool's default)
+#   --push        number of fixtures to push (default 40)
+#   --save        file to save the results in
+#   --compare     file of saved results to compare against
+#   --tolerance   allowed increase in wall time when comparing, in percent (default 20)
+
+import os
+import sys
+import csv
+import json
+import time
+import getopt
+import tempfile
+import subprocess
+import urllib.request
+from datetime import date
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORY, '..'))
+
+import mockSchedula
+
+USER = 'bench@example.com'
+PASSWORD = 'bench'
+
+################################################################################
+#########################            CHILD             #########################
+################################################################################
+# runs one command against the mock in this process and prints its wall time and peak memory as json
+#
+# argv          - [base url, working directory, command options...]
+def child(argv):
+    url, directory = argv[:2]
+    args = argv[2:]
+
+    # never go through a proxy to the mock
+    os.environ['NO_PROXY'] = '127.0.0.1'
+
+    # the cache, rules and saved session files are kept next to the tool, keep them in the working directory
+    sys.argv = [os.path.join(directory, 'schedulaMain.py')] + args
+
+    start = time.perf_counter()
+    import schedulaInterface
+    schedulaInterface.SCHEDULA_BASE_URL = url
+    import schedulaMain
+
+    # answer yes to push and enter to its exit prompt
+    stdout = sys.stdout
+    sys.stdin = open(os.devnull if 'push' not in args else writeAnswers(directory), mode='r')
+    sys.stdout = open(os.devnull, mode='w')
+    try:
+        schedulaMain.main(args + ['-u', USER, '-p', PASSWORD])
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    wall = time.perf_counter() - start
+
+    print(json.dumps({'wall':wall, 'peakKB':peakMemoryKB()}))
+
+def writeAnswers(directory):
+    filename = os.path.join(directory, 'answers.txt')
+    with open(filename, mode='w') as file:
+        file.write('yes\n\n')
+    return filename
+
+# peak resident memory of this process in KB, None where the resource module is not available
+def peakMemoryKB():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on mac, KB elsewhere
+    if sys.platform == 'darwin':
+        peak = peak // 1024
+    return peak
+
+################################################################################
+#########################             RUN              #########################
+################################################################################
+# returns the mock's request and byte counters
+def mockStats(url):
+    with urllib.request.urlopen(url + '/__stats') as r:
+        return json.loads(r.read().decode('utf-8'))
+
+# runs a command in a new process, returns its results
+def runCommand(name, url, directory, args):
+    before = mockStats(url)
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', url, directory] + args, cwd=directory)
+    result = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+    after = mockStats(url)
+
+    result['command'] = name
+    result['requests'] = after['requests'] - before['requests']
+    result['bytes'] = after['bytes'] - before['bytes']
+    return result
+
+# writes a push file changing the referee and first assistant of some of the pulled fixtures
+def writePushFile(fixturesFile, peopleFile, pushFile, count):
+    with open(fixturesFile, mode='r', newline='') as file:
+        fixtures = [row for row in csv.DictReader(file) if row['Status'] == 'ok']
+    with open(peopleFile, mode='r', newline='') as file:
+        people = [row['name'] for row in csv.DictReader(file)]
+
+    with open(pushFile, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['FixtureID', 'R', 'AR1', 'AR2', 'M', 'A', '4'])
+        for i, f in enumerate(fixtures[::3][:count]):
+            writer.writerow([f['FixtureID'], people[(2*i) % len(people)], people[(2*i + 1) % len(people)], '', '', '', ''])
+
+def printResults(results):
+    print('%-18s %9s %9s %9s %11s %11s' % ('command', 'wall s', 'requests', 'req/s', 'KB recv', 'peak MB'))
+    for r in results:
+        peak = '-' if r['peakKB'] is None else '%.1f' % (r['peakKB'] / 1024)
+        print('%-18s %9.2f %9d %9.1f %11.1f %11s' % (r['command'], r['wall'], r['requests'], r['requests'] / r['wall'], r['bytes'] / 1024, peak))
+
+# returns a line for each command that got worse than the saved results
+def regressions(results, saved, tolerance):
+    found = []
+    savedByCommand = dict((r['command'], r) for r in saved)
+    for r in results:
+        s = savedByCommand.get(r['command'])
+        if s is None:
+            continue
+        if r['requests'] > s['requests']:
+            found.append(r['command'] + ': ' + str(r['requests']) + ' requests, was ' + str(s['requests']))
+        if r['wall'] > s['wall'] * (1 + tolerance / 100):
+            found.append(r['command'] + ': %.2f s, was %.2f s' % (r['wall'], s['wall']))
+    return found
+
+def main(argv):
+    if argv[:1] == ['--child']:
+        child(argv[1:])
+        return
+
+    sizes = {'orgs':3, 'seasons':2, 'weeks':20, 'fixtures':12, 'people':80}
+    latency = 20
+    workers = []
+    pushCount = 40
+    saveFile = ''
+    compareFile = ''
+    tolerance = 20.0
+
+    opts, args = getopt.gnu_getopt(argv, 'j:', ['latency=', 'push=', 'save=', 'compare=', 'tolerance='] + [k + '=' for k in sizes])
+    for opt, arg in opts:
+        if opt == '-j':
+            workers = ['-j', arg]
+        elif opt == '--latency':
+            latency = float(arg)
+        elif opt == '--push':
+            pushCount = int(arg)
+        elif opt == '--save':
+            saveFile = arg
+        elif opt == '--compare':
+            compareFile = arg
+        elif opt == '--tolerance':
+            tolerance = float(arg)
+        else:
+            sizes[opt[2:]] = int(arg)
+
+    # the newest season and a date two weeks into it for pullN, and the range of every season for export
+    mock = mockSchedula.MockSchedula(**sizes)
+    seasonID, year = mock.seasons[mock.organisations[0][0]][0]
+    allSeasons = mock.seasons[mock.organisations[0][0]][-1][1] + '-' + year
+    startDate = mock.weeks(seasonID)[min(2, sizes['weeks'] - 1)][0].split('_')[0]
+
+    server = subprocess.Popen([sys.executable, os.path.join(DIRECTORY, 'mockSchedula.py'), '--latency', str(latency)] + sum([['--' + k, str(sizes[k])] for k in sizes], []), stdout=subprocess.PIPE)
+    try:
+        url = server.stdout.readline().decode('utf-8').strip()
+        print('Mock schedula at ' + url + ', ' + ', '.join(k + ' ' + str(sizes[k]) for k in sizes) + ', latency ' + str(latency) + ' ms')
+
+        with tempfile.TemporaryDirectory() as directory:
+            results = []
+            results.append(runCommand('pullAll', url, directory, ['pullAll', '-f', 'all.csv'] + workers))
+            results.append(runCommand('pullP', url, directory, ['pullP', '-o', 'people.csv'] + workers))
+            results.append(runCommand('pullN', url, directory, ['pullN', '-f', 'n.csv', '-s', year, '-N', startDate, '-n', '28'] + workers))
+            writePushFile(os.path.join(directory, 'all.csv'), os.path.join(directory, 'people.csv'), os.path.join(directory, 'push.csv'), pushCount)
+            results.append(runCommand('push', url, directory, ['push', '-f', 'all.csv', '-i', 'push.csv', '-o', 'people.csv'] + workers))
+            results.append(runCommand('pullAll (warm)', url, directory, ['pullAll', '-f', 'all2.csv'] + workers))
+            results.append(runCommand('export', url, directory, ['export', '-s', allSeasons, '-f', 'season'] + workers))
+    finally:
+        server.terminate()
+        server.wait()
+
+    printResults(results)
+
+    if saveFile != '':
+        with open(saveFile, mode='w') as file:
+            json.dump(results, file, indent=1)
+
+    if compareFile != '':
+        with open(compareFile, mode='r') as file:
+            found = regressions(results, json.load(file), tolerance)
+        for line in found:
+            print('Regression: ' + line)
+        if found:
+            sys.exit(1)
+        print('No regressions against ' + compareFile)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,129 @@
+# benchmark for joining fixtures to their appointments
+#
+# Compares the original nested loop joins of writeToCsv and push (a scan of every appointment or stored row for each
+# fixture) with schedulaInterface.FixtureIndex, and times writeToCsv end to end, at increasing numbers of fixtures.
+# The time per fixture of the indexed join should stay flat as the number of fixtures grows.
+#
+# Usage: python benchJoin.py [-n sizes] [-l largest]
+#   -n   comma separated numbers of fixtures (default 1000,2500,5000,10000,20000)
+#   -l   largest number of fixtures to run the original joins on, they are quadratic (default 10000)
+
+import os
+import sys
+import io
+import getopt
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schedulaInterface as schedula
+import schedulaMain
+
+ROLES = ['Referee', 'Assistant Referee 1', 'Assistant Referee 2', 'Referee Mentor']
+
+################################################################################
+#########################            JOINS             #########################
+################################################################################
+# the appointments of each fixture as writeToCsv used to find them
+def legacyJoin(fixtures, appointments):
+    joined = []
+    for fix in fixtures:
+        fixAppoints = []
+        for a in appointments:
+            if a[0] == fix[12]:
+                fixAppoints.append(a)
+        joined.append(fixAppoints)
+    return joined
+
+def indexJoin(fixtures, appointments):
+    index = schedula.FixtureIndex(appointments=appointments)
+    return [index.appointmentsFor(fix[12]) for fix in fixtures]
+
+# the stored row of each pushed fixture as push used to find it
+def legacyLookup(rows, fixtureIDs):
+    found = []
+    for fixtureID in fixtureIDs:
+        storedFixture = {}
+        for s in rows:
+            if s['FixtureID'] == fixtureID:
+                storedFixture = s
+                break
+        found.append(storedFixture)
+    return found
+
+def indexLookup(rows, fixtureIDs):
+    index = schedula.FixtureIndex(rows, getFixtureID=lambda s: s['FixtureID'])
+    return [index.fixture(fixtureID, {}) for fixtureID in fixtureIDs]
+
+################################################################################
+#########################             DATA             #########################
+################################################################################
+# n fixtures with 0 to 3 appointments each, appointments are listed in a different order to the fixtures
+def sampleData(n):
+    fixtures = []
+    appointments = []
+    for i in range(n):
+        fixID = str(1000000 + i)
+        fixtures.append(['664', 'AHJSA', '3033', '2020', 'week' + str(i // 50), 'Week', 'Premier League', 'Sat Feb ' + str(1 + i % 28), '6:00 PM', 'Home' + str(i), 'Away' + str(i), 'Ground', fixID])
+        for r in range(i % 4):
+            appointments.append([fixID, 'Official ' + str((i + r) % 300), str(5000 + r), ROLES[r], str(11 + r), 'green'])
+    appointments.reverse()
+
+    rows = [{'FixtureID':f[12], 'Status':'ok'} for f in fixtures]
+    pushed = [f[12] for f in fixtures[::-1]]
+
+    return fixtures, appointments, rows, pushed
+
+# returns the time taken by fn in seconds
+def timeIt(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+# writeToCsv to a temporary file without its output
+def writeCsv(fixtures, appointments):
+    handle, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            schedulaMain.writeToCsv(fixtures, appointments, filename)
+    finally:
+        os.remove(filename)
+
+################################################################################
+#########################             MAIN             #########################
+################################################################################
+def main(argv):
+    sizes = [1000, 2500, 5000, 10000, 20000]
+    largest = 10000
+
+    opts, args = getopt.gnu_getopt(argv, 'n:l:')
+    for opt, arg in opts:
+        if opt == '-n':
+            sizes = [int(n) for n in arg.split(',')]
+        elif opt == '-l':
+            largest = int(arg)
+
+    print('%9s %13s %13s %13s %13s %13s %s' % ('fixtures', 'join before', 'join after', 'push before', 'push after', 'writeToCsv', '(us per fixture)'))
+    for n in sizes:
+        fixtures, appointments, rows, pushed = sampleData(n)
+
+        joinAfter, joined = timeIt(indexJoin, fixtures, appointments)
+        pushAfter, found = timeIt(indexLookup, rows, pushed)
+        csvTime, _ = timeIt(writeCsv, fixtures, appointments)
+
+        joinBefore = '-'
+        pushBefore = '-'
+        if n <= largest:
+            t, legacyJoined = timeIt(legacyJoin, fixtures, appointments)
+            joinBefore = '%.1f' % (t * 1e6 / n)
+            t, legacyFound = timeIt(legacyLookup, rows, pushed)
+            pushBefore = '%.1f' % (t * 1e6 / n)
+            if (joined != legacyJoined) or (found != legacyFound):
+                raise Exception('Indexed join differs from the original at ' + str(n) + ' fixtures')
+
+        print('%9d %13s %13.2f %13s %13.2f %13.1f' % (n, joinBefore, joinAfter * 1e6 / n, pushBefore, pushAfter * 1e6 / n, csvTime * 1e6 / n))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
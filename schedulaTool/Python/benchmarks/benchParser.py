@@ -0,0 +1,332 @@
+# benchmark for the schedula response parsers
+#
+# Compares the parsers in schedulaParser.py with the original split based parsers they replaced, checks both give the
+# same results and reports the parse throughput in pages/s for each kind of page.
+#
+# Usage: python benchParser.py [-d directory] [-t seconds]
+#   -d   directory of recorded pages, files are named <kind>*.html where kind is one of organisations, seasons, weeks,
+#        fixtures, match or referees. Synthetic pages are used if not given.
+#   -t   time to spend on each parser (default 1 second)
+
+import os
+import sys
+import getopt
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schedulaParser as parser
+
+################################################################################
+#########################       ORIGINAL PARSERS       #########################
+################################################################################
+# The parsers as they were in schedulaInterface.py before schedulaParser.py, working on the response text
+def legacyOrganisations(text):
+    text = text.split('<form name="search_fixture">')
+    text = text[1]
+    text = text.split('<')
+    organisations = []
+    for i in range(len(text)):
+        if text[i].startswith('option'):
+            try:
+                t = text[i]
+                orgNum = t.split('"')[1]
+                orgName = (t.split('>')[1]).split('<')[0]
+                org = [orgNum, orgName]
+                if orgNum != "":
+                    organisations.append(org)
+            except:
+                pass
+        elif text[i].startswith('/select'):
+            break
+    return organisations
+
+def legacySeasons(text):
+    text = text.split('</option>')
+    seasons = []
+    for i in range(len(text)):
+        if i==0:
+            pass
+        else:
+            if ']]' in text[i]:
+                break
+            seasonID = text[i].split('"')[1]
+            seasonName = text[i].split('>')[1]
+            seasons.append([seasonID, seasonName])
+    return seasons
+
+def legacyWeeks(text):
+    text = text.split('<')
+    weeks = []
+    for i in range(len(text)):
+        if text[i].startswith('option'):
+            try:
+                t = text[i]
+                weekID = t.split('"')[1]
+                weekName = (t.split('>')[1])
+                weeks.append([weekID, weekName])
+            except:
+                pass
+        elif text[i].startswith('/select'):
+            break
+    return weeks
+
+def legacyFixtures(text):
+    text = text.split('<')
+    fixtures = []
+    fixture = ['compName', 'date', 'time', 'home', 'away', 'ground', 'fixID']
+    for i in range(len(text)):
+        row = text[i]
+        if row.startswith('/table>'):
+            break
+        elif row.startswith('th colspan='):
+            fixture[0] = row.split('>')[1]
+            fixture[1] = ''
+            fixture[2] = ''
+            fixture[3] = ''
+            fixture[4] = ''
+            fixture[5] = ''
+            fixture[6] = ''
+        elif row.startswith('td'):
+            try:
+                rowData = row.split('>')[1]
+                if rowData != 'v':
+                    if rowData != '&nbsp;':
+                        if fixture[1] == '':
+                            fixture[1] = rowData
+                        elif fixture[2] == '':
+                            fixture[2] = rowData
+                        elif fixture[3] == '':
+                            fixture[3] = rowData
+                        elif fixture[4] == '':
+                            fixture[4] = rowData
+                        elif fixture[5] == '':
+                            fixture[5] = rowData
+            except:
+                pass
+        elif row.startswith('u style='):
+            fixture[6] = (row.split('fixtureid=')[1]).split('&')[0]
+            fixtures.append(list(fixture))
+            fixture[1] = ''
+            fixture[2] = ''
+            fixture[3] = ''
+            fixture[4] = ''
+            fixture[5] = ''
+            fixture[6] = ''
+    return fixtures
+
+def legacyAppointments(text, fixtureID='1'):
+    text = text.split('<')
+    tableStart = False
+    appointments = []
+    appointment = ["","","","",""]
+    for t in text:
+        if t.startswith('/table'):
+            break
+        if tableStart:
+            if t.startswith('tr'):
+                appointment = ["","","","",""]
+            if appointment[0] != "" and appointment[1] != "" and appointment[2] != ""and appointment[3] != ""and appointment[4] != "":
+                output = appointment.copy()
+                output.insert(0,fixtureID)
+                appointments.append(output.copy())
+                appointment = ["","","","",""]
+            if t.startswith('td>'):
+                try:
+                    data = t.split('>')[1]
+                    if appointment[0] == '':
+                        appointment[0] = data
+                except:
+                    pass
+            elif t.startswith('option value='):
+                try:
+                    if t.split(' ')[2].startswith('selected'):
+                        appointment[2] = t.split('>')[1]
+                        appointment[3] = t.split('"')[1]
+                except:
+                    pass
+            elif t.startswith('select'):
+                appointment[1] = t.split('xajax_AppointUmpire(')[1].split(',')[0]
+            elif t.startswith('img src'):
+                try:
+                    appointment[4] = t.split('/')[4].split('_')[0]
+                except:
+                    appointment[4] = '?'
+        if t.startswith('table'):
+            tableStart = True
+    return appointments
+
+def legacyOptions(text, formName):
+    pant = text.split('<form name="' + formName + '">')[1]
+    pant = pant.split('<option')
+    options = []
+    for t in pant:
+        try:
+            value = t.split('alue="')[1].split('"')[0]
+            string = t.split('>')[1].split('<')[0]
+            options.append([value, string])
+        except:
+            pass
+        if '</select>' in t:
+            break
+    return options
+
+def legacyMatch(text):
+    return [legacyOptions(text, 'panels_form'), legacyOptions(text, 'appointment_type_form'), legacyAppointments(text)]
+
+def legacyReferees(text):
+    refT = text.split('<td>')
+    referees = []
+    table2 = False
+    for t in refT:
+        if table2:
+            if ('value="Removed"' in t) or ('<img src' in t):
+                pass
+            else:
+                n = t.split('</td')
+                if len(n) == 2:
+                    name = n[0]
+                else:
+                    appointID = t.split('AppointUmpire(')[1].split(',')[0]
+                    for r in referees:
+                        if r[0] == name:
+                            r[1] = appointID
+                            appointID = ''
+                            personID = ''
+                            name = ''
+                            break
+        else:
+            try:
+                name = t.split('<b>')[1].split('</b>')[0]
+                appointID = t.split('AppointUmpire(')[1].split(',')[0]
+            except:
+                try:
+                    personID = t.split('personid=')[1].split('&')[0]
+                    referees.append([name, appointID, personID])
+                    appointID = ''
+                    personID = ''
+                    name = ''
+                except:
+                    pass
+            if '<![CDATA[S<table>' in t:
+                table2 = True
+    return referees
+
+def newMatch(text):
+    return [parser.parseOptions(text, 'panels_form'), parser.parseOptions(text, 'appointment_type_form'), parser.parseAppointments(text, '1')]
+
+# kind -> [original parser, new parser]
+PARSERS = {
+    'organisations':[legacyOrganisations, parser.parseOrganisations],
+    'seasons':[legacySeasons, parser.parseSeasons],
+    'weeks':[legacyWeeks, parser.parseSeasonWeeks],
+    'fixtures':[legacyFixtures, parser.parseFixtures],
+    'match':[legacyMatch, newMatch],
+    'referees':[legacyReferees, parser.parseReferees],
+}
+
+################################################################################
+#########################        SAMPLE PAGES          #########################
+################################################################################
+# page furniture so the samples are about the size of the real pages
+HEADER = '<html><head><script type="text/javascript">var xajaxRequestUri="index.php";</script></head><body>' + ''.join('<div class="menu"><a href="index.php?action=item' + str(i) + '">Menu item ' + str(i) + '</a></div>' for i in range(150))
+FOOTER = '<div class="footer">' + ''.join('<span>footer ' + str(i) + '</span>' for i in range(50)) + '</div></body></html>'
+ROLES = [['11', 'Referee'], ['12', 'Assistant Referee 1'], ['13', 'Assistant Referee 2'], ['14', 'Referee Mentor'], ['15', 'Referee Assessor'], ['16', '4th Official']]
+
+def sampleOrganisations():
+    options = '<option value=""></option>' + ''.join('<option value="' + str(100 + i) + '">ORG' + str(i) + '</option>' for i in range(10))
+    return HEADER + '<form name="search_fixture"><table><tr><td><select name="orgs" id="orgs" class="input_select" onchange="xajax_GetSeasons(document.search_fixture.orgs.value,\'AppointByWeek\')">' + options + '</select></td></tr></table></form>' + FOOTER
+
+def sampleSeasons():
+    options = ''.join('<option value="' + str(3000 + i) + '">' + str(2020 - i) + '</option>' for i in range(8))
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="season_div" p="innerHTML"><![CDATA[<select name="season" id="season" onchange="xajax_GetSeasonWeeks(document.search_fixture.season.value,\'AppointByWeek\')"><option value=""></option>' + options + '</select>]]></cmd></xjx>'
+
+def sampleWeeks():
+    options = ''.join('<option value="2020-01-' + str(i) + '_2020-01-' + str(i + 6) + '">Week ' + str(i) + ' (Jan ' + str(i) + ' to Jan ' + str(i + 6) + ')</option>' for i in range(1, 35))
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="week_div" p="innerHTML"><![CDATA[<input type="button" onclick="xajax_ShowFixturesForWeek(3070,document.search_fixture.week.value)"><select id="week" name="week">' + options + '</select>]]></cmd></xjx>'
+
+def sampleFixtures():
+    body = '<table class="listTable">'
+    for c in range(12):
+        body = body + '<tr><th colspan="7">Competition ' + str(c) + '</th></tr>'
+        for f in range(8):
+            fid = str(40000000 + c * 100 + f)
+            body = body + '<tr><td class="date">Sat Jun 27</td><td>6:00 PM</td><td>Home Team ' + str(f) + '</td><td>v</td><td>Away Team ' + str(f) + '</td><td>Ground ' + str(f) + '</td><td>&nbsp;</td><td><a href="#"><u style="cursor:pointer" onclick="window.open(\'index.php?action=admin/appointments/appoint_match&fixtureid=' + fid + '&skeleton=true\')">Appoint</u></a></td></tr>'
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="fixtures" p="innerHTML"><![CDATA[' + body + '</table>]]></cmd></xjx>'
+
+def sampleMatch():
+    rows = ''
+    for i in range(6):
+        options = ''.join('<option value="' + r[0] + '"' + (' selected="selected"' if j == i else '') + '>' + r[1] + '</option>' for j, r in enumerate(ROLES))
+        rows = rows + '<tr><td>NAME' + str(i) + ', Official</td><td><select onchange="xajax_AppointUmpire(' + str(500 + i) + ',this.value,41743941,false)">' + options + '</select></td><td><img src="/images/icons/status/green_tick.png"></td></tr>'
+    panels = '<form name="panels_form"><select name="panel"><option value="1">Referee (built-in)</option><option value="2">Juniors</option><option value="3">Seniors</option></select></form>'
+    types = '<form name="appointment_type_form"><select name="type">' + ''.join('<option value="' + r[0] + '">' + r[1] + '</option>' for r in ROLES) + '</select></form>'
+    return HEADER + '<table class="appointments">' + rows + '</table>' + panels + types + FOOTER
+
+def sampleReferees():
+    table1 = ''.join('<tr><td><b>NAME' + str(i) + ', Official</b> <input type="button" onclick="xajax_AppointUmpire(' + str(500 + i) + ',1,41743941,false)"></td><td><a href="index.php?action=person&personid=' + str(1000 + i) + '&x=1">info</a></td></tr>' for i in range(200))
+    table2 = '<tr><td>NAME3, Official</td><td><select onchange="xajax_AppointUmpire(777,this.value,41743941,false)"></select></td></tr>'
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="refs" p="innerHTML"><![CDATA[<table>' + table1 + '</table>]]></cmd><cmd n="as" t="appointed" p="innerHTML"><![CDATA[S<table>' + table2 + '</table>]]></cmd></xjx>'
+
+SAMPLES = {
+    'organisations':sampleOrganisations,
+    'seasons':sampleSeasons,
+    'weeks':sampleWeeks,
+    'fixtures':sampleFixtures,
+    'match':sampleMatch,
+    'referees':sampleReferees,
+}
+
+################################################################################
+#########################          BENCHMARK           #########################
+################################################################################
+# returns {kind:[page text]} from the recorded pages in the directory, or the synthetic samples
+def loadPages(directory):
+    pages = {}
+    if directory == '':
+        for kind in SAMPLES:
+            pages[kind] = [SAMPLES[kind]()]
+        return pages
+
+    for name in sorted(os.listdir(directory)):
+        for kind in PARSERS:
+            if name.startswith(kind) and name.endswith('.html'):
+                with open(os.path.join(directory, name), mode='r', encoding='utf-8') as file:
+                    pages.setdefault(kind, []).append(file.read())
+    return pages
+
+# returns the number of pages parsed per second
+def throughput(parse, pages, seconds):
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while elapsed < seconds:
+        for p in pages:
+            parse(p)
+        count = count + len(pages)
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+def main(argv):
+    directory = ''
+    seconds = 1.0
+    opts, args = getopt.gnu_getopt(argv, 'd:t:')
+    for opt, arg in opts:
+        if opt == '-d':
+            directory = arg
+        elif opt == '-t':
+            seconds = float(arg)
+
+    pages = loadPages(directory)
+
+    print('%-14s %6s %12s %12s %8s %s' % ('kind', 'pages', 'before pg/s', 'after pg/s', 'speedup', 'same result'))
+    for kind in PARSERS:
+        if kind not in pages:
+            continue
+        legacy, new = PARSERS[kind]
+        same = all(legacy(p) == new(p) for p in pages[kind])
+        before = throughput(legacy, pages[kind], seconds)
+        after = throughput(new, pages[kind], seconds)
+        print('%-14s %6d %12.0f %12.0f %7.1fx %s' % (kind, len(pages[kind]), before, after, after / before, same))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,116 @@
+# benchmark for the memory used by pulled fixtures and appointments
+#
+# Parses the fixture tables and appoint match pages of the mock schedula (see mockSchedula.py), as a pull does, and
+# keeps the results as the lists the library used to return and as schedulaInterface.Fixture and Appointment records.
+# Reports the memory held by each and the time taken to build them and write them with writeToCsv.
+#
+# Usage: python benchRecords.py [-s seasons] [-w weeks] [-f fixtures]
+#   -s   number of seasons, each of 3 organisations (default 4)
+#   -w   number of weeks per season (default 26)
+#   -f   number of fixtures per week (default 40)
+
+import os
+import sys
+import io
+import gc
+import getopt
+import time
+import tempfile
+import contextlib
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import schedulaInterface as schedula
+import schedulaParser as parser
+import schedulaMain
+import mockSchedula
+
+################################################################################
+#########################             DATA             #########################
+################################################################################
+# the responses of a pull - [[week row, fixture table]], {fixtureID:match page}
+def responses(mock):
+    weeks = []
+    pages = {}
+    for org in mock.organisations:
+        for seasonID, year in mock.seasons[org[0]]:
+            for weekID, weekName in mock.weeks(seasonID):
+                weeks.append([[org[0], org[1], seasonID, year, weekID, weekName], mock.fixtureTable(seasonID, weekID)])
+                for f in mock.fixtures(seasonID, weekID):
+                    pages[f[6]] = mock.matchPage(f[6])
+    return weeks, pages
+
+# fixtures and appointments as lists, as crawl and lookupFixture used to return them
+def buildLists(weeks, pages):
+    fixtures = []
+    appointments = []
+    for row, table in weeks:
+        for f in parser.parseFixtures(table):
+            fixtures.append(row + f)
+    for f in fixtures:
+        appointments.extend(parser.parseAppointments(pages[f[12]], f[12]))
+    return fixtures, appointments
+
+# fixtures and appointments as records, as crawl and lookupFixture return them
+def buildRecords(weeks, pages):
+    fixtures = []
+    appointments = []
+    for row, table in weeks:
+        for f in parser.parseFixtures(table):
+            fixtures.append(schedula.Fixture(*row, *f))
+    for f in fixtures:
+        appointments.extend(schedula.Appointment(*a) for a in parser.parseAppointments(pages[f[12]], f[12]))
+    return fixtures, appointments
+
+# returns the memory held by the result of build, the time taken and the result
+def measure(build, weeks, pages):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(weeks, pages)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, seconds, result
+
+# returns the time taken by writeToCsv
+def timeWrite(fixtures, appointments):
+    handle, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(handle)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            schedulaMain.writeToCsv(fixtures, appointments, filename)
+        return time.perf_counter() - start
+    finally:
+        os.remove(filename)
+
+################################################################################
+#########################             MAIN             #########################
+################################################################################
+def main(argv):
+    seasons = 4
+    weeks = 26
+    fixtures = 40
+
+    opts, args = getopt.gnu_getopt(argv, 's:w:f:')
+    for opt, arg in opts:
+        if opt == '-s':
+            seasons = int(arg)
+        elif opt == '-w':
+            weeks = int(arg)
+        elif opt == '-f':
+            fixtures = int(arg)
+
+    mock = mockSchedula.MockSchedula(orgs=3, seasons=seasons, weeks=weeks, fixtures=fixtures)
+    weekTables, pages = responses(mock)
+
+    print('%10s %10s %12s %12s %12s %12s' % ('model', 'fixtures', 'appointments', 'held MB', 'build s', 'write s'))
+    for name, build in [['lists', buildLists], ['records', buildRecords]]:
+        held, seconds, (f, a) = measure(build, weekTables, pages)
+        print('%10s %10d %12d %12.1f %12.2f %12.2f' % (name, len(f), len(a), held / 1024 / 1024, seconds, timeWrite(f, a)))
+        del f, a
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+# benchmark for the start up time of the command line tool
+#
+# Each case is run in a new python process, as the workbook does for each action. "offline" only imports
+# schedulaMain, as help, plan and push --dry-run do. "online" also creates a session, loading the HTTP stack as the
+# commands that connect to schedula do. "eager" imports requests first, as schedulaMain used to on every run.
+#
+# Usage: python benchStartup.py [-r runs]
+#   -r   number of runs of each case, the median is reported (default 20)
+
+import os
+import sys
+import getopt
+import time
+import subprocess
+
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CASES = [
+    ['offline', 'import schedulaMain'],
+    ['online', 'import schedulaMain; schedulaMain.schedula.newSession()'],
+    ['eager', 'import requests; import schedulaMain'],
+]
+
+CHECK = "; import sys; print('requests' in sys.modules)"
+
+################################################################################
+#########################             MAIN             #########################
+################################################################################
+# returns the wall time of a new python process running code, and its output
+def timeRun(code):
+    start = time.perf_counter()
+    out = subprocess.check_output([sys.executable, '-c', code], cwd=DIRECTORY)
+    return time.perf_counter() - start, out.decode().strip()
+
+def main(argv):
+    runs = 20
+
+    opts, args = getopt.gnu_getopt(argv, 'r:')
+    for opt, arg in opts:
+        if opt == '-r':
+            runs = int(arg)
+
+    # python itself, taken off each case
+    times = sorted(timeRun('pass')[0] for i in range(runs))
+    interpreter = times[len(times) // 2]
+    print('python start up %.1f ms (not included below)' % (interpreter * 1000))
+
+    print('%9s %12s %12s %s' % ('case', 'median ms', 'min ms', 'requests loaded'))
+    for name, code in CASES:
+        loaded = timeRun(code + CHECK)[1]
+        times = sorted(timeRun(code)[0] - interpreter for i in range(runs))
+        print('%9s %12.1f %12.1f %s' % (name, times[len(times) // 2] * 1000, times[0] * 1000, loaded))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
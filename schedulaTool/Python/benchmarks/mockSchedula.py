@@ -0,0 +1,417 @@
+# mockSchedula.py is a local stand in for https://schedula.mygameday.app, used to benchmark the tool without the live site
+#
+# It serves synthetic but realistic responses for the pages and xajax functions the tool uses - login, appoint_by_week
+# (organisations, seasons, weeks and fixtures) and appoint_match (appointments, panels, appoint and unappoint, save,
+# discard and close). The numbers of organisations, seasons, weeks, fixtures and people and the latency of each
+# response can be set. The data is generated from a seed so every run serves the same data. Appointment changes are
+# kept until the server stops.
+#
+# GET /__stats returns the number of requests and bytes served as json.
+#
+# Usage: python mockSchedula.py [options]
+#   --port        port to listen on (default any free port), the address is printed on the first line
+#   --orgs        number of organisations (default 3)
+#   --seasons     number of seasons per organisation (default 2)
+#   --weeks       number of weeks per season (default 20)
+#   --fixtures    number of fixtures per week (default 12)
+#   --people      number of officials (default 80)
+#   --latency     time taken by each response in ms (default 0)
+#   --seed        seed for the generated data (default 1)
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import sys
+import json
+import time
+import random
+import getopt
+import calendar
+import threading
+import socketserver
+import http.server
+import urllib.parse
+from datetime import date
+from datetime import timedelta
+
+ORG_NAMES = ['AHJSA', 'NPLSA', 'FFSA Juniors', 'SAASL', 'Womens League', 'Masters League']
+
+COMPETITIONS = ['Premier League', 'State League 1', 'State League 2', 'Reserves', 'Under 18 Boys', 'Under 16 Girls', 'Under 14 Boys', 'Under 9 Mixed']
+
+FIRST_NAMES = ['John', 'Amy', 'Bob', 'Kim', 'Sarah', 'David', 'Priya', 'Tom', 'Mei', 'Luca', 'Grace', 'Ahmed']
+LAST_NAMES = ['SMITH', 'JONES', 'BROWN', 'LEE', 'NGUYEN', 'ROSSI', 'PATEL', 'TAYLOR', 'WILSON', 'KELLY', 'MARTIN', 'CHEN']
+
+# appointment types - [id, name]
+ROLES = [['11', 'Referee'], ['12', 'Assistant Referee 1'], ['13', 'Assistant Referee 2'], ['14', 'Referee Mentor'], ['15', 'Referee Assessor'], ['16', '4th Official']]
+
+# panels - [id, name], every official is on the first panel and every second official on the other
+PANELS = [['1', 'Referee (built-in)'], ['2', 'Juniors']]
+
+STATUSES = ['green', 'green', 'orange', 'red']
+
+KICK_OFFS = ['9:00 AM', '11:00 AM', '1:00 PM', '3:00 PM', '6:00 PM', '8:00 PM']
+
+# site navigation around each page, it is about the size of the real one and has none of the tags the tool looks for
+PAGE_HEAD = ('<!DOCTYPE html><html><head><title>Schedula</title>' +
+    ''.join('<script type="text/javascript" src="/js/lib' + str(i) + '.js?v=20200201"></script>' for i in range(12)) +
+    '<link rel="stylesheet" href="/css/schedula.css"></head><body><div id="header"><img src="/images/logo.png"></div><div id="menu"><ul>' +
+    ''.join('<li><a href="/index.php?action=admin/menu' + str(i) + '">Menu item ' + str(i) + '</a></li>' for i in range(40)) +
+    '</ul></div><div id="content">')
+PAGE_TAIL = '</div><div id="footer">Schedula</div></body></html>'
+
+LOGIN_PAGE = PAGE_HEAD + '<form name="login"><input name="email"><input type="password" name="password"><input type="button" name="btnlogin" value="Login"></form>' + PAGE_TAIL
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# MockSchedula holds the generated data and the appointments, and builds each response
+class MockSchedula:
+    def __init__(self, orgs=3, seasons=2, weeks=20, fixtures=12, people=80, latency=0.0, seed=1):
+        self.latency = latency
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.requests = 0
+        self.bytes = 0
+        self.calls = {}
+
+        # organisations - [orgID, name]
+        self.organisations = [[str(600 + i), ORG_NAMES[i % len(ORG_NAMES)] + ('' if i < len(ORG_NAMES) else ' ' + str(i))] for i in range(orgs)]
+
+        # seasons of each organisation, newest first - {orgID:[[seasonID, year]]}, and the year of each season
+        self.seasons = {}
+        self.seasonYears = {}
+        thisYear = date.today().year
+        for i, org in enumerate(self.organisations):
+            self.seasons[org[0]] = []
+            for s in range(seasons):
+                seasonID = str(3000 + i*10 + s)
+                self.seasons[org[0]].append([seasonID, str(thisYear - s)])
+                self.seasonYears[seasonID] = thisYear - s
+        self.weeksPerSeason = weeks
+        self.fixturesPerWeek = fixtures
+
+        # officials - [name, personID, appointID]
+        self.people = []
+        for i in range(people):
+            name = LAST_NAMES[i % len(LAST_NAMES)] + ', ' + FIRST_NAMES[(i // len(LAST_NAMES)) % len(FIRST_NAMES)]
+            if i >= len(LAST_NAMES) * len(FIRST_NAMES):
+                name = name + ' ' + str(i)
+            self.people.append([name, str(10000 + i), str(50000 + i)])
+        self.byAppointID = dict((p[2], i) for i, p in enumerate(self.people))
+
+        # saved and unsaved appointments of each fixture that has been changed - {fixtureID:[[personIndex, roleIndex, status]]}
+        self.saved = {}
+        self.unsaved = {}
+
+    # weeks of a season - [[weekID, weekName]], a week per season week starting on the first Monday in February
+    def weeks(self, seasonID):
+        start = date(self.seasonYears[seasonID], 2, 1)
+        start = start + timedelta(days=(7 - start.weekday()) % 7)
+        weeks = []
+        for w in range(self.weeksPerSeason):
+            first = start + timedelta(days=7*w)
+            last = first + timedelta(days=6)
+            weeks.append([first.isoformat() + '_' + last.isoformat(), 'Week ' + str(w + 1) + ' (' + shortDate(first) + ' to ' + shortDate(last) + ')'])
+        return weeks
+
+    # fixtures of a week - [[competition, date, time, home, away, ground, fixtureID]], grouped by competition
+    def fixtures(self, seasonID, weekID):
+        weekIDs = [w[0] for w in self.weeks(seasonID)]
+        if weekID not in weekIDs:
+            return []
+        week = weekIDs.index(weekID)
+        saturday = date(*[int(s) for s in weekID.split('_')[0].split('-')]) + timedelta(days=5)
+
+        fixtures = []
+        for i in range(self.fixturesPerWeek):
+            competition = COMPETITIONS[i % len(COMPETITIONS)]
+            day = saturday + timedelta(days=(i // len(COMPETITIONS)) % 2)
+            fixtures.append([competition, day.strftime('%a') + ' ' + calendar.month_abbr[day.month] + ' ' + str(day.day), KICK_OFFS[i % len(KICK_OFFS)], competition[:3] + ' Home ' + str(i), competition[:3] + ' Away ' + str(i), 'Ground ' + str(i % 7), str(int(seasonID)*10000 + week*100 + i)])
+        fixtures.sort(key=lambda f: COMPETITIONS.index(f[0]))
+        return fixtures
+
+    # saved appointments of a fixture - [[personIndex, roleIndex, status]], fixtures that have not been changed get
+    # generated appointments
+    def appointments(self, fixtureID):
+        if fixtureID in self.saved:
+            return self.saved[fixtureID]
+
+        rand = random.Random(self.seed*1000003 + int(fixtureID))
+        count = rand.choice([0, 0, 1, 1, 2, 3])
+        people = rand.sample(range(len(self.people)), min(count, len(self.people)))
+        return [[p, r, rand.choice(STATUSES)] for r, p in enumerate(people)]
+
+    # appointments of a fixture including unsaved changes
+    def current(self, fixtureID):
+        if fixtureID in self.unsaved:
+            return self.unsaved[fixtureID]
+        return self.appointments(fixtureID)
+
+    # starts or continues a change to a fixture's appointments, returns the unsaved appointments
+    def change(self, fixtureID):
+        if fixtureID not in self.unsaved:
+            self.unsaved[fixtureID] = [list(a) for a in self.appointments(fixtureID)]
+        return self.unsaved[fixtureID]
+
+    # returns the response to a GET - (status, body, headers)
+    def get(self, path, query, loggedIn):
+        action = query.get('action', [''])[0]
+        if (path in ['/', '/index.php']) and (action == ''):
+            return 200, LOGIN_PAGE, {}
+        if not loggedIn:
+            return 200, LOGIN_PAGE, {}
+
+        if action == 'admin/appointments/appoint_by_week':
+            self.count('appoint_by_week')
+            options = '<option value=""></option>' + ''.join('<option value="' + o[0] + '">' + o[1] + '</option>' for o in self.organisations)
+            return 200, PAGE_HEAD + '<form name="search_fixture"><div class="search"><select name="orgs" id="orgs" onchange="xajax_GetSeasons(this.value, \'AppointByWeek\')">' + options + '</select><span id="seasons"></span><span id="weeks"></span></div></form><div id="fixtures"></div>' + PAGE_TAIL, {}
+
+        if action == 'admin/appointments/appoint_match':
+            self.count('appoint_match')
+            fixtureID = query.get('fixtureid', [''])[0]
+            with self.lock:
+                return 200, self.matchPage(fixtureID), {}
+
+        return 404, PAGE_HEAD + 'Not found' + PAGE_TAIL, {}
+
+    # returns the response to an xajax POST - (status, body, headers)
+    def post(self, path, query, data, loggedIn, host):
+        form = urllib.parse.parse_qs(data, keep_blank_values=True)
+        function = form.get('xjxfun', [''])[0]
+        # drop the type letter from each argument
+        args = [a[1:] for a in form.get('xjxargs[]', [])]
+
+        if function == 'dologin':
+            self.count(function)
+            token = '%032x' % random.getrandbits(128)
+            with self.lock:
+                self.sessions.add(token)
+            body = '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="rd"><![CDATA[window.location = "http://' + host + '/index.php?action=dashboard";]]></cmd></xjx>'
+            return 200, body, {'Set-Cookie':'PHPSESSID=' + token + '; path=/'}
+        if not loggedIn:
+            return 200, LOGIN_PAGE, {}
+
+        self.count(function)
+        if function == 'GetSeasons':
+            options = '<option value=""></option>' + ''.join('<option value="' + s[0] + '">' + s[1] + '</option>' for s in self.seasons.get(args[0], []))
+            return 200, xajaxAssign('seasons', '<select name="season" id="season" onchange="xajax_GetSeasonWeeks(this.value, \'AppointByWeek\')">' + options + '</select>'), {}
+        if function == 'GetSeasonWeeks':
+            options = ''.join('<option value="' + w[0] + '">' + w[1] + '</option>' for w in self.weeks(args[0]))
+            return 200, xajaxAssign('weeks', '<select id="week" name="week">' + options + '</select><input type="button" value="Show" onclick="xajax_ShowFixturesForWeek()">'), {}
+        if function == 'ShowFixturesForWeek':
+            return 200, xajaxAssign('fixtures', self.fixtureTable(args[0], args[1])), {}
+
+        fixtureID = query.get('fixtureid', [''])[0]
+        with self.lock:
+            if function == 'ChangePanel':
+                return 200, self.refereeList(args[0], fixtureID), {}
+            if function == 'ChangeAppointmentType':
+                return 200, xajaxAssign('appointment_type', args[0]), {}
+            if function == 'AppointUmpire':
+                person = self.byAppointID.get(args[0])
+                role = [r[0] for r in ROLES].index(args[1]) if args[1] in [r[0] for r in ROLES] else 0
+                appointments = self.change(fixtureID)
+                if (person is not None) and (person not in [a[0] for a in appointments]):
+                    appointments.append([person, role, 'orange'])
+                return 200, self.refereeList('1', fixtureID), {}
+            if function == 'UnappointUmpire':
+                person = self.byAppointID.get(args[0])
+                self.unsaved[fixtureID] = [a for a in self.change(fixtureID) if a[0] != person]
+                return 200, self.refereeList('1', fixtureID), {}
+            if function == 'SaveAppointments':
+                if fixtureID in self.unsaved:
+                    self.saved[fixtureID] = self.unsaved.pop(fixtureID)
+                return 200, xajaxCall('close()'), {}
+            if function == 'DiscardChanges':
+                self.unsaved.pop(fixtureID, None)
+                return 200, xajaxCall('close()'), {}
+            if function == 'JustClose':
+                if fixtureID in self.unsaved:
+                    return 200, xajaxCall('confirmClose(' + fixtureID + ')'), {}
+                return 200, xajaxCall('close()'), {}
+            if function == 'DisplayOnWeb':
+                return 200, xajaxCall('void(0)'), {}
+
+        return 200, xajaxCall('alert("Unknown function")'), {}
+
+    # appoint match page - panels, appointment types and the appointments table
+    def matchPage(self, fixtureID):
+        panels = '<form name="panels_form"><select name="panel" onchange="xajax_ChangePanel(this.value,' + fixtureID + ',false)">' + ''.join('<option value="' + p[0] + '">' + p[1] + '</option>' for p in PANELS) + '</select></form>'
+        types = '<form name="appointment_type_form"><select name="appointment_type" onchange="xajax_ChangeAppointmentType(this.value,' + fixtureID + ')">' + ''.join('<option value="' + r[0] + '">' + r[1] + '</option>' for r in ROLES) + '</select></form>'
+
+        rows = ''
+        for person, role, status in self.current(fixtureID):
+            name, personID, appointID = self.people[person]
+            options = ''.join('<option value="' + r[0] + '"' + (' selected="selected"' if i == role else '') + '>' + r[1] + '</option>' for i, r in enumerate(ROLES))
+            rows = rows + '<tr><td>' + name + '</td><td><select name="type_' + appointID + '" onchange="xajax_AppointUmpire(' + appointID + ',this.value,' + fixtureID + ',false)">' + options + '</select></td><td><img src="/images/icons/status/' + status + '_tick.png"></td></tr>'
+
+        return PAGE_HEAD + '<div class="fixture">Fixture ' + fixtureID + '</div>' + panels + types + '<table class="appointments"><tr><th>Name</th><th>Type</th><th>Status</th></tr>' + rows + '</table>' + PAGE_TAIL
+
+    # ChangePanel response - the officials on the panel, then the ones already appointed
+    def refereeList(self, panelID, fixtureID):
+        available = ''
+        for i, (name, personID, appointID) in enumerate(self.people):
+            if (panelID != '1') and (i % 2 != 0):
+                continue
+            available = available + '<tr><td><b>' + name + '</b> <input type="button" value="Appoint" onclick="xajax_AppointUmpire(' + appointID + ',document.appointment_type_form.appointment_type.value,' + fixtureID + ',false)"></td><td><a href="/index.php?action=admin/people/view&personid=' + personID + '&amp;skeleton=true">Details</a></td></tr>'
+
+        current = ''.join('<tr><td>' + self.people[p][0] + '</td><td><input type="button" value="Removed" onclick="xajax_UnappointUmpire(' + self.people[p][2] + ',' + ROLES[r][0] + ',' + fixtureID + ')"></td></tr>' for p, r, s in self.current(fixtureID))
+        return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="referees" p="innerHTML"><![CDATA[<table>' + available + '</table>]]></cmd><cmd n="as" t="appointed" p="innerHTML"><![CDATA[S<table>' + current + '</table>]]></cmd></xjx>'
+
+    # ShowFixturesForWeek table
+    def fixtureTable(self, seasonID, weekID):
+        table = '<table class="fixtures">'
+        competition = None
+        for f in self.fixtures(seasonID, weekID):
+            if f[0] != competition:
+                competition = f[0]
+                table = table + '<tr><th colspan="7">' + competition + '</th></tr>'
+            table = table + '<tr><td>' + f[1] + '</td><td>' + f[2] + '</td><td>' + f[3] + '</td><td>v</td><td>' + f[4] + '</td><td>' + f[5] + '</td><td><a href="#"><u style="cursor:pointer" onclick="openWindow(\'/index.php?action=admin/appointments/appoint_match&fixtureid=' + f[6] + '&skeleton=true\')">Appoint</u></a></td></tr>'
+        return table + '</table>'
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {'requests':self.requests, 'bytes':self.bytes, 'calls':dict(self.calls)}
+
+# Handler answers each request from the MockSchedula of its server
+class Handler(http.server.BaseHTTPRequestHandler):
+    # keep connections open, as schedula does
+    protocol_version = 'HTTP/1.1'
+
+    # the headers and body are written separately, without this each response waits for the delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urllib.parse.urlparse(self.path)
+        if url.path == '/__stats':
+            self.reply(200, json.dumps(mock.stats()), {'Content-Type':'application/json'}, count=False)
+            return
+        status, body, headers = mock.get(url.path, urllib.parse.parse_qs(url.query), self.loggedIn())
+        self.reply(status, body, headers)
+
+    def do_POST(self):
+        mock = self.server.mock
+        url = urllib.parse.urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length).decode('utf-8')
+        status, body, headers = mock.post(url.path, urllib.parse.parse_qs(url.query), data, self.loggedIn(), self.headers.get('Host', 'localhost'))
+        self.reply(status, body, headers)
+
+    # true if the request has the cookie of a logged in session
+    def loggedIn(self):
+        cookies = self.headers.get('Cookie', '')
+        for c in cookies.split(';'):
+            name, sep, value = c.strip().partition('=')
+            if name == 'PHPSESSID':
+                with self.server.mock.lock:
+                    return value in self.server.mock.sessions
+        return False
+
+    def reply(self, status, body, headers, count=True):
+        mock = self.server.mock
+        if count and mock.latency > 0:
+            time.sleep(mock.latency)
+
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', headers.pop('Content-Type', 'text/html; charset=utf-8'))
+        self.send_header('Content-Length', str(len(data)))
+        for k in headers:
+            self.send_header(k, headers[k])
+        self.end_headers()
+        self.wfile.write(data)
+
+        if count:
+            with mock.lock:
+                mock.requests = mock.requests + 1
+                mock.bytes = mock.bytes + len(data)
+
+    def log_message(self, format, *args):
+        pass
+
+# Server runs each connection in its own thread
+class Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, mock, port=0):
+        http.server.HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+        self.mock = mock
+
+    # base url to use in place of schedula's
+    def url(self):
+        return 'http://127.0.0.1:' + str(self.server_address[1])
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# starts a server for the mock in a background thread, returns the server
+def start(mock, port=0):
+    server = Server(mock, port)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+# xajax response assigning html to an element
+def xajaxAssign(target, html):
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="as" t="' + target + '" p="innerHTML"><![CDATA[' + html + ']]></cmd></xjx>'
+
+# xajax response calling a javascript function
+def xajaxCall(function):
+    return '<?xml version="1.0" encoding="utf-8" ?><xjx><cmd n="js" func="' + function + '"></cmd></xjx>'
+
+# e.g. Feb 3
+def shortDate(d):
+    return calendar.month_abbr[d.month] + ' ' + str(d.day)
+
+def main(argv):
+    port = 0
+    sizes = {'orgs':3, 'seasons':2, 'weeks':20, 'fixtures':12, 'people':80, 'seed':1}
+    latency = 0.0
+
+    opts, args = getopt.gnu_getopt(argv, '', ['port=', 'latency='] + [k + '=' for k in sizes])
+    for opt, arg in opts:
+        if opt == '--port':
+            port = int(arg)
+        elif opt == '--latency':
+            latency = float(arg) / 1000
+        else:
+            sizes[opt[2:]] = int(arg)
+
+    server = Server(MockSchedula(latency=latency, **sizes), port)
+    print(server.url(), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
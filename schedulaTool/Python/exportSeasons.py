@@ -6,19 +6,16 @@ import schedulaMain
 
 if __name__ == '__main__':
     try:
-        print("Schedula Export tool. Enter a season to export")
-        season = input('season: ')
-        fileName = season + ".csv"
+        print("Schedula Export tool. Enter the seasons to export, e.g. 2020, 2016-2020 or 2018,2020")
+        season = input('seasons: ')
 
-        print("Exporting season " + season + " to file " + fileName)
+        print("Exporting seasons " + season + ", each to the file <season>.csv")
 
-        # create the arguments
+        # create the arguments, all the seasons are pulled in one run
         argv = []
-        argv.append('pullAll')
+        argv.append('export')
         argv.append('-s')
         argv.append(season)
-        argv.append('-f')
-        argv.append(fileName)
 
         schedulaMain.main(argv)
 
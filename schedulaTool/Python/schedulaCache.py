@@ -0,0 +1,127 @@
+# schedulaCache.py implements a persistent on-disk cache for schedula responses that rarely change, e.g. the
+# organisations, seasons and season weeks
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import os
+import json
+import copy
+import time
+import threading
+
+CACHE_VERSION = 1
+
+# time to live of each endpoint in seconds
+DEFAULT_TTL = {'organisations':7*24*60*60, 'seasons':7*24*60*60, 'seasonWeeks':24*60*60, 'seasonSpans':365*24*60*60}
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# MetadataCache stores responses by endpoint and key in a json file
+#
+# filename      - file to store the cache in, it is created on save if it does not exist
+# namespace     - entries are kept separate for each namespace, e.g. the schedula username
+# ttl           - dict of endpoint to time to live in seconds, endpoints not listed are never cached
+# refresh       - if true the stored entries are discarded and every request goes to schedula
+class MetadataCache:
+    def __init__(self, filename, namespace='', ttl=DEFAULT_TTL, refresh=False):
+        self.filename = filename
+        self.namespace = namespace
+        self.ttl = dict(ttl)
+        self.hits = 0
+        self.misses = 0
+        self.entries = {}
+        self.dirty = False
+        self.lock = threading.Lock()
+
+        if refresh:
+            self.dirty = True
+        else:
+            self.load()
+
+    # load the cache file, a missing or unreadable file gives an empty cache
+    def load(self):
+        try:
+            with open(self.filename, mode='r') as file:
+                data = json.load(file)
+            if data.get('version') == CACHE_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    # write the cache file if it has changed. The file is replaced in one step so a crash never leaves half a cache
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.filename))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            tmpName = self.filename + '.tmp'
+            with open(tmpName, mode='w') as file:
+                json.dump({'version':CACHE_VERSION, 'entries':self.entries}, file)
+            os.replace(tmpName, self.filename)
+            self.dirty = False
+
+    # returns the stored value for the endpoint and key, or None if there is no fresh entry
+    def get(self, endpoint, key):
+        if endpoint not in self.ttl:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(self.entryKey(endpoint, key))
+            if (entry is None) or (time.time() - entry['time'] > self.ttl[endpoint]):
+                self.misses = self.misses + 1
+                return None
+
+            self.hits = self.hits + 1
+            return copy.deepcopy(entry['value'])
+
+    # stores a value for the endpoint and key
+    def put(self, endpoint, key, value):
+        if endpoint not in self.ttl:
+            return
+
+        with self.lock:
+            self.entries[self.entryKey(endpoint, key)] = {'time':time.time(), 'value':copy.deepcopy(value)}
+            self.dirty = True
+
+    # removes the entries for the given endpoint, or every entry if endpoint is None
+    def invalidate(self, endpoint=None):
+        with self.lock:
+            if endpoint is None:
+                self.entries = {}
+            else:
+                prefix = self.entryKey(endpoint, '')
+                for k in [k for k in self.entries if k.startswith(prefix)]:
+                    del self.entries[k]
+            self.dirty = True
+
+    # returns a one line summary of the hit and miss counters
+    def summary(self):
+        return 'Cache: ' + str(self.hits) + ' hits, ' + str(self.misses) + ' misses'
+
+    def entryKey(self, endpoint, key):
+        return self.namespace + '|' + endpoint + '|' + str(key)
@@ -0,0 +1,119 @@
+# schedulaClassify.py sorts schedula role names into appointment letters and finds blacklisted competitions
+#
+# The rules are compiled once and the result for each distinct string is remembered, there are only a few dozen
+# distinct role and competition names in a season. The rules can be read from a json file, e.g.
+#
+# {
+#     "blacklist": ["U6", "Under.6"],
+#     "roles": [["AR1", "A.*R.*1"], ["AR2", "A.*R.*2"], ["M", ".*Mentor.*"], ["A", "R.*Assessor"], ["R", "Referee$"], ["4", ".*4.*"]]
+# }
+#
+# blacklist     - competitions with a name starting with one of these patterns are ignored
+# roles         - [letter, pattern] in the order they are tried, a role name starting with the pattern is given the
+#                 letter. Role names that match none of the patterns are 'Other'.
+# Rules not given in the file keep their default.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import re
+import json
+
+ROLE_LETTERS = ['R', 'AR1', 'AR2', 'M', 'A', '4']
+
+# U6 to U11 and Under 6 to Under 11 competitions are not appointed
+DEFAULT_RULES = {
+    'blacklist':['U6', 'U7', 'U8', 'U9', 'U10', 'U11', 'Under.6', 'Under.7', 'Under.8', 'Under.9', 'Under.10', 'Under.11'],
+    'roles':[
+        ['AR1', 'A.*R.*1'],     # A*R*1* = AR1
+        ['AR2', 'A.*R.*2'],     # A*R*2* = AR2
+        ['M', '.*Mentor.*'],    # *Mentor* = M
+        ['A', 'R.*Assessor'],   # R*Assessor = A
+        ['R', 'Referee$'],      # Referee = R
+        ['4', '.*4.*'],         # *4* = 4
+    ]
+}
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# Classifier applies a set of rules, see DEFAULT_RULES
+class Classifier:
+    def __init__(self, rules=DEFAULT_RULES):
+        # one pattern for the whole blacklist
+        blacklist = rules['blacklist']
+        if blacklist:
+            self.blacklist = re.compile('(?:' + ')|(?:'.join(blacklist) + ')')
+        else:
+            self.blacklist = None
+
+        self.roles = []
+        for letter, pattern in rules['roles']:
+            if letter not in ROLE_LETTERS:
+                raise Exception('Unknown role letter <' + letter + '>, must be one of ' + str(ROLE_LETTERS))
+            self.roles.append([letter, re.compile(pattern)])
+
+        self.blacklisted = {}
+        self.letters = {}
+
+    # returns true if the competition is blacklisted
+    def isBlacklisted(self, competitionString):
+        hit = self.blacklisted.get(competitionString)
+        if hit is None:
+            hit = (self.blacklist is not None) and (self.blacklist.match(competitionString) is not None)
+            self.blacklisted[competitionString] = hit
+        return hit
+
+    # returns the letter for a role name, i.e. one of R, AR1, AR2, M, A, 4 or Other
+    def roleLetter(self, role):
+        letter = self.letters.get(role)
+        if letter is None:
+            letter = 'Other'
+            for l, pattern in self.roles:
+                if pattern.match(role) is not None:
+                    letter = l
+                    break
+            self.letters[role] = letter
+        return letter
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# loadRules returns a Classifier for the rules in the given json file, throws an error if the file is not valid
+def loadRules(filename):
+    try:
+        with open(filename, mode='r') as file:
+            data = json.load(file)
+    except (OSError, ValueError) as err:
+        raise Exception('Could not read rules file <' + filename + '>: ' + str(err))
+
+    rules = dict(DEFAULT_RULES)
+    for k in rules:
+        if k in data:
+            rules[k] = data[k]
+
+    try:
+        return Classifier(rules)
+    except (re.error, ValueError, TypeError) as err:
+        raise Exception('Invalid rules in <' + filename + '>: ' + str(err))
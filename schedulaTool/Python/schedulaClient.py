@@ -0,0 +1,143 @@
+# thin command line client for a schedula tool running as a background service (schedulaMain.py serve)
+#
+# Takes the same commands and options as schedulaMain.py and sends them to the service, which is already logged in
+# with warm caches, e.g.
+#   python schedulaClient.py pullN -f Fixtures.csv -n 14
+#   python schedulaClient.py stop
+# Output and prompts are passed back and forth as the command runs. If the service is not running the command is
+# run by schedulaMain.py in this process instead.
+#
+# Messages are json objects, one per line. The client sends {'token', 'argv', 'cwd'} then {'input':line} for each
+# prompt. The service sends {'out':text}, {'err':text}, {'input':prompt} and finally {'exit':code}.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# imports, kept to the standard library so the client starts quickly
+import sys
+import os
+import json
+import socket
+
+# seconds to wait when connecting to the service
+CONNECT_TIMEOUT = 2
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# returns the default location of the file the service writes its port and token to, next to the tool
+def defaultServiceFile():
+    return os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'schedulaService.json')
+
+# sends a message
+#
+# stream        - file made by socket.makefile
+# message       - dict to send
+def send(stream, message):
+    stream.write(json.dumps(message) + '\n')
+    stream.flush()
+
+# returns the next message, None if the connection has closed
+def receive(stream):
+    line = stream.readline()
+    if line == '':
+        return None
+    return json.loads(line)
+
+# returns {'port':port, 'token':token} from the service file, None if the service has not written one
+def readServiceFile(filename):
+    try:
+        with open(filename, mode='r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+# connects to the service and returns the connection, None if the service is not running
+def connect(serviceFile):
+    info = readServiceFile(serviceFile)
+    if info is None:
+        return None, None
+
+    try:
+        connection = socket.create_connection(('127.0.0.1', info['port']), timeout=CONNECT_TIMEOUT)
+    except OSError:
+        return None, None
+
+    # commands can take a long time
+    connection.settimeout(None)
+    return connection, info['token']
+
+# runs a command on the service
+#
+# argv          - command line arguments, as for schedulaMain.py
+# serviceFile   - file the service wrote its port and token to
+#
+# Returns the exit code of the command, or None if the service is not running
+def runRemote(argv, serviceFile):
+    connection, token = connect(serviceFile)
+    if connection is None:
+        return None
+
+    try:
+        stream = connection.makefile(mode='rw', encoding='utf-8', newline='\n')
+        send(stream, {'token':token, 'argv':argv, 'cwd':os.getcwd()})
+
+        while True:
+            message = receive(stream)
+            if message is None:
+                print('Connection to the schedula service lost')
+                return 1
+            if 'out' in message:
+                sys.stdout.write(message['out'])
+                sys.stdout.flush()
+            elif 'err' in message:
+                sys.stderr.write(message['err'])
+                sys.stderr.flush()
+            elif 'input' in message:
+                try:
+                    line = input(message['input'])
+                except EOFError:
+                    line = ''
+                send(stream, {'input':line})
+            elif 'exit' in message:
+                return message['exit']
+    finally:
+        connection.close()
+
+# entry point, sends the command to the service or runs it here if there is no service
+def main(argv):
+    code = runRemote(argv, defaultServiceFile())
+    if code is not None:
+        sys.exit(code)
+
+    if argv[:1] == ['stop']:
+        print('The schedula service is not running')
+        sys.exit(0)
+
+    # no service, run the command here
+    import schedulaMain
+    schedulaMain.main(argv)
+    schedulaMain.startup.report()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -24,8 +24,8 @@
 
 
 # imports
-import requests
-import urllib
+# requests is imported by newSession, so commands that do not connect to schedula never load the HTTP stack
+import urllib.parse
 import sys
 import csv
 import re
@@ -34,10 +34,304 @@ from datetime import date
 from datetime import timedelta
 import time
 import traceback
+import os
+import json
+import getpass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from concurrent.futures import FIRST_COMPLETED
+from collections import deque
+import schedulaParser as parser
+import schedulaClassify as classify
 
 SCHEDULA_BASE_URL = "https://schedula.mygameday.app"
 
-# TODO: parallelise requests to speedup
+# default number of concurrent requests used when looking up appointments
+DEFAULT_WORKERS = 8
+
+# lookups started per worker ahead of the fixture being streamed, see streamLookups
+STREAM_WINDOW = 4
+
+# transport settings, see newSession
+CONNECT_TIMEOUT = 10    # seconds to wait for a connection
+READ_TIMEOUT = 60       # seconds to wait for a response
+RETRIES = 3             # times a failed GET (or a request that could not connect) is tried again
+RETRY_BACKOFF = 0.5     # retries wait 0.5, 1, 2, ... seconds
+RETRY_STATUS = [500, 502, 503, 504]
+
+# cache for organisations, seasons and season weeks (a schedulaCache.MetadataCache), None disables caching
+metadataCache = None
+
+# records the latency, size and retries of each request (a schedulaTrace.Tracer), None disables tracing
+tracer = None
+
+# if false there is no one to ask for a password (e.g. the service), logging in again without one raises an error
+interactive = True
+
+# fixtures more than this many days old are treated as final by incremental pulls and are not fetched again
+SETTLED_DAYS = 7
+
+# days either side of a pullN date range that weeks are also fetched for, just to make sure
+WEEK_MARGIN_DAYS = 7
+
+# version 1 snapshots could mark a week as fetched when only some of its fixtures were kept
+SNAPSHOT_VERSION = 2
+
+SESSION_FILE_VERSION = 1
+
+# header of the appointments csv written by pullAll and update28
+APPOINTMENT_HEADER = ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+
+MONTH_TO_INT = dict((v,k) for k,v in enumerate(calendar.month_abbr))
+
+# rules used by isBlacklisted and roleStringToLetter (a schedulaClassify.Classifier)
+classifier = classify.Classifier()
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# Record is a row of strings that reads like the list it replaces, by index (record[12], record[1:3], list(record),
+# csv rows, ...), and also by field name. Subclasses name their fields in FIELDS and __slots__, so a record has no
+# per instance dict.
+class Record:
+    __slots__ = []
+    FIELDS = []
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [getattr(self, name) for name in self.FIELDS[i]]
+        return getattr(self, self.FIELDS[i])
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+# Fixture is a pulled fixture - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date',
+# 'Time','Home','Away','Ground','FixtureID']. Every field but the fixture id repeats across many fixtures, one copy of
+# each distinct string is kept.
+class Fixture(Record):
+    FIELDS = ['orgID', 'orgName', 'seasonID', 'seasonName', 'weekID', 'weekName', 'competition', 'date', 'time', 'home', 'away', 'ground', 'fixtureID']
+    __slots__ = FIELDS
+
+    def __init__(self, orgID, orgName, seasonID, seasonName, weekID, weekName, competition, date, time, home, away, ground, fixtureID):
+        intern = sys.intern
+        self.orgID = intern(orgID)
+        self.orgName = intern(orgName)
+        self.seasonID = intern(seasonID)
+        self.seasonName = intern(seasonName)
+        self.weekID = intern(weekID)
+        self.weekName = intern(weekName)
+        self.competition = intern(competition)
+        self.date = intern(date)
+        self.time = intern(time)
+        self.home = intern(home)
+        self.away = intern(away)
+        self.ground = intern(ground)
+        self.fixtureID = fixtureID
+
+# Appointment is a pulled appointment - ['fixtureid','officialName','appointID','selectedRole','selectedRoleID',
+# 'acceptStatus']. The fixture id is the fixture's own string, the other fields repeat across many appointments and
+# one copy of each distinct string is kept.
+class Appointment(Record):
+    FIELDS = ['fixtureID', 'officialName', 'appointID', 'role', 'roleID', 'status']
+    __slots__ = FIELDS
+
+    def __init__(self, fixtureID, officialName, appointID, role, roleID, status):
+        intern = sys.intern
+        self.fixtureID = fixtureID
+        self.officialName = intern(officialName)
+        self.appointID = intern(appointID)
+        self.role = intern(role)
+        self.roleID = intern(roleID)
+        self.status = intern(status)
+
+# FixtureIndex looks up fixtures and their appointments by fixture id. It is built in a single pass so joining
+# fixtures to appointments is linear rather than a scan of every appointment for each fixture.
+#
+# fixtures      - list of fixtures, where there are duplicate ids the first fixture is kept
+# appointments  - list of appointments - ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+# getFixtureID  - function returning the fixture id of a fixture, by default the id of a pulled fixture (fixture[12])
+#                 e.g. lambda row: row['FixtureID'] for rows read with readCSV
+class FixtureIndex:
+    def __init__(self, fixtures=[], appointments=[], getFixtureID=lambda fixture: fixture[12]):
+        self.fixtures = {}
+        for f in fixtures:
+            self.fixtures.setdefault(getFixtureID(f), f)
+
+        self.appointments = {}
+        for a in appointments:
+            if a[0] in self.appointments:
+                self.appointments[a[0]].append(a)
+            else:
+                self.appointments[a[0]] = [a]
+
+    def __len__(self):
+        return len(self.fixtures)
+
+    def __contains__(self, fixtureID):
+        return fixtureID in self.fixtures
+
+    # returns the fixture with the given id, or default if there is none
+    def fixture(self, fixtureID, default=None):
+        return self.fixtures.get(fixtureID, default)
+
+    # returns the appointments for the given fixture id in the order they were given
+    def appointmentsFor(self, fixtureID):
+        return self.appointments.get(fixtureID, [])
+
+# PersonResolver finds the person id for an official's name. It is built once from the people list with a map of
+# exact names and an index of the casefolded words in each name, and remembers every name it has resolved.
+#
+# A name matches exactly, or else matches each person whose name contains every word of it (ignoring case and
+# commas). Where several people match the last one in the list is used.
+#
+# people        - list of {'name':name, 'personID':pid}, e.g. from readCSV(peopleFile)
+class PersonResolver:
+    def __init__(self, people=[]):
+        self.people = people
+        self.exact = {}
+        self.names = {} # person id -> name
+        self.words = {} # casefolded word -> set of indexes into people
+        for i, p in enumerate(people):
+            self.exact.setdefault(p['name'], p['personID'])
+            self.names.setdefault(p['personID'], p['name'])
+            for w in p['name'].casefold().split(' '):
+                if w in self.words:
+                    self.words[w].add(i)
+                else:
+                    self.words[w] = {i}
+
+        self.wordMatches = {}
+        self.resolved = {}
+
+    # returns the indexes of the people with a word containing the given word
+    def matchWord(self, word):
+        if word not in self.wordMatches:
+            matches = set()
+            for w, indexes in self.words.items():
+                if word in w:
+                    matches |= indexes
+            self.wordMatches[word] = matches
+        return self.wordMatches[word]
+
+    # returns the indexes of the people that are a close match to the name, in list order
+    def closeMatches(self, name):
+        matches = None
+        for n in name.split(' '):
+            wordMatches = self.matchWord(n.replace(',','').casefold())
+            matches = set(wordMatches) if matches is None else matches & wordMatches
+            if not matches:
+                break
+        return sorted(matches)
+
+    # returns the person id of the name, '' is returned for an empty name. Throws an error if there is no match
+    def resolve(self, name):
+        if name == '':
+            return ''
+
+        if name not in self.resolved:
+            pid = self.exact.get(name, '')
+            if pid == '':
+                matches = self.closeMatches(name)
+                if matches:
+                    pid = self.people[matches[-1]]['personID']
+            if pid == '':
+                raise Exception('Person: ' + name + 'Not Found')
+            self.resolved[name] = pid
+
+        return self.resolved[name]
+
+    # returns the name of a person as it is listed in the people list, i.e. as schedula lists them
+    def nameOf(self, personID):
+        return self.names.get(personID, '')
+
+    # resolves all the names in one go
+    #
+    # Returns {'personIDs':{name:pid}, 'ambiguous':{name:[names of the matching people]}, 'unmatched':[names]}
+    # ambiguous names are also in personIDs, resolved to the last matching person
+    def resolveAll(self, names):
+        result = {'personIDs':{}, 'ambiguous':{}, 'unmatched':[]}
+        for name in names:
+            if (name == '') or (name in result['personIDs']) or (name in result['unmatched']):
+                continue
+            try:
+                result['personIDs'][name] = self.resolve(name)
+            except Exception:
+                result['unmatched'].append(name)
+                continue
+            if self.exact.get(name, '') == '':
+                matches = self.closeMatches(name)
+                if len(matches) > 1:
+                    result['ambiguous'][name] = [self.people[i]['name'] for i in matches]
+
+        return result
+
+    # resolves every name in a list of appointments (see readAppointmentList) and reports any problems up front
+    #
+    # Ambiguous names are printed as warnings. Throws an error listing every name that has no match.
+    def resolveAppointments(self, appointments):
+        names = [a['name'] for match in appointments for a in match['appointList']]
+        result = self.resolveAll(names)
+
+        for name, matches in result['ambiguous'].items():
+            print('Warning: ' + name + ' matches ' + str(matches) + ', using ' + matches[-1])
+
+        if result['unmatched']:
+            raise Exception('People not found: ' + str(result['unmatched']))
+
+        return result['personIDs']
+
+# ThreadOutput replaces sys.stdout or sys.stderr so threads can hold back their output and write it in one block,
+# e.g. so the output of fixtures pushed at the same time is not mixed together. Threads that are not capturing write
+# straight through.
+#
+# stream        - stream to write to
+class ThreadOutput:
+    # shared by every ThreadOutput so blocks released to stdout and stderr are kept together
+    lock = threading.RLock()
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        if buffer is None:
+            with ThreadOutput.lock:
+                return self.stream.write(text)
+        buffer.append(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+    # hold back the output of the current thread
+    def capture(self):
+        self.local.buffer = []
+
+    # write the held back output of the current thread and stop capturing
+    def release(self):
+        buffer = getattr(self.local, 'buffer', None)
+        self.local.buffer = None
+        if buffer:
+            with ThreadOutput.lock:
+                self.stream.write(''.join(buffer))
+                self.stream.flush()
 
 ################################################################################
 #########################           FUNCTIONS          #########################
@@ -48,14 +342,18 @@ SCHEDULA_BASE_URL = "https://schedula.mygameday.app"
 # url           - URL to get
 # proxy         - use an http proxy if true
 # proxyDict     - address of proxy
+# relogin       - if the session has expired, login again and repeat the request (see getSession)
 #
-# returns the output of session.get(url)
-def getPage(session, url, proxy=False, proxyDict={}):
-    # TODO: check session is still loged in
-    if proxy:
-        return session.get(url, proxies=proxyDict, verify=False)
-    else:
-        return session.get(url)
+# returns the output of session.get(url), wrapped in a parser.Response
+def getPage(session, url, proxy=False, proxyDict={}, relogin=True):
+    def send():
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        if proxy:
+            return traced('GET', url, '', lambda: session.get(url, proxies=proxyDict, verify=False, timeout=timeout))
+        else:
+            return traced('GET', url, '', lambda: session.get(url, timeout=timeout))
+
+    return sendLoggedIn(session, send, relogin)
 
 # post performs an HTTP post request
 #
@@ -64,52 +362,135 @@ def getPage(session, url, proxy=False, proxyDict={}):
 # data          - data segment of POST request
 # proxy         - use an http proxy if true
 # proxyDict     - address of proxy
+# relogin       - if the session has expired, login again and repeat the request (see getSession)
 #
-# returns the output of session.post(url)
-def post(session, url, data, proxy=False, proxyDict={}):
-    # TODO: check session is still loged in
-    headers = { "content-type" : "application/x-www-form-urlencoded", "Accept-Language" : "en-US,en;q=0.5", "Origin" : SCHEDULA_BASE_URL}
-    if proxy:
-        r = session.post(url, data=data, headers=headers, proxies=proxyDict, verify=False)
-    else:
-        r = session.post(url, data=data, headers=headers)
+# returns the output of session.post(url), wrapped in a parser.Response
+def post(session, url, data, proxy=False, proxyDict={}, relogin=True):
+    def send():
+        headers = { "content-type" : "application/x-www-form-urlencoded", "Accept-Language" : "en-US,en;q=0.5", "Origin" : SCHEDULA_BASE_URL}
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        if proxy:
+            return traced('POST', url, data, lambda: session.post(url, data=data, headers=headers, proxies=proxyDict, verify=False, timeout=timeout))
+        else:
+            return traced('POST', url, data, lambda: session.post(url, data=data, headers=headers, timeout=timeout))
 
-    # debug
-    referees = getRefsFromText(r.text)
+    return sendLoggedIn(session, send, relogin)
 
-    return r
+# traced makes a request with the given function, records it with the tracer if there is one and returns the response
+# wrapped in a parser.Response
+def traced(method, url, data, request):
+    if tracer is None:
+        return parser.Response(request())
+
+    start = time.time()
+    timer = time.perf_counter()
+    try:
+        r = request()
+    except Exception:
+        tracer.record(method, url, data, start, time.perf_counter() - timer, None)
+        raise
+    tracer.record(method, url, data, start, time.perf_counter() - timer, r)
+    return parser.Response(r)
+
+# sendLoggedIn makes a request and, if schedula answers with its login page because the session has expired, logs in
+# again and repeats the request once. A request refused for being logged out made no changes, so it is safe to repeat.
+#
+# send          - function making the request, returns a parser.Response
+# relogin       - false to return the response as it is
+def sendLoggedIn(session, send, relogin):
+    login = getattr(session, 'schedulaLogin', None)
+    if (not relogin) or (login is None):
+        return send()
+
+    generation = login['generation']
+    r = send()
+    if not r.loggedOut:
+        return r
+
+    # only one thread logs in again, the others wait for it and then repeat their request
+    with login['lock']:
+        if login['generation'] == generation:
+            print('\nSession expired, logging in again...')
+            session.cookies.clear()
+            loginSession(session)
+    return send()
+
+# newSession returns a session with a connection pool for the given number of concurrent requests. Connections are
+# kept alive and reused. GETs that fail or return a server error are tried again with backoff, as is any request
+# that could not connect. POSTs that reached schedula are never repeated as they may have made changes.
+#
+# poolSize      - number of connections to keep open, at least the number of concurrent requests
+def newSession(poolSize=DEFAULT_WORKERS):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+
+    retryArgs = {'total':RETRIES, 'connect':RETRIES, 'read':RETRIES, 'status':RETRIES, 'backoff_factor':RETRY_BACKOFF, 'status_forcelist':RETRY_STATUS, 'raise_on_status':False}
+    try:
+        retry = Retry(allowed_methods=frozenset(['GET']), **retryArgs)
+    except TypeError:
+        # urllib3 before 1.26
+        retry = Retry(method_whitelist=frozenset(['GET']), **retryArgs)
+
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, poolSize), max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
 
 # getSession returns an html session to be used for connection to schedula
 #
 # user          - username
-# pswd          - password
+# pswd          - password, if '' it is asked for when a login is needed
 # proxy         - use an http proxy if true
 # proxyAddress  - address of proxy
+# poolSize      - number of connections to keep open, see newSession
+# sessionFile   - file to keep the session cookies in between runs, '' to always login
+#
+# The login details are kept with the session so getPage and post can login again if the session expires. If the
+# session file has cookies for the user they are used without logging in, they are checked by the first request.
 #
 # Returns a session logged in to schedula, throws error on fail
-def getSession(user, pswd, proxy=False, proxyDict={}):
-    print('Attempting login...')
-    
+def getSession(user, pswd, proxy=False, proxyDict={}, poolSize=DEFAULT_WORKERS, sessionFile=''):
     # Session object
-    session = requests.Session()
+    session = newSession(poolSize)
+    session.schedulaLogin = {'user':user, 'password':pswd, 'proxy':proxy, 'proxyDict':proxyDict, 'sessionFile':sessionFile, 'lock':threading.Lock(), 'generation':0}
+
+    if (sessionFile != '') and loadSessionCookies(session, sessionFile, user):
+        print('Using saved session')
+        return session
+
+    loginSession(session)
+    return session
+
+# loginSession logs the session in to schedula with the details given to getSession and saves its cookies
+def loginSession(session):
+    login = session.schedulaLogin
+    proxy = login['proxy']
+    proxyDict = login['proxyDict']
+    if login['password'] == '':
+        if not interactive:
+            raise Exception('Login required for ' + login['user'] + ' and no password was given. Restart with -p or --login')
+        login['password'] = getpass.getpass('Password:')
+
+    print('Attempting login...')
 
     # url of schedula login page
     url = SCHEDULA_BASE_URL
 
     # get login page
-    r = getPage(session, url, proxy, proxyDict)
+    r = getPage(session, url, proxy, proxyDict, relogin=False)
 
     # login data
-    data = 'xjxfun=dologin&xjxargs[]=' + urllib.parse.quote('<xjxobj><e><k>email</k><v>S<![CDATA[' + user + ']]></v></e><e><k>password</k><v>S' + pswd + '</v></e><e><k>btnlogin</k><v>SLogin</v></e></xjxobj>')
+    data = 'xjxfun=dologin&xjxargs[]=' + urllib.parse.quote('<xjxobj><e><k>email</k><v>S<![CDATA[' + login['user'] + ']]></v></e><e><k>password</k><v>S' + login['password'] + '</v></e><e><k>btnlogin</k><v>SLogin</v></e></xjxobj>')
 
     # attempt login
-    r2 = post(session, url, data, proxy, proxyDict)
+    r2 = post(session, url, data, proxy, proxyDict, relogin=False)
 
     # check login status
-    text = r2.text
-    text = text.split('CDATA')
-    text = text[1].split('"')
-    text = text[1]
+    text = parser.parseLoginRedirect(r2.text)
 
     if text == (SCHEDULA_BASE_URL + '/index.php?action=dashboard'):
         print('Login Success')
@@ -117,7 +498,61 @@ def getSession(user, pswd, proxy=False, proxyDict={}):
         print('Login Fail')
         raise Exception('Login Failed. Incorrect username or password')
 
-    return session
+    login['generation'] = login['generation'] + 1
+    saveSessionCookies(session)
+
+# returns true if the session file has cookies for the user
+def hasSessionCookies(sessionFile, user):
+    return user in readSessionFile(sessionFile)
+
+# loads the user's cookies from the session file into the session, returns false if there are none
+def loadSessionCookies(session, sessionFile, user):
+    cookies = readSessionFile(sessionFile).get(user)
+    if not cookies:
+        return False
+
+    for c in cookies:
+        session.cookies.set(c['name'], c['value'], domain=c['domain'], path=c['path'], expires=c['expires'], secure=c['secure'])
+    return True
+
+# saves the session's cookies to its session file. The password is never saved and the file is only readable by the
+# current user. The cookies of other users in the file are kept.
+def saveSessionCookies(session):
+    login = getattr(session, 'schedulaLogin', None)
+    if (login is None) or (login['sessionFile'] == ''):
+        return
+
+    sessions = readSessionFile(login['sessionFile'])
+    sessions[login['user']] = [{'name':c.name, 'value':c.value, 'domain':c.domain, 'path':c.path, 'expires':c.expires, 'secure':c.secure} for c in session.cookies]
+    writeSessionFile(login['sessionFile'], sessions)
+
+# forgets the user's cookies in the session file
+def clearSessionCookies(sessionFile, user):
+    sessions = readSessionFile(sessionFile)
+    if user in sessions:
+        del sessions[user]
+        writeSessionFile(sessionFile, sessions)
+
+# returns the cookies of each user in the session file - {user:[cookie]}, a missing or unreadable file has none
+def readSessionFile(sessionFile):
+    try:
+        with open(sessionFile, mode='r') as file:
+            data = json.load(file)
+        if data.get('version') == SESSION_FILE_VERSION:
+            return data.get('sessions', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+# writes the session file, it is created only readable by the current user and replaced in one step
+def writeSessionFile(sessionFile, sessions):
+    tmpName = sessionFile + '.tmp'
+    if os.path.exists(tmpName):
+        os.remove(tmpName)
+    handle = os.open(tmpName, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(handle, mode='w') as file:
+        json.dump({'version':SESSION_FILE_VERSION, 'sessions':sessions}, file)
+    os.replace(tmpName, sessionFile)
 
 # getOrganisations returns a list of organisations and ids
 #
@@ -127,6 +562,11 @@ def getSession(user, pswd, proxy=False, proxyDict={}):
 #
 # Returns a list of organisation and id pairs
 def getOrganisations(session, proxy=False, proxyDict={}):
+    # check the cache first
+    organisations = cacheGet('organisations', '')
+    if organisations is not None:
+        return organisations
+
     # get an admin page
     url = SCHEDULA_BASE_URL + '/index.php?action=admin/appointments/appoint_by_week'
     r3 = getPage(session, url, proxy, proxyDict)
@@ -143,33 +583,10 @@ def getOrganisations(session, proxy=False, proxyDict={}):
     #  <option value="97">NPLSA</option>
     # </div></td>
     
-    # parse the html into useful tokens
-    text = r3.text
-    text = text.split('<form name="search_fixture">')
-    text = text[1]
-    text = text.split('<')
-
     # extract organisation values and strings
-    organisations = []
-    for i in range(len(text)):
-        # check if text is a competition option
-        if text[i].startswith('option'):
-            try:
-                t = text[i]
-                orgNum = t.split('"')[1]
-                orgName = (t.split('>')[1]).split('<')[0]
-                org = [orgNum, orgName]            
-                # Remove blank option
-                if orgNum != "":
-                    organisations.append(org)
-                    #print('  Organisation found: ' + orgNum + ' - ' + orgName)
-            except: # ignore blank ones
-                pass
-        
-        # check for the end of the form
-        elif text[i].startswith('/select'):
-            break
+    organisations = parser.parseOrganisations(r3.text)
 
+    cachePut('organisations', '', organisations)
     return organisations
 
 # getSeasons returns the season and season id's for the given organisation
@@ -181,6 +598,11 @@ def getOrganisations(session, proxy=False, proxyDict={}):
 #
 # Returns a list of season, id pairs
 def getSeasons(session, orgId, proxy=False, proxyDict={}):
+    # check the cache first
+    seasons = cacheGet('seasons', orgId)
+    if seasons is not None:
+        return seasons
+
     # HTTP data
     url = SCHEDULA_BASE_URL + '/index.php?action=admin/appointments/appoint_by_week'
     data = 'xjxfun=GetSeasons&xjxargs[]=S' + orgId + '&xjxargs[]=SAppointByWeek'
@@ -194,21 +616,9 @@ def getSeasons(session, orgId, proxy=False, proxyDict={}):
     # <option value="2817">2019</option>
     # ]]></cmd></xjx>
 
-    # split into useful tokens
-    text = r4.text
-    text = text.split('</option>')
-
-    seasons = []
-    for i in range(len(text)):
-        if i==0: # ignore the first one
-            pass
-        else:
-            if ']]' in text[i]: # check for end of list
-                break
-            seasonID = text[i].split('"')[1]
-            seasonName = text[i].split('>')[1]
-            seasons.append([seasonID, seasonName])
+    seasons = parser.parseSeasons(r4.text)
 
+    cachePut('seasons', orgId, seasons)
     return seasons
 
 
@@ -221,6 +631,11 @@ def getSeasons(session, orgId, proxy=False, proxyDict={}):
 #
 # Returns a list of week, id pairs
 def getSeasonWeeks(session, seasonID, proxy=False, proxyDict={}):
+    # check the cache first
+    weeks = cacheGet('seasonWeeks', seasonID)
+    if weeks is not None:
+        return weeks
+
     # HTTP data
     url = SCHEDULA_BASE_URL + '/index.php?action=admin/appointments/appoint_by_week'
     data = 'xjxfun=GetSeasonWeeks&xjxargs[]=S' + seasonID + '&xjxargs[]=SAppointByWeek'
@@ -236,23 +651,16 @@ def getSeasonWeeks(session, seasonID, proxy=False, proxyDict={}):
     # <option value="2020-10-26_2020-11-01">Week 34 (Oct 26 to Nov 1)</option>
     # </select>]]></cmd></xjx>
     
-    # split into tokens
-    text = r5.text.split('<')
-
     # get the weeks
-    weeks = []
-    for i in range(len(text)):
-        if text[i].startswith('option'): # check for a week in the token
-            try:
-                t = text[i]
-                weekID = t.split('"')[1]
-                weekName = (t.split('>')[1])
-                weeks.append([weekID, weekName])
-            except:
-                pass
-        elif text[i].startswith('/select'): # no more weeks
-            break
+    weeks = parser.parseSeasonWeeks(r5.text)
+
+    cachePut('seasonWeeks', seasonID, weeks)
 
+    # the dates of a season that has finished will not change, keep them for much longer than the weeks
+    if len(weeks) != 0:
+        span = [weekSpan(weeks[0][0])[0], weekSpan(weeks[-1][0])[1]]
+        if isSettled(span[1], date.today()):
+            cachePut('seasonSpans', seasonID, [str(span[0]), str(span[1])])
     return weeks
 
 
@@ -272,226 +680,201 @@ def getFixturesForWeek(session, seasonID, weekID, proxy=False, proxyDict={}):
     r6 = post(session, url, data, proxy, proxyDict)
 
     # response is a big table with each competition + some other random stuff
-
-    # split into tokens
-    text = r6.text.split('<')
-
-    # parse the table
-    fixtures = []
-    fixture = ['compName', 'date', 'time', 'home', 'away', 'ground', 'fixID']
-    for i in range(len(text)):
-        row = text[i]
-
-        # check for end of table
-        if row.startswith('/table>'):
-            break
-
-        # check for new competition
-        elif row.startswith('th colspan='):
-            #print("New comp")
-            fixture[0] = row.split('>')[1]
-            fixture[1] = ''
-            fixture[2] = ''
-            fixture[3] = ''
-            fixture[4] = ''
-            fixture[5] = ''
-            fixture[6] = ''
-
-        # Check for data
-        elif row.startswith('td'):
-            #print("Insert data")
-            try:
-                rowData = row.split('>')[1]
-
-                if rowData != 'v':
-                    if rowData != '&nbsp;':
-                        if fixture[1] == '':
-                            fixture[1] = rowData
-                        elif fixture[2] == '':
-                            fixture[2] = rowData
-                        elif fixture[3] == '':
-                            fixture[3] = rowData
-                        elif fixture[4] == '':
-                            fixture[4] = rowData
-                        elif fixture[5] == '':
-                            fixture[5] = rowData
-            except:
-                pass
-
-        # Check for fixture ID
-        elif row.startswith('u style='):
-            #print('Fix ID')
-            fixture[6] = (row.split('fixtureid=')[1]).split('&')[0]
-
-            # Add the fixture
-            fixtures.append(list(fixture))
-
-            # clear the fixture
-            fixture[1] = ''
-            fixture[2] = ''
-            fixture[3] = ''
-            fixture[4] = ''
-            fixture[5] = ''
-            fixture[6] = ''
+    fixtures = parser.parseFixtures(r6.text)
 
     # TODO: filter out U8-U11 to save time
 
     return fixtures
 
 
+# crawl walks organisations -> seasons -> weeks -> fixtures as a dependency graph. Each request is started as soon as
+# the request it depends on has returned, e.g. a season's weeks are requested while other organisations are still
+# being looked up, so the run time is set by the longest chain of requests rather than the sum of all of them.
+#
+# session       - session to use for connection to schedula
+# year          - only seasons with this name are crawled, or with one of these names if it is a list, '' crawls every
+#                 season
+# selectWeeks   - function(season, weeks) returning the weeks to get fixtures for, None gets every week
+#                   season - ['OrgID','Org','SID','SName']
+#                   weeks  - list of [WID, WName] as returned by getSeasonWeeks
+# useProxy      - use an http proxy if true
+# proxyDict     - address of proxy
+# workers       - maximum number of requests in flight at once
+# selectSeason  - function(season) returning false for seasons whose weeks are not needed, None gets every season
+#                   season - ['OrgID','Org','SID','SName']
+#
+# returns - {'organisations':organisations, 'seasons':seasons, 'weeks':weeks, 'fixtures':fixtures} in the order a
+#           sequential crawl would give them, regardless of the order the requests completed in
+#       organisations - ['OrgID','OrgName']
+#       seasons       - ['OrgID','Org','SID','SName']
+#       weeks         - ['OrgID','Org','SID','SName','WID','WName']
+#       fixtures      - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
+def crawl(session, year='', selectWeeks=None, useProxy=False, proxyDict={}, workers=DEFAULT_WORKERS, selectSeason=None):
+    organisations = getOrganisations(session, useProxy, proxyDict)
+
+    # each node holds its row and the nodes found below it, so results land in order whichever request finishes first
+    orgNodes = [{'row':list(org), 'children':[]} for org in organisations]
+
+    pending = {} # future -> (stage, node)
+    weeksFound = 0
+    weeksDone = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for node in orgNodes:
+            future = executor.submit(getSeasons, session, node['row'][0], useProxy, proxyDict)
+            pending[future] = ('seasons', node)
+
+        while len(pending) != 0:
+            done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                stage, node = pending.pop(future)
+                result = future.result()
+
+                # organisation -> seasons, start getting the weeks of each requested season
+                if stage == 'seasons':
+                    for se in result:
+                        row = node['row'] + [se[0], se[1]]
+                        if isSelectedSeason(se[1], year) and ((selectSeason is None) or selectSeason(row)):
+                            child = {'row':row, 'children':[]}
+                            node['children'].append(child)
+                            future = executor.submit(getSeasonWeeks, session, se[0], useProxy, proxyDict)
+                            pending[future] = ('weeks', child)
+
+                # season -> weeks, start getting the fixtures of each selected week
+                elif stage == 'weeks':
+                    if selectWeeks is not None:
+                        result = selectWeeks(node['row'], result)
+                    for w in result:
+                        child = {'row':node['row'] + [w[0], w[1]], 'children':[]}
+                        node['children'].append(child)
+                        future = executor.submit(getFixturesForWeek, session, node['row'][2], w[0], useProxy, proxyDict)
+                        pending[future] = ('fixtures', child)
+                        weeksFound = weeksFound + 1
+
+                # week -> fixtures
+                else:
+                    for f in result:
+                        node['children'].append(Fixture(*node['row'], *f))
+                    weeksDone = weeksDone + 1
+                    print('\r',end='')
+                    print(str(weeksDone) + '/' + str(weeksFound) + ' weeks', end='')
+
+    # flatten the tree
+    seasons = []
+    weeks = []
+    fixtures = []
+    for org in orgNodes:
+        for season in org['children']:
+            seasons.append(season['row'])
+            for week in season['children']:
+                weeks.append(week['row'])
+                fixtures.extend(week['children'])
+
+    return {'organisations':organisations, 'seasons':seasons, 'weeks':weeks, 'fixtures':fixtures}
+
+
 # pullAll gets all the fixtures and appointments for the given year and outputs two csv's
 #
 # session            - session to use for connection to schedula
-# year               - calander year to pull from, e.g. '2020'
+# year               - calander year to pull from, e.g. '2020', or a list of years, e.g. ['2019', '2020']
 # fixturesFile       - file name to store fixtures in
 # appointmentsFile   - file name to store appointments in
 # useProxy           - use an http proxy if true
 # proxyDict          - address of proxy
+# workers            - number of concurrent appointment lookups
+# snapshot           - snapshot of previous pulls (see loadSnapshot). If given only what could have changed is fetched,
+#                      the snapshot is updated and the changes are returned as 'delta' (see updateSnapshot)
+# stream             - if true (and there is no snapshot) the appointments are not looked up before returning, they are
+#                      returned as 'appointmentStream' instead of 'appointmentList' (see streamAppointments)
+#                      along with the 'weeks' fetched and the 'rawFixtures' found in them (see crawl)
 #
 # returns - {'fixturesList':fixtures,'appointmentList':appointments}
 #       fixtures     - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
 #       appointments - ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
-def pullAll(session, year='2020', fixturesFile='Fixtures.csv', appointmentsFile='Appointments.csv', useProxy=False, proxyDict={}):
+def pullAll(session, year='2020', fixturesFile='Fixtures.csv', appointmentsFile='Appointments.csv', useProxy=False, proxyDict={}, workers=DEFAULT_WORKERS, snapshot=None, stream=False):
     ##################
     ##   Fixtures   ##
     ##################
-    # Get Organisations and ID's
-    # Getting organisations
-    print('Getting organisations...')
+    # don't get weeks that are already in the snapshot and have finished
+    selectWeeks = None
+    skippedWeeks = set()
+    if snapshot is not None:
+        selectWeeks = unsettledWeeks(snapshot, None, skippedWeeks)
 
-    organisations = getOrganisations(session, useProxy, proxyDict)
-
-    print('Found ' + str(len(organisations)) + ' Organisations')
-    print(organisations)
-
-    # Step 1: Get seasons and ID's
-    print('Getting Seasons...')
-
-    seasons = []
+    # Get organisations, seasons, weeks and fixtures
+    print('Getting organisations, seasons, weeks and fixtures...')
 
-    for org in organisations:
-        orgNum = org[0]
-        orgName = org[1]
-        s = getSeasons(session, orgNum, useProxy, proxyDict)
+    data = crawl(session, year, selectWeeks, useProxy, proxyDict, workers)
 
-        for se in s:
-            seasons.append([orgNum, orgName, se[0], se[1]])
+    print('\n')
+    print('Found ' + str(len(data['organisations'])) + ' Organisations')
+    print(data['organisations'])
 
     print('Found Seasons:')
     print("['OrgID','Org','SID','SName']")
-    print(seasons)
-
-    # select the requested year
-    if year != '':
-        removes = []
-        for s in seasons:
-            if s[3] != year:
-                removes.append(s)
-
-        for r in removes:
-            seasons.remove(r)
-
-
-    # Step 2: Get season weeks (based on season ID)
-    print('Getting season weeks...')
-    weeks = []
-    for season in seasons:
-        seasonID = season[2]
-        ws = getSeasonWeeks(session, seasonID, useProxy, proxyDict)
-
-        for w in ws:
-            weeks.append([season[0], season[1], season[2], season[3], w[0], w[1]])
-
-
+    print(data['seasons'])
 
     print('Found Weeks:')
     print("['OrgID','Org','SID','SName','WID','WName']")
-    for week in weeks:
+    for week in data['weeks']:
         print(week)
 
-    # Step 3: Get Fixtures for week (based on season and week)
-    print("\nGetting Fixtures...")
     fixture = ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
     fixtures = []
-    #fixtures.append(list(fixture))
-    perCent = 1 / float(len(weeks))
-    count = 0
+    for f in data['fixtures']:
+        # check balcklist
+        if not isBlacklisted(f[6]):
+            fixtures.append(f)
 
-    for week in weeks:
+    # add the fixtures of the weeks that were not fetched
+    if snapshot is not None:
+        fixtures.extend(snapshotFixtures(snapshot, skippedWeeks))
 
-        orgNum = week[0]
-        orgName = week[1]
-        seasonID = week[2]
-        seasonName = week[3]
-        weekID = week[4]
-        weekName = week[5]
+    # streamed appointments come in the order of the fixtures, sort them now so the output needs no sort later
+    stream = stream and (snapshot is None)
+    if stream:
+        fixtures.sort(key=lambda f: f[12])
 
-        # get the fixtures for the week
-        fixs = getFixturesForWeek(session, seasonID, weekID, useProxy, proxyDict)
-
-        for f in fixs:
-            # check balcklist
-            if not isBlacklisted(f[0]):
-                fixtures.append([orgNum,orgName,seasonID,seasonName,weekID,weekName,f[0],f[1],f[2],f[3],f[4],f[5],f[6]])
-
-        count = count+1
-        total = count * perCent
-        print('\r',end='')
-        print("%.2f" % (total*100), end='')
-        print('%',end='')
-
-
-    print('\n')
     print("Found " + str(len(fixtures)) + " Fixtures\n")
 
     # output fixtures to CSV
     if fixturesFile != '':
-        output = []
-        output.append(fixture)
-        for f in fixtures:
-            output.append(list(f))
         with open(fixturesFile,"w",newline='') as file:
             writer = csv.writer(file)
-            writer.writerows(output)
+            writer.writerow(fixture)
+            writer.writerows(fixtures)
         print ("Output fixtures to CSV")
 
     ##################
     ## Appointments ##
     ##################
-    if(len(fixtures) == 0):
+    if(len(fixtures) == 0) and (snapshot is None):
         return
 
-    print("Getting appointments...\n")
-    appointments = []
-    appointments.append(['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus'])
-    perCent = 1/float(len(fixtures))
-    count = 0
-    for f in fixtures:
-        fixtureID = f[12]
-        match = lookupFixture(session, fixtureID)
-
-        if len(match) != 0:
-            appointments.extend(match.copy())
-        count = count+1
-        total = count * perCent
+    if stream:
+        return {'fixturesList':fixtures, 'appointmentStream':streamAppointments(session, fixtures, appointmentsFile, workers, useProxy, proxyDict), 'weeks':data['weeks'], 'rawFixtures':data['fixtures']}
 
-        print("\r",end='')
-        print("%.2f" % (total*100), end='')
-        print("%", end='')
+    print("Getting appointments...\n")
+    if snapshot is None:
+        appointments = lookupFixtures(session, [f[12] for f in fixtures], workers, useProxy, proxyDict)
+    else:
+        appointments = lookupUnsettledFixtures(session, snapshot, fixtures, workers, useProxy, proxyDict)
 
-    print("Found " + str(len(appointments)-1) + " appointments")
+    print("Found " + str(len(appointments)) + " appointments")
 
     # save the appointments to a csv
     if appointmentsFile != '':
         with open(appointmentsFile,"w",newline='') as file:
             writer = csv.writer(file)
-            writer. writerows(appointments)
+            writer.writerow(APPOINTMENT_HEADER)
+            writer.writerows(appointments)
         print("Output appointments to csv")
 
-    if len(appointments) > 1:
-        return {'fixturesList':fixtures,'appointmentList':appointments[1:]}
-    else:
-        return {'fixturesList':fixtures,'appointmentList':[]}
+    result = {'fixturesList':fixtures,'appointmentList':appointments}
+    if snapshot is not None:
+        result['delta'] = updateSnapshot(snapshot, data['weeks'], data['fixtures'], fixtures, result['appointmentList'])
+    return result
 
 # update28 gets all the fixtures and appointments for the next 28 days and updates or creates the csv
 #
@@ -501,53 +884,20 @@ def pullAll(session, year='2020', fixturesFile='Fixtures.csv', appointmentsFile=
 # appointmentsFile   - file name to store appointments in
 # useProxy           - use an http proxy if true
 # proxyDict          - address of proxy
+# workers            - number of concurrent appointment lookups
+# snapshot           - snapshot of previous pulls (see loadSnapshot). If given only what could have changed is fetched,
+#                      the snapshot is updated and the changes are returned as 'delta' (see updateSnapshot)
+# stream             - if true (and there is no snapshot) the appointments are not looked up before returning, they are
+#                      returned as 'appointmentStream' instead of 'appointmentList' (see streamAppointments)
+#                      along with the 'weeks' fetched and the 'rawFixtures' found in them (see crawl)
 #
 # returns - {'fixturesList':fixtures,'appointmentList':appointments}
 #       fixtures     - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
 #       appointments - ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
-def update28(session, year='', fixturesFile='Fixtures28.csv', appointmentsFile='Appointments28.csv', startDate=date.today(), numberDays=28, useProxy=False, proxyDict={}):
+def update28(session, year='', fixturesFile='Fixtures28.csv', appointmentsFile='Appointments28.csv', startDate=date.today(), numberDays=28, useProxy=False, proxyDict={}, workers=DEFAULT_WORKERS, snapshot=None, stream=False):
     ##################
     ##   Fixtures   ##
     ##################
-    # Get Organisations and ID's
-    # Getting organisations
-    print('Getting organisations...')
-
-    organisations = getOrganisations(session, useProxy, proxyDict)
-
-    print('Found ' + str(len(organisations)) + ' Organisations')
-    print(organisations)
-
-    # Step 1: Get seasons and ID's
-    print('Getting Seasons...')
-
-    seasons = []
-
-    for org in organisations:
-        orgNum = org[0]
-        orgName = org[1]
-        s = getSeasons(session, orgNum, useProxy, proxyDict)
-
-        for se in s:
-            seasons.append([orgNum, orgName, se[0], se[1]])
-
-    print('Found Seasons:')
-    print("['OrgID','Org','SID','SName']")
-    print(seasons)
-
-    # select the requested year
-    if year != '':
-        removes = []
-        for s in seasons:
-            if s[3] != year:
-                removes.append(s)
-
-        for r in removes:
-            seasons.remove(r)
-
-
-    # Step 2: Get season weeks (based on season ID)
-    print('Getting season weeks...')
     # Calculate end date - use 30 days to ensure complete coverage
     startDate = startDate - timedelta(days=1)
     endDate = startDate + timedelta(days=(numberDays+2))
@@ -555,73 +905,61 @@ def update28(session, year='', fixturesFile='Fixtures28.csv', appointmentsFile='
     #print('numDays = ' + str(numberDays))
     #print('s: ' + str(startDate) + ' e: ' + str(endDate))
 
-    weeks = []
-    for season in seasons:
-        seasonID = season[2]
-        ws = getSeasonWeeks(session, seasonID, useProxy, proxyDict)
+    # grab the weeks either side of the date range, just to make sure
+    marginStart = startDate - timedelta(days=WEEK_MARGIN_DAYS)
+    marginEnd = endDate + timedelta(days=WEEK_MARGIN_DAYS)
 
+    # select the weeks that overlap the date range
+    def selectWeeks(season, ws):
+        selected = []
         for w in ws:
-            weekID = w[0]
-            dateStrings = weekID.split('_')
-            # grab the week either side of the date range, just to make sure
-            wstart = stringToDate(dateStrings[0])
-            wstart2 = stringToDate(dateStrings[0]) - timedelta(days=7)
-            wend = stringToDate(dateStrings[1])
-            wend2 = stringToDate(dateStrings[1]) + timedelta(days=7)
+            wstart, wend = weekSpan(w[0])
+            if overlaps(wstart, wend, marginStart, marginEnd):
+                selected.append(w)
+        return selected
+
+    # don't get weeks that are already in the snapshot and have finished
+    skippedWeeks = set()
+    if snapshot is not None:
+        selectWeeks = unsettledWeeks(snapshot, selectWeeks, skippedWeeks)
 
-            if ((wstart >= startDate) and (wstart <= endDate)) or ((wend >= startDate) and (wend <= endDate)) or ((wstart2 >= startDate) and (wstart2 <= endDate)) or ((wend2 >= startDate) and (wend2 <= endDate)):
-                weeks.append([season[0], season[1], season[2], season[3], w[0], w[1]])
+    # Get organisations, seasons, weeks and fixtures, the weeks of seasons that cannot overlap the date range are not
+    # requested
+    print('Getting organisations, seasons, weeks and fixtures...')
 
+    data = crawl(session, year, selectWeeks, useProxy, proxyDict, workers, seasonsBetween(marginStart, marginEnd))
+
+    print('\n')
+    print('Found ' + str(len(data['organisations'])) + ' Organisations')
+    print(data['organisations'])
+
+    print('Found Seasons:')
+    print("['OrgID','Org','SID','SName']")
+    print(data['seasons'])
 
     print('Looking at Weeks:')
     print("['OrgID','Org','SID','SName','WID','WName']")
-    for week in weeks:
+    for week in data['weeks']:
         print(week)
 
-    # Step 3: Get Fixtures for week (based on season and week)
-    print("\nGetting Fixtures...")
     fixture = ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
     fixtures = []
     reject = []
-    #fixtures.append(list(fixture))
-    perCent = 1 / float(len(weeks))
-    count = 0
-    mounthToInt = dict((v,k) for k,v in enumerate(calendar.month_abbr))
-    for week in weeks:
-
-        orgNum = week[0]
-        orgName = week[1]
-        seasonID = week[2]
-        seasonName = week[3]
-        weekID = week[4]
-        weekName = week[5]
-
-        # get the fixtures for the week
-        fixs = getFixturesForWeek(session, seasonID, weekID, useProxy, proxyDict)
-
-        for f in fixs:
-            # check balcklist
-            if not isBlacklisted(f[0]):
-                # get fixture date
-                fixtureDateStrs = f[1].split(' ') # e.g. ['Sat', 'Feb', '8']
-                day = int(fixtureDateStrs[2])
-                month = int(mounthToInt[fixtureDateStrs[1]])
-                year = int(seasonName)
-                fixtureDate = date(year,month,day)
-
-                if (fixtureDate >= startDate and fixtureDate <= endDate):
-                    fixtures.append([orgNum,orgName,seasonID,seasonName,weekID,weekName,f[0],f[1],f[2],f[3],f[4],f[5],f[6]])
-            else:
-                reject.append(f[0])
-
-        count = count+1
-        total = count * perCent
-        print('\r',end='')
-        print("%.2f" % (total*100), end='')
-        print('%',end='')
-
+    candidates = data['fixtures']
+    # add the fixtures of the weeks that were not fetched
+    if snapshot is not None:
+        candidates = candidates + snapshotFixtures(snapshot, skippedWeeks)
+
+    # check each fixture's own date, a fixture can be moved outside the dates of its week
+    for f in candidates:
+        # check balcklist
+        if not isBlacklisted(f[6]):
+            d = fixtureDate(f)
+            if (d >= startDate and d <= endDate):
+                fixtures.append(f)
+        else:
+            reject.append(f[6])
 
-    print('\n')
     print("Found " + str(len(fixtures)) + " Fixtures after rejecting " + str(len(reject)) + ". Competitions rejected:")
 
     # get unique and print
@@ -631,123 +969,395 @@ def update28(session, year='', fixturesFile='Fixtures28.csv', appointmentsFile='
             printList.append(r)
     print(printList)
 
+    # streamed appointments come in the order of the fixtures, sort them now so the output needs no sort later
+    stream = stream and (snapshot is None)
+    if stream:
+        fixtures.sort(key=lambda f: f[12])
 
     ##################
     ## Appointments ##
     ##################
-    if(len(fixtures) == 0):
+    if(len(fixtures) == 0) and (snapshot is None):
         return
 
-    print("\nGetting appointments...\n")
-    appointments = []
-    appointments.append(['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus'])
-    perCent = 1/float(len(fixtures))
-    count = 0
-    for f in fixtures:
-        fixtureID = f[12]
-        match = lookupFixture(session, fixtureID)
-
-        if len(match) != 0:
-            appointments.extend(match.copy())
-        count = count+1
-        total = count * perCent
+    if stream:
+        # output fixtures to CSV, the appointments are written as they are streamed
+        if fixturesFile != '':
+            with open(fixturesFile,"w",newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(fixture)
+                writer.writerows(fixtures)
+            print ("Output fixtures to CSV")
+        return {'fixturesList':fixtures, 'appointmentStream':streamAppointments(session, fixtures, appointmentsFile, workers, useProxy, proxyDict), 'weeks':data['weeks'], 'rawFixtures':data['fixtures']}
 
-        print("\r",end='')
-        print("%.2f" % (total*100), end='')
-        print("%", end='')
+    print("\nGetting appointments...\n")
+    if snapshot is None:
+        appointments = lookupFixtures(session, [f[12] for f in fixtures], workers, useProxy, proxyDict)
+    else:
+        appointments = lookupUnsettledFixtures(session, snapshot, fixtures, workers, useProxy, proxyDict)
 
     # write csv's
     # save the appointments to a csv
-    print("Found " + str(len(appointments)-1) + " appointments")
+    print("Found " + str(len(appointments)) + " appointments")
 
     if appointmentsFile != '':
         with open(appointmentsFile,"w",newline='') as file:
             writer = csv.writer(file)
-            writer. writerows(appointments)
+            writer.writerow(APPOINTMENT_HEADER)
+            writer.writerows(appointments)
         print("Output appointments to csv")
 
     # output fixtures to CSV
     if fixturesFile != '':
-        output = []
-        output.append(fixture)
-        for f in fixtures:
-            output.append(list(f))
         with open(fixturesFile,"w",newline='') as file:
             writer = csv.writer(file)
-            writer.writerows(output)
+            writer.writerow(fixture)
+            writer.writerows(fixtures)
         print ("Output fixtures to CSV")
 
     # return fixtures and appointments
-    if len(appointments) > 1:
-        return {'fixturesList':fixtures,'appointmentList':appointments[1:]}
-    else:
-        return {'fixturesList':fixtures,'appointmentList':[]}
+    result = {'fixturesList':fixtures,'appointmentList':appointments}
+    if snapshot is not None:
+        result['delta'] = updateSnapshot(snapshot, data['weeks'], data['fixtures'], fixtures, result['appointmentList'])
+    return result
+
+# streamAppointments looks up the appointments of each fixture and yields them one fixture at a time, in the order of
+# fixtures, as the lookups finish. Only the lookups in flight are held in memory, however many fixtures there are. The
+# lookups start when the stream is first read.
+#
+# session            - session to use for connection to schedula
+# fixtures           - fixtures to look up
+# appointmentsFile   - file name to write the appointments to as they are streamed, '' for none
+# workers            - number of concurrent appointment lookups
+# useProxy           - use an http proxy if true
+# proxyDict          - address of proxy
+#
+# yields - (fixture, appointments) for each fixture, see lookupFixture for the format of appointments
+def streamAppointments(session, fixtures, appointmentsFile='', workers=DEFAULT_WORKERS, useProxy=False, proxyDict={}):
+    print("\nGetting appointments...\n")
+
+    file = None
+    writer = None
+    if appointmentsFile != '':
+        file = open(appointmentsFile,"w",newline='')
+        writer = csv.writer(file)
+        writer.writerow(APPOINTMENT_HEADER)
+
+    count = 0
+    try:
+        for fixture, appointments in zip(fixtures, streamLookups(session, [f[12] for f in fixtures], workers, useProxy, proxyDict)):
+            if writer is not None:
+                writer.writerows(appointments)
+            count = count + len(appointments)
+            yield fixture, appointments
+    finally:
+        if file is not None:
+            file.close()
+
+    print("\nFound " + str(count) + " appointments")
+    if file is not None:
+        print("Output appointments to csv")
+
+##########################
+##  Incremental pulls   ##
+##########################
+# A snapshot holds the fixtures and appointments of previous pulls, keyed by fixture id, and the weeks that have been
+# fetched with all of their fixtures kept. It is a dict - {'weeks':{weekKey:dateFetched}, 'fixtures':{fixtureID:fixture}, 'appointments':{fixtureID:[appointment]}}
+#       fixture      - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
+#       appointment  - ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+
+# loadSnapshot reads a snapshot from a json file, an empty snapshot is returned if the file does not exist
+def loadSnapshot(filename):
+    snapshot = {'version':SNAPSHOT_VERSION, 'weeks':{}, 'fixtures':{}, 'appointments':{}}
+    try:
+        with open(filename, mode='r') as file:
+            data = json.load(file)
+        if data.get('version') == SNAPSHOT_VERSION:
+            snapshot = data
+    except (OSError, ValueError):
+        pass
+
+    return snapshot
+
+# saveSnapshot writes the snapshot to a json file, replacing the file in one step
+def saveSnapshot(snapshot, filename):
+    tmpName = filename + '.tmp'
+    with open(tmpName, mode='w') as file:
+        json.dump(snapshot, file)
+    os.replace(tmpName, filename)
+
+# returns the key of a week in the snapshot
+def weekKey(seasonID, weekID):
+    return seasonID + '|' + weekID
+
+# returns true if the given date is old enough that nothing about it should change any more
+def isSettled(d, today):
+    return d < today - timedelta(days=SETTLED_DAYS)
+
+# unsettledWeeks returns a selectWeeks function for crawl that leaves out the weeks already in the snapshot that have
+# settled. The keys of the weeks left out are added to skipped
+#
+# snapshot      - snapshot of previous pulls
+# selectWeeks   - selectWeeks function to apply first, None for all weeks
+# skipped       - set to add the keys of the skipped weeks to
+def unsettledWeeks(snapshot, selectWeeks, skipped):
+    today = date.today()
+
+    def select(season, ws):
+        if selectWeeks is not None:
+            ws = selectWeeks(season, ws)
+
+        selected = []
+        for w in ws:
+            key = weekKey(season[2], w[0])
+            if (key in snapshot['weeks']) and isSettled(stringToDate(w[0].split('_')[1]), today):
+                skipped.add(key)
+            else:
+                selected.append(w)
+        return selected
+
+    return select
+
+# returns the fixtures in the snapshot from the given weeks
+def snapshotFixtures(snapshot, weekKeys):
+    return [f for f in snapshot['fixtures'].values() if weekKey(f[2], f[4]) in weekKeys]
+
+# returns all the fixtures and appointments in the snapshot - [fixtures, appointments]
+def snapshotLists(snapshot):
+    fixtures = list(snapshot['fixtures'].values())
+    appointments = []
+    for f in fixtures:
+        appointments.extend(snapshot['appointments'].get(f[12], []))
+    return [fixtures, appointments]
+
+# lookupUnsettledFixtures returns the appointments for the given fixtures, only fixtures that are not in the snapshot or
+# have not settled are looked up in schedula
+#
+# session       - session to use for connection to schedula
+# snapshot      - snapshot of previous pulls
+# fixtures      - fixtures to get the appointments of
+# workers       - maximum number of lookups in flight at once
+# proxy         - use an http proxy if true
+# proxyDict     - address of proxy
+#
+# Returns a list of appointments in the same order as fixtures (see lookupFixture for the format)
+def lookupUnsettledFixtures(session, snapshot, fixtures, workers=DEFAULT_WORKERS, proxy=False, proxyDict={}):
+    today = date.today()
+    lookupIDs = []
+    for f in fixtures:
+        if not ((f[12] in snapshot['appointments']) and isSettled(fixtureDate(f), today)):
+            lookupIDs.append(f[12])
+
+    print('Looking up ' + str(len(lookupIDs)) + ' of ' + str(len(fixtures)) + ' fixtures')
+    lookupSet = set(lookupIDs)
+
+    # group the fetched appointments by fixture
+    fetched = {}
+    for a in lookupFixtures(session, lookupIDs, workers, proxy, proxyDict):
+        fetched.setdefault(a[0], []).append(a)
+
+    appointments = []
+    for f in fixtures:
+        if f[12] in fetched:
+            appointments.extend(fetched[f[12]])
+        elif f[12] not in lookupSet:
+            appointments.extend(snapshot['appointments'][f[12]])
+
+    return appointments
+
+# updateSnapshot merges the results of a pull into the snapshot and returns what changed
+#
+# snapshot      - snapshot of previous pulls, updated in place
+# weeks         - the weeks that were fetched - ['OrgID','Org','SID','SName','WID','WName']
+# rawFixtures   - every fixture found in those weeks, before any filtering
+# fixtures      - the fixtures that were pulled
+# appointments  - the appointments of those fixtures
+#
+# returns - {'added':fixtures, 'removed':fixtures, 'changed':fixtures, 'appointments':fixtureIDs}
+#       added        - fixtures not in the snapshot
+#       removed      - fixtures in the snapshot that are no longer in their week, or are now blacklisted
+#       changed      - fixtures whose details differ from the snapshot
+#       appointments - ids of the fixtures, already in the snapshot, whose appointments differ from the snapshot
+def updateSnapshot(snapshot, weeks, rawFixtures, fixtures, appointments):
+    delta = {'added':[], 'removed':[], 'changed':[], 'appointments':[]}
+
+    # remove fixtures that have gone from the weeks that were fetched
+    fetchedWeeks = set(weekKey(w[2], w[4]) for w in weeks)
+    found = set(f[12] for f in rawFixtures if not isBlacklisted(f[6]))
+    for fid, f in list(snapshot['fixtures'].items()):
+        if (weekKey(f[2], f[4]) in fetchedWeeks) and (fid not in found):
+            delta['removed'].append(f)
+            del snapshot['fixtures'][fid]
+            snapshot['appointments'].pop(fid, None)
+
+    # group appointments by fixture
+    byFixture = {}
+    for a in appointments:
+        byFixture.setdefault(a[0], []).append(list(a))
+
+    # add or update fixtures and appointments
+    for f in fixtures:
+        fid = f[12]
+        old = snapshot['fixtures'].get(fid)
+        if old is None:
+            delta['added'].append(f)
+        else:
+            if old != list(f):
+                delta['changed'].append(f)
+            if snapshot['appointments'].get(fid, []) != byFixture.get(fid, []):
+                delta['appointments'].append(fid)
+
+        snapshot['fixtures'][fid] = list(f)
+        snapshot['appointments'][fid] = byFixture.get(fid, [])
+
+    # a week is only fetched once all its fixtures are in the snapshot, pullN leaves out those outside its dates
+    kept = set(f[12] for f in fixtures)
+    partWeeks = set(weekKey(f[2], f[4]) for f in rawFixtures if (f[12] in found) and (f[12] not in kept))
+
+    today = str(date.today())
+    for k in fetchedWeeks - partWeeks:
+        snapshot['weeks'][k] = today
+
+    return delta
 
 # processAppointments applies the given appointments to schedula
 #
 # appointments  - list of dicts - {'fixtureID':fid,     # fixture id
 #                                  'appointList':[],    # list of appointments in the form {'name':name, 'role':role} where role is one of 'R', 'AR1', 'AR2', 'M', 'A', '4'
 #                                   }
-# people        - list of names and person id's
+# people        - list of names and person id's, or a PersonResolver
+# useProxy      - use an http proxy if true
+# proxyDict     - address of proxy
+# workers       - maximum number of fixtures pushed at once, 1 pushes them one after the other
+# pages         - dict of fixture id to appoint match page for fixtures that have already been fetched, see getMatchPages
+# verify        - if true each fixture is looked up again after it is saved, otherwise the appointments returned are
+#                 worked out from the changes made
+#
+# Each fixture is pushed by one thread, so its requests are made in order, and different fixtures are pushed at the
+# same time. A fixture that fails is discarded and closed on its own and does not stop the others. The output of each
+# fixture is printed in one block when it finishes.
 #
 # returns a list of appointments for the fixtures after updating
-def pushAppointments(session, appointments, people, useProxy=False, proxyDict={}):
+def pushAppointments(session, appointments, people, useProxy=False, proxyDict={}, workers=DEFAULT_WORKERS, pages={}, verify=False):
     
     # appointFixture(session, fixtureID, appointData, proxy=False, proxyDict={})
 
-    updatedAppointments = [] # ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+    # check every name before making any changes
+    if not isinstance(people, PersonResolver):
+        people = PersonResolver(people)
+        people.resolveAppointments(appointments)
 
+    # person ids for each fixture - [fixtureID, [[personID, role]]]
+    jobs = []
     for match in appointments:
-        fixtureID = match['fixtureID']
-        appointList = match['appointList']
-
         appointData = []
-        for a in appointList:
-            personID = getPersonID(a['name'],people)
-            appointData.append([personID, a['role']])
+        for a in match['appointList']:
+            appointData.append([people.resolve(a['name']), a['role']])
+        jobs.append([match['fixtureID'], appointData])
+
+    # push one fixture, returns [succeeded, appointments after updating]
+    def pushFixture(job):
+        fixtureID, appointData = job
+        sys.stdout.capture()
+        sys.stderr.capture()
+        try:
+            updated = appointFixture(session, fixtureID, appointData, proxy=useProxy, proxyDict=proxyDict, page=pages.get(fixtureID))
+            if updated is None:
+                return [False, []]
+            if verify:
+                updated = lookupFixture(session, fixtureID, useProxy, proxyDict)
+            return [True, updated]
+        except Exception:
+            print('Push <' + fixtureID + '> Failed. Error information below:')
+            traceback.print_exc()
+            return [False, []]
+        finally:
+            with ThreadOutput.lock:
+                sys.stdout.release()
+                sys.stderr.release()
 
-        appointFixture(session, fixtureID, appointData)
+    updatedAppointments = [] # ['fixtureID','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+    failed = []
 
-        for a in lookupFixture(session, fixtureID):
-            updatedAppointments.append(a)
+    stdout = sys.stdout
+    stderr = sys.stderr
+    sys.stdout = ThreadOutput(stdout)
+    sys.stderr = ThreadOutput(stderr)
+    try:
+        # map returns the results in the order of the appointments
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for job, result in zip(jobs, executor.map(pushFixture, jobs)):
+                if result[0]:
+                    updatedAppointments.extend(result[1])
+                else:
+                    failed.append(job[0])
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+
+    print('\nPushed ' + str(len(jobs) - len(failed)) + ' of ' + str(len(jobs)) + ' fixtures')
+    if failed:
+        print('Failed fixtures: ' + str(failed))
     
     return updatedAppointments
 
 
+# returns the roles in a row of a csv written by writeToCsv - {'R':name, 'AR1':name, 'AR2':name, 'M':name, 'A':name, '4':name, 'Other':name}
+def storedRoles(row):
+    return {'R':row['Referee'], 'AR1':row['AR1'], 'AR2':row['AR2'], 'M':row['Mentor'], 'A':row['Assessor'], '4':row['4th Official'], 'Other':row['Other']}
+
+# planPush works out the changes a push would make without contacting schedula, using the stored appointments in place
+# of schedula's. The same rules as planAppointments are used: an appointment is removed if its role is given to someone
+# else (a blank role clears it) or its official is given another role.
+#
+# appointments  - appointments to push, see readAppointmentList
+# stored        - FixtureIndex of the rows of a csv written by writeToCsv
+# people        - PersonResolver, every name must resolve
+#
+# Returns a list with an entry for each fixture - {'fixtureID':fid,
+#                                                  'rejected':reason the fixture would not be pushed, '' if it would,
+#                                                  'operations':[[operation, role, name]]} where operation is one of
+#                                                  'unappoint', 'appoint' or 'keep'
+def planPush(appointments, stored, people):
+    plans = []
+    for match in appointments:
+        fixtureID = match['fixtureID']
+        plan = {'fixtureID':fixtureID, 'rejected':'', 'operations':[]}
+        plans.append(plan)
+
+        row = stored.fixture(fixtureID)
+        if row is None:
+            plan['rejected'] = 'not in the stored file'
+            continue
+        if row['Status'] != 'ok':
+            plan['rejected'] = 'status is ' + row['Status']
+            continue
+
+        exsisting = [[role, name] for role, name in storedRoles(row).items() if name != '']
+        wanted = [[a['role'], people.nameOf(people.resolve(a['name'])) if a['name'] != '' else ''] for a in match['appointList']]
+
+        for role, name in exsisting:
+            for wantedRole, wantedName in wanted:
+                if ((role == wantedRole) and (name != wantedName)) or ((name == wantedName) and (role != wantedRole)):
+                    plan['operations'].append(['unappoint', role, name])
+                    break
+
+        for role, name in wanted:
+            if [role, name] in exsisting:
+                plan['operations'].append(['keep', role, name])
+            elif name != '':
+                plan['operations'].append(['appoint', role, name])
+
+    return plans
+
 # returns the person id of the name in the list of people, '' is returned for no match
 #
 # name      - string
 # people    - list of {'name':name, 'personID':pid}
+#
+# Use a PersonResolver to look up more than one name
 def getPersonID(name, people=[]):
-    pid = ''
-
-    if name == '':
-        return ''
-
-    # attempt exact match
-    for p in people:
-        if p['name'] == name:
-            pid = p['personID']
-            break
-    
-    # attempt close match
-    if (pid == ''):
-        names = name.split(' ')
-        for p in people:
-            match = True
-            for n in names:
-                n = n.replace(',','')
-                str1 = n.casefold()
-                str2 = p['name'].casefold()
-                if (str1 not in str2):
-                    match = False
-            if match:
-                pid = p['personID']
-
-    if pid == '':
-        raise Exception('Person: ' + name + 'Not Found')
-
-    return pid
+    return PersonResolver(people).resolve(name)
                 
 # reads a csv of appointments in the form fixtureID,R,AR1,AR2,M,A,4
 # returns a list of dicts - {'fixtureID':fid,     # fixture id
@@ -789,116 +1399,58 @@ def readCSV(filename):
 # personsFile        - file name to store people in
 # useProxy           - use an http proxy if true
 # proxyDict          - address of proxy
+# workers            - number of concurrent requests
 #
-# A list of dicts is returned in the form {'name':name, 'personID':pid}
-def getOfficials(session, year='2020', pannel='', personsFile='People.csv', useProxy=False, proxyDict={}):
-    # get organisations
-    organisations = getOrganisations(session, useProxy, proxyDict)
-
-    # get seasons
-    seasons = []
-    for org in organisations:
-        orgNum = org[0]
-        orgName = org[1]
-        s = getSeasons(session, orgNum, useProxy, proxyDict)
-
-        for se in s:
-            seasons.append([orgNum, orgName, se[0], se[1]])
-
-    # print('Found Seasons:')
-    # #print("['OrgID','Org','SID','SName']")
-    # for ss in seasons:
-    #     print(ss)
-
-    # select based on year
-    if year != '':
-        removes = []
-        for ss in seasons:
-            if ss[3] != year:
-                removes.append(ss)
-
-        for r in removes:
-            seasons.remove(r)
-
-    
-    # get one week from each season
-    weeks = []
-    for season in seasons:
-        seasonID = season[2]
-        ws = getSeasonWeeks(session, seasonID, useProxy, proxyDict)
-
-        # get the last week
-        if len(ws) != 0:
-            w = ws[-1]
-            weeks.append([season[0], season[1], season[2], season[3], w[0], w[1]])
-
-    # print('Looking at Weeks:')
-    # print("['OrgID','Org','SID','SName','WID','WName']")
-    # for week in weeks:
-    #     print(week)
+# The pannels of one fixture from each season are listed at the same time and each person is kept once, with the
+# names of the pannels they are on.
+#
+# A list of dicts is returned in the form {'name':name, 'personID':pid, 'panels':[pannelName]}
+def getOfficials(session, year='2020', pannel='', personsFile='People.csv', useProxy=False, proxyDict={}, workers=DEFAULT_WORKERS):
+    # get the last week from each season
+    data = crawl(session, year, lambda season, ws: ws[-1:], useProxy, proxyDict, workers)
+    print('')
 
-    # get one fixture from each week
+    # get one fixture from each week, select the first one
     fixtures = []
-    for week in weeks:
-
-        orgNum = week[0]
-        orgName = week[1]
-        seasonID = week[2]
-        seasonName = week[3]
-        weekID = week[4]
-        weekName = week[5]
-
-        # get the fixtures for the week
-        fixs = getFixturesForWeek(session, seasonID, weekID, useProxy, proxyDict)
+    weekIDs = set()
+    for f in data['fixtures']:
+        if (f[2], f[4]) not in weekIDs:
+            weekIDs.add((f[2], f[4]))
+            fixtures.append(f)
 
-        # select the first one
-        if len(fixs) > 0:
-            f = fixs[0]
-            fixtures.append([orgNum,orgName,seasonID,seasonName,weekID,weekName,f[0],f[1],f[2],f[3],f[4],f[5],f[6]])
-
-    
-    # get from the selected pannel
-    info = []
     print(' Looking at Fixtures:')
-    if pannel != '':
-        for f in fixtures:
-            print(f)
-            fixtureID = f[12]
-            info.append(getRefInfo(session, fixtureID, pannelName=pannel, proxy=useProxy, proxyDict=proxyDict))
+    for f in fixtures:
+        print(f)
+    pages = getMatchPages(session, [f[12] for f in fixtures], workers, useProxy, proxyDict)
 
-    # get from all pannels
-    else:
-        for f in fixtures:
-            print(f)
-            fixtureID = f[12]
-
-            # get list of panels
-            initialInfo = getRefInfo(session, fixtureID, proxy=useProxy, proxyDict=proxyDict)
-            pannels = initialInfo['pannels']
-
-            # get info from each pannel
-            for p in pannels:
-                panelName = p[1]
-                info.append(getRefInfo(session, fixtureID, pannelName=panelName, proxy=False, proxyDict={}))
-
-            
-    # get all the unique person ids
-    personIDs = []
-    people = []
-    for i in info:
-        referees = i['referees'] #[name, appointID, personID]
-        for r in referees:
-            name = r[0]
-            appointID = r[1]
-            pid = r[2]
-
-            if pid not in personIDs:
-                people.append({'name':name, 'personID':pid})
+    # the pannels to list - [fixtureID, pannelID, pannelName], from the selected pannel or all pannels
+    jobs = []
+    for f in fixtures:
+        for p in pages[f[12]].panels:
+            if (pannel == '') or (p[1] == pannel):
+                jobs.append([f[12], p[0], p[1]])
+
+    # list every pannel at once
+    def listPannel(job):
+        return changePanel(session, job[1], job[0], proxy=useProxy, proxyDict=proxyDict).referees
+
+    # get all the unique people and the pannels they are on
+    people = {} # personID -> {'name':name, 'personID':pid, 'panels':[pannelName]}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for job, referees in zip(jobs, executor.map(listPannel, jobs)):
+            for r in referees: #[name, appointID, personID]
+                person = people.get(r[2])
+                if person is None:
+                    person = {'name':r[0], 'personID':r[2], 'panels':[]}
+                    people[r[2]] = person
+                if job[2] not in person['panels']:
+                    person['panels'].append(job[2])
+    people = list(people.values())
 
     # output to csv
-    out = [['name', 'personID']]
+    out = [['name', 'personID', 'panels']]
     for p in people:
-        out.append([p['name'], p['personID']])
+        out.append([p['name'], p['personID'], ';'.join(p['panels'])])
     if personsFile != '':
         with open(personsFile,"w",newline='') as file:
             writer = csv.writer(file)
@@ -906,220 +1458,123 @@ def getOfficials(session, year='2020', pannel='', personsFile='People.csv', useP
 
     return people
 
+# lookupFixtures runs lookupFixture for each of the given fixtures using a bounded pool of worker threads
+#
+# session       - session to use for connection to schedula
+# fixtureIDs    - list of fixture ids to look up
+# workers       - maximum number of lookups in flight at once, 1 runs them one after the other
+# proxy         - use an http proxy if true
+# proxyDict     - address of proxy
+#
+# Returns a list of appointments in the same order as fixtureIDs (see lookupFixture for the format)
+def lookupFixtures(session, fixtureIDs, workers=DEFAULT_WORKERS, proxy=False, proxyDict={}):
+    appointments = []
+    for match in streamLookups(session, fixtureIDs, workers, proxy, proxyDict):
+        appointments.extend(match)
+
+    return appointments
+
+# streamLookups runs lookupFixture for each of the given fixtures using a bounded pool of worker threads and yields the
+# appointments of each fixture in the same order as fixtureIDs. No more than STREAM_WINDOW lookups per worker are
+# started ahead of the one being yielded, so a slow fixture holds back a bounded number of results.
+#
+# session       - session to use for connection to schedula
+# fixtureIDs    - list of fixture ids to look up
+# workers       - maximum number of lookups in flight at once, 1 runs them one after the other
+# proxy         - use an http proxy if true
+# proxyDict     - address of proxy
+def streamLookups(session, fixtureIDs, workers=DEFAULT_WORKERS, proxy=False, proxyDict={}):
+    if len(fixtureIDs) == 0:
+        return
+
+    perCent = 1/float(len(fixtureIDs))
+    count = 0
+    window = max(1, workers) * STREAM_WINDOW
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for fixtureID in fixtureIDs:
+            # once the window is full wait for the oldest lookup before starting another
+            if len(pending) == window:
+                count = count+1
+                yield waitForLookup(pending.popleft(), count * perCent)
+            pending.append(executor.submit(lookupFixture, session, fixtureID, proxy, proxyDict))
+
+        while len(pending) != 0:
+            count = count+1
+            yield waitForLookup(pending.popleft(), count * perCent)
+
+# returns the result of a lookup once it has finished, and prints the fraction done as a percentage
+def waitForLookup(future, total):
+    match = future.result()
+    print("\r",end='')
+    print("%.2f" % (total*100), end='')
+    print("%", end='')
+    return match
+
 # lookupFixture returns the fixture details and appointments from schedula
 #
 # fixtureID - id number of the fixture
 # session   - session to use for connection to schedula
+# proxy     - use an http proxy if true
+# proxyDict - address of proxy
 #
 # Returns a list of appointment details (including confirmation status)
-# appointment format: ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
-def lookupFixture(session, fixtureID):
-    url = SCHEDULA_BASE_URL + "/index.php?action=admin/appointments/appoint_match&fixtureid=" + fixtureID + "&skeleton=true"
-    r = session.get(url)
-
-    text = r.text
-    text = text.split('<')
-
-    tableStart = False
+# appointment format: Appointment - ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+def lookupFixture(session, fixtureID, proxy=False, proxyDict={}):
+    return [Appointment(*a) for a in getMatchPage(session, fixtureID, proxy, proxyDict).appointments(fixtureID)]
 
-    appointments = []
-    
-    # ['officialName','officialID','selectedRole','selectedRoleID','acceptStatus']
-    appointment = ["","","","",""]
-
-    for t in text:
-        #print("Looking at:")
-        #print(t)
-
-        # check for end of table
-        if t.startswith('/table'):
-            #print('End Table')
-            break
-
-
-        if tableStart:
-            # check for new row
-            if t.startswith('tr'):
-                appointment = ["","","","",""]
-
-            # check for data complete
-            if appointment[0] != "" and appointment[1] != "" and appointment[2] != ""and appointment[3] != ""and appointment[4] != "":
-                #print('Record complete')
-                output = appointment.copy()
-                output.insert(0,fixtureID)
-                appointments.append(output.copy())
-                appointment = ["","","","",""]
-
-            # check for name
-            if t.startswith('td>'):
-                try:
-                    data = t.split('>')[1]
-
-                    # record name
-                    if appointment[0] == '':
-                        appointment[0] = data
-
-                except:
-                    #print('Ignore table data')
-                    pass
-            
-            # record appointment type
-            elif t.startswith('option value='):
-                try:
-                    if t.split(' ')[2].startswith('selected'):
-                        appointment[2] = t.split('>')[1]
-                        appointment[3] = t.split('"')[1]
-                except:
-                    #print('Ignore')
-                    pass
-
-            # record official ID
-            elif t.startswith('select'):
-                appointment[1] = t.split('xajax_AppointUmpire(')[1].split(',')[0]
-
-            # record acceptance status
-            elif t.startswith('img src'):
-                try:
-                    appointment[4] = t.split('/')[4].split('_')[0]
-                except:
-                    appointment[4] = '?'
-
-        # check for start of table
-        if t.startswith('table'):
-            tableStart = True
+# getMatchPage returns the appoint match page of a fixture (a parser.Response)
+def getMatchPage(session, fixtureID, proxy=False, proxyDict={}):
+    url = SCHEDULA_BASE_URL + "/index.php?action=admin/appointments/appoint_match&fixtureid=" + fixtureID + "&skeleton=true"
+    return getPage(session, url, proxy, proxyDict)
 
-    return appointments
+# getMatchPages gets the appoint match page of each fixture using a bounded pool of worker threads
+#
+# Returns a dict of fixture id to page, see getMatchPage
+def getMatchPages(session, fixtureIDs, workers=DEFAULT_WORKERS, proxy=False, proxyDict={}):
+    pages = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for fixtureID, page in zip(fixtureIDs, executor.map(lambda fixtureID: getMatchPage(session, fixtureID, proxy, proxyDict), fixtureIDs)):
+            pages[fixtureID] = page
+
+    return pages
         
 
 # return list of refs and appointment ids and avalibility status for given fixture
 # Also list of appointment types and ids
 # returns {'pannels':[id, string], 'appointTypes':[id, string], 'referees':[name, appointID, personID], 'appointments':{'fixtureID:':fixtureID, 'Name':Name, 'appointID':appointID, 'role':role, 'roleID':roleID, 'status':status} }
-def getRefInfo(session, fixtureID, pannelName='Referee (built-in)', proxy=False, proxyDict={}):
+#
+# page          - the appoint match page if it has already been fetched, see getMatchPage
+# listReferees  - if false the pannel is not selected and no referees are returned, this saves a request
+def getRefInfo(session, fixtureID, pannelName='Referee (built-in)', proxy=False, proxyDict={}, page=None, listReferees=True):
     # get fixture page
-    url = SCHEDULA_BASE_URL + "/index.php?action=admin/appointments/appoint_match&fixtureid=" + fixtureID + "&skeleton=true"
-    r = getPage(session,url,proxy,proxyDict)
-    text1 = r.text
+    if page is None:
+        page = getMatchPage(session, fixtureID, proxy, proxyDict)
     
     # get pannels list
-    pant = text1.split('<form name="panels_form">')[1]
-    pant = pant.split('<option')
-
-    pannels = []
-    for t in pant:
-        try:
-            value = t.split('alue="')[1].split('"')[0]
-            string = t.split('>')[1].split('<')[0]
-            pannels.append([value, string])
-        except:
-            pass
-
-        # check for end of table
-        if '</select>' in t:
-            break
+    pannels = page.panels
 
     # get appointment types list
-    appT = text1.split('<form name="appointment_type_form">')[1]
-    appT = appT.split('<option')
-
-    appointTypes = []
-    for t in appT:
-        try:
-            value = t.split('alue="')[1].split('"')[0]
-            string = t.split('>')[1].split('<')[0]
-            appointTypes.append([value, string])
-        except:
-            pass
-
-        # check for end of table
-        if '</select>' in t:
-            break
+    appointTypes = page.appointTypes
 
     # get all referees on pannel
-    # get referees from the pannel
-    # select pannel
-    pannel = []
-    for p in pannels:
-        if p[1] == pannelName:
-            pannel = p
-            break
+    referees = []
+    if listReferees:
+        # select pannel
+        pannel = []
+        for p in pannels:
+            if p[1] == pannelName:
+                pannel = p
+                break
 
-    r = changePanel(session, pannel[0], fixtureID, proxy=proxy, proxyDict=proxyDict)
-    text = r.text
+        r = changePanel(session, pannel[0], fixtureID, proxy=proxy, proxyDict=proxyDict)
 
-    referees = getRefsFromText(text)
+        # copy, the referees are updated below
+        referees = [list(ref) for ref in r.referees]
 
     # get exsisting appointments
-    #appointments = lookupFixture(session, fixtureID)
-    text = text1
-    text = text.split('<')
-
-    tableStart = False
-
-    appointments = []
-    
-    # ['officialName','officialID','selectedRole','selectedRoleID','acceptStatus']
-    appointment = ["","","","",""]
-
-    for t in text:
-        #print("Looking at:")
-        #print(t)
-
-        # check for end of table
-        if t.startswith('/table'):
-            #print('End Table')
-            break
-
-
-        if tableStart:
-            # check for new row
-            if t.startswith('tr'):
-                appointment = ["","","","",""]
-
-            # check for data complete
-            if appointment[0] != "" and appointment[1] != "" and appointment[2] != ""and appointment[3] != ""and appointment[4] != "":
-                #print('Record complete')
-                output = appointment.copy()
-                output.insert(0,fixtureID)
-                appointments.append(output.copy())
-                appointment = ["","","","",""]
-
-            # check for name
-            if t.startswith('td>'):
-                try:
-                    data = t.split('>')[1]
-
-                    # record name
-                    if appointment[0] == '':
-                        appointment[0] = data
-
-                except:
-                    #print('Ignore table data')
-                    pass
-            
-            # record appointment type
-            elif t.startswith('option value='):
-                try:
-                    if t.split(' ')[2].startswith('selected'):
-                        appointment[2] = t.split('>')[1]
-                        appointment[3] = t.split('"')[1]
-                except:
-                    #print('Ignore')
-                    pass
-
-            # record official ID
-            elif t.startswith('select'):
-                appointment[1] = t.split('xajax_AppointUmpire(')[1].split(',')[0]
-
-            # record acceptance status
-            elif t.startswith('img src'):
-                try:
-                    appointment[4] = t.split('/')[4].split('_')[0]
-                except:
-                    appointment[4] = '?'
-
-        # check for start of table
-        if t.startswith('table'):
-            tableStart = True
+    appointments = page.appointments(fixtureID)
 
     # convert to dict
     e = []
@@ -1138,6 +1593,30 @@ def getRefInfo(session, fixtureID, pannelName='Referee (built-in)', proxy=False,
 
     return {'pannels':pannels, 'appointTypes':appointTypes, 'referees':referees, 'appointments':e }
 
+# planAppointments works out the changes needed to get from the exsisting appointments of a fixture to the new ones
+#
+# appointIds    - new appointments - [name, appoint id, person id, appointType, [appointmentTypeid, name]], a name of ''
+#                 clears the role
+# exsisting     - exsisting appointments, see getRefInfo
+#
+# An exsisting appointment is removed if its role is given to someone else or its official is given another role.
+# Returns {'remove':[exsisting appointments], 'add':[appointIds], 'keep':[appointIds already in schedula]}
+def planAppointments(appointIds, exsisting):
+    plan = {'remove':[], 'add':[], 'keep':[]}
+
+    for e in exsisting:
+        for a in appointIds:
+            if ((e['roleID'] == a[4][0]) and (e['Name'] != a[0])) or ((e['Name'] == a[0]) and (e['roleID'] != a[4][0])):
+                plan['remove'].append(e)
+                break
+
+    for a in appointIds:
+        if any((e['roleID'] == a[4][0]) and (e['Name'] == a[0]) for e in exsisting):
+            plan['keep'].append(a)
+        elif (a[3] != 'N') and (a[1] != ''):
+            plan['add'].append(a)
+
+    return plan
 
 # Appoints the given refids and appointment types to the given match
 #
@@ -1146,14 +1625,19 @@ def getRefInfo(session, fixtureID, pannelName='Referee (built-in)', proxy=False,
 # appointData        - [refId, appointmentTypeIds]
 # refId              - person id of the referees to be appointed
 # appointmentTypeId  - id of the appointment type, i.e. R,AR1,AR2,M,A,4,N (referee, ar1, ar2, mentor, assessor, 4th official, Null(remove them))
+# page               - the appoint match page if it has already been fetched, see getMatchPage
 #
-# Aborts on failure.
-def appointFixture(session, fixtureID, appointData, proxy=False, proxyDict={}):
+# Only the changes worked out by planAppointments are sent. The appointment type is only changed when it differs from
+# the last one used and the changes are only saved if something changed.
+#
+# Aborts on failure, the changes to the fixture are discarded. Returns the appointments of the fixture after the changes
+# (see lookupFixture, the acceptance status of new appointments is ''), or None if the changes were discarded
+def appointFixture(session, fixtureID, appointData, proxy=False, proxyDict={}, page=None):
     try:
         print('\nModify Fixture <' + fixtureID + '>...')
 
-        # get info about the fixutre
-        appointInfo = getRefInfo(session, fixtureID, proxy=proxy, proxyDict=proxyDict)
+        # get info about the fixutre, the referees are only needed if someone is being appointed
+        appointInfo = getRefInfo(session, fixtureID, proxy=proxy, proxyDict=proxyDict, page=page, listReferees=any(pid[0] != '' for pid in appointData))
         pannels = appointInfo['pannels']
         appointTypes = appointInfo['appointTypes']
         referees = appointInfo['referees']
@@ -1181,87 +1665,69 @@ def appointFixture(session, fixtureID, appointData, proxy=False, proxyDict={}):
                     raise Exception('Unknown Referee:' + str(pid))
 
         # get the appointment ids for each type r,ar1,ar2,m,a,4
-        R = []
-        AR1 = []
-        AR2 = []
-        M = []
-        A = []
-        R4 = []
-
-        pAR1 = re.compile('A.*R.*1') # A*R*1* = AR1
-        pAR2 = re.compile('A.*R.*2') # A*R*2* = AR2
-        pM = re.compile('.*Mentor.*') # *Mentor* = M
-        pA = re.compile('R.*Assessor') # R*Assessor = A
-        pR = re.compile('Referee') # R* = R
-        p4 = re.compile('.*4.*') # *4* = 4
-
+        typeIds = {'R':[], 'AR1':[], 'AR2':[], 'M':[], 'A':[], '4':[], 'N':['-1','Unappoint']}
         for a in appointTypes:
-            if (pAR1.match(a[1]) != None):
-                AR1 = a
-            elif pAR2.match(a[1]) != None:
-                AR2 = a
-            elif pM.match(a[1]) != None:
-                M = a
-            elif pA.match(a[1]) != None:
-                A = a
-            elif a[1] == 'Referee':
-                R = a
-            elif p4.match(a[1]) != None:
-                R4 = a
-                
-        typeIds = {'R':R, 'AR1':AR1, 'AR2':AR2, 'M':M, 'A':A, '4':R4, 'N':['-1','Unappoint']}
+            letter = roleStringToLetter(a[1])
+            if letter != 'Other':
+                typeIds[letter] = a
 
         # add appointment type
         for a in appointIds:
             aType = a[3]
             a[4] = typeIds[aType]
 
+        plan = planAppointments(appointIds, exsistingAppointments)
 
-        # check against exsisting appointments
+        # remove appointments
         print('  Removing appointments:')
-        removedExsisting = []
-        removedNew = []
-        if len(exsistingAppointments) != 0:
-            for e in exsistingAppointments:
-                # remove appointment if a role or person is already appointed differently
-                for a in appointIds:
-                    if ((e['roleID'] == a[4][0]) and (e['Name'] != a[0])) or ((e['Name'] == a[0]) and (e['roleID'] != a[4][0])):
-                        # check not already removed
-                        if not (e in removedExsisting):
-                            print('   ' + str(e))
-                            r = UnappointUmpire(session, e['appointID'], e['roleID'], fixtureID, proxy=proxy, proxyDict=proxyDict)
-                            removedExsisting.append(e)
-                            text = r.text
-                            # update appoint ids
-                            referees = getRefsFromText(text)
-                            for a in appointIds:
-                                for r in referees:
-                                    if a[2] == r[2]:
-                                        a[1] = r[1]
-                                        break
-                            # TODO: update ids in exsistingAppointments? OR work out sonthing better for getting appointment ids
-                
-                    # do not appoint if the appointment already exsists
-                    if ((e['roleID'] == a[4][0]) and (e['Name'] == a[0])):
-                        removedNew.append(a)
-                        
+        responses = []
+        for e in plan['remove']:
+            print('   ' + str(e))
+            responses.append(UnappointUmpire(session, e['appointID'], e['roleID'], fixtureID, proxy=proxy, proxyDict=proxyDict))
+
+        # update appoint ids, each response lists the referees after the change so start with the latest and only
+        # parse older responses for referees missing from it
+        pending = list(plan['add'])
+        for r in reversed(responses):
+            if not pending:
+                break
+            byPersonID = dict((ref[2], ref[1]) for ref in r.referees)
+            for a in [a for a in pending if a[2] in byPersonID]:
+                a[1] = byPersonID[a[2]]
+                pending.remove(a)
+
         print('  Adding appointments:')
         #print(['name', 'appoint id', 'person id', 'appointType', '[appointmentTypeid, name]'])
 
         # Make appointments
+        appointmentType = None
         for a in appointIds:
-            if a in removedNew:
+            if a in plan['keep']:
                 print('   ' + str(a) + 'Already in schedula, skipping...')
-            elif (a[3] != 'N') and (a[1] != ''):
+            elif (a in plan['add']) and (a[1] != ''):
                 print('   ' + str(a))
-                #r = changeAppointmentType(session, typeIds['4'][0], fixtureID, proxy=proxy, proxyDict=proxyDict)
-                r = changeAppointmentType(session, a[4][0], fixtureID, proxy=proxy, proxyDict=proxyDict)
-                r = AppointUmpire(session,a[1],a[4][0],fixtureID, proxy=proxy, proxyDict=proxyDict)
+                if a[4][0] != appointmentType:
+                    changeAppointmentType(session, a[4][0], fixtureID, proxy=proxy, proxyDict=proxyDict)
+                    appointmentType = a[4][0]
+                AppointUmpire(session,a[1],a[4][0],fixtureID, proxy=proxy, proxyDict=proxyDict)
 
         # save changes
-        SaveAppointments(session, fixtureID)
+        if plan['remove'] or plan['add']:
+            SaveAppointments(session, fixtureID, proxy=proxy, proxyDict=proxyDict)
+        else:
+            print('  No changes')
 
         print('Modify <' + fixtureID + '> Complete.')
+
+        # appointments after the changes
+        appointments = []
+        for e in exsistingAppointments:
+            if e not in plan['remove']:
+                appointments.append([fixtureID, e['Name'], e['appointID'], e['role'], e['roleID'], e['status']])
+        for a in plan['add']:
+            appointments.append([fixtureID, a[0], a[1], a[4][1], a[4][0], ''])
+
+        return appointments
     
     # an error has occured, bachtrack changes
     except Exception as ex:
@@ -1277,77 +1743,87 @@ def appointFixture(session, fixtureID, appointData, proxy=False, proxyDict={}):
         finally:
             del exc_info
 
+        return None
+
 
-# yep
+# getRefsFromText returns the referees listed in a ChangePanel (or similar) response - [[name, appointID, personID]]
 def getRefsFromText(text):
-    refT = text.split('<td>')
-    
-    # debug
-    # if 'Pending appointments will also appear above.' in text:
-    #     print('has extra')
-    #     fileOut = open('temp.txt','w')
-    #     for t in refT:
-    #         fileOut.write(t + '\n')
-    #     fileOut.close()
+    return parser.parseReferees(text)
 
-    referees = []
-    table2 = False
-    for t in refT:
-        if table2:
-            # check for removed
-            if ('value="Removed"' in t) or ('<img src' in t):
-                pass
-            else:
-                n = t.split('</td')
-                if len(n) == 2:
-                    name = n[0]
-                else:
-                    appointID = t.split('AppointUmpire(')[1].split(',')[0]
-
-                    # update
-                    for r in referees:
-                        if r[0] == name:
-                            #print('ammended ' + str(r))
-                            r[1] = appointID
-                            #print('      to ' + str(r))
-                            appointID = ''
-                            personID = ''
-                            name = ''
-                            break
 
-        else:
-            try:
-                name = t.split('<b>')[1].split('</b>')[0]
-                appointID = t.split('AppointUmpire(')[1].split(',')[0]
-            except:
-                try:
-                    personID = t.split('personid=')[1].split('&')[0]
-                    referees.append([name, appointID, personID])
-                    # clear fileds, this prevents duplicates
-                    appointID = ''
-                    personID = ''
-                    name = ''
-                except:
-                    pass
-
-            # check for end of table, start of new one
-            if '<![CDATA[S<table>' in t:
-                table2 = True
-
-    # tracking
-    # print('\n\n')
-    # for ref in referees:
-    #     if (ref[2] == '11504519') or (ref[2] == '13957370'):
-    #         print(ref)
-    
-    return referees
+# sets the cache used by getOrganisations, getSeasons and getSeasonWeeks, None disables caching
+def setCache(cache):
+    global metadataCache
+    metadataCache = cache
 
+# sets the tracer used by getPage and post, None disables tracing
+def setTracer(t):
+    global tracer
+    tracer = t
+
+# sets whether loginSession may ask for a password, see interactive
+def setInteractive(i):
+    global interactive
+    interactive = i
+
+# returns the cached value for the endpoint and key, None if not cached
+def cacheGet(endpoint, key):
+    if metadataCache is None:
+        return None
+    return metadataCache.get(endpoint, key)
+
+# stores a value in the cache, if there is one
+def cachePut(endpoint, key, value):
+    if metadataCache is not None:
+        metadataCache.put(endpoint, key, value)
 
 # returns unix time in ms
 def getXjxr():
     t = int(round(time.time()*1000))
     return str(t)
 
+# returns the date of a fixture as a date object, e.g. 'Sat Feb 8' in season '2020' gives 2020-02-08
+#
+# fixture       - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
+def fixtureDate(fixture):
+    fixtureDateStrs = fixture[7].split(' ') # e.g. ['Sat', 'Feb', '8']
+    day = int(fixtureDateStrs[2])
+    month = MONTH_TO_INT[fixtureDateStrs[1]]
+    year = int(fixture[3])
+    return date(year,month,day)
+
+# returns the first and last day of a week from its id, e.g. '2020-01-13_2020-01-19'
+def weekSpan(weekID):
+    dateStrings = weekID.split('_')
+    return stringToDate(dateStrings[0]), stringToDate(dateStrings[1])
+
+# returns true if the days from start1 to end1 and from start2 to end2 have a day in common
+def overlaps(start1, end1, start2, end2):
+    return (start1 <= end2) and (start2 <= end1)
+
+# returns a selectSeason function for crawl that leaves out the seasons that cannot have a week between the given
+# dates. A finished season's first and last day are known once its weeks have been fetched (see getSeasonWeeks), before
+# that a season named after a year is taken to be within a year either side of it
+def seasonsBetween(firstDay, lastDay):
+    def select(season):
+        span = cacheGet('seasonSpans', season[2])
+        if span is not None:
+            return overlaps(stringToDate(span[0]), stringToDate(span[1]), firstDay, lastDay)
+        if re.match(r'^[0-9]{4}$', season[3]):
+            y = int(season[3])
+            return overlaps(date(y-1, 1, 1), date(y+1, 12, 31), firstDay, lastDay)
+        return True
+    return select
+
+# returns true if a season is one of the seasons asked for
+#
+# seasonName    - name of the season, e.g. '2020'
+# year          - season name, list of season names, or '' for every season
+def isSelectedSeason(seasonName, year):
+    if isinstance(year, list):
+        return seasonName in year
+    return (year == '') or (seasonName == year)
+
 # converts date in 2020-02-03 format into a date object
 def stringToDate(dateString):
     subStrings = dateString.split('-')
@@ -1359,56 +1835,18 @@ def stringToDate(dateString):
 
 # returns true if the given competition is blacklisted
 def isBlacklisted(competitionString):
-    ages = ['6','7','8','9','10','11']
-
-    # U6, U7, ...
-    for a in ages:
-        pattern = re.compile('U' + a + '.*')
-        if pattern.match(competitionString) != None:
-            #print('Blacklist Hit <' + competitionString + '>')
-            return True
-
-    # Under 6, Under 7, ...
-    for a in ages:
-        pattern = re.compile('Under.' + a + '.*')
-        if pattern.match(competitionString) != None:
-            #print('Blacklist Hit <' + competitionString + '>')
-            return True
-    
-    return False
+    return classifier.isBlacklisted(competitionString)
 
 # converts a role string into a consistant designator
 # e.g. Assistant Referee 1-> AR1
 #      AR 1 -> AR1
 def roleStringToLetter(role):
-    # patterns for matching role names
-    pAR1 = re.compile('A.*R.*1') # A*R*1* = AR1
-    pAR2 = re.compile('A.*R.*2') # A*R*2* = AR2
-    pM = re.compile('.*Mentor.*') # *Mentor* = M
-    pA = re.compile('R.*Assessor') # R*Assessor = A
-    pR = re.compile('Referee') # R* = R
-    p4 = re.compile('.*4.*') # *4* = 4
-
-    # output variable
-    roleName = ''
-
-    # match role name to one of R,AR1,AR2,M,A,R4
-    if (pAR1.match(role) != None):
-        roleName = 'AR1'
-    elif pAR2.match(role) != None:
-        roleName = 'AR2'
-    elif pM.match(role) != None:
-        roleName = 'M'
-    elif pA.match(role) != None:
-        roleName = 'A'
-    elif role == 'Referee':
-        roleName = 'R'
-    elif p4.match(role) != None:
-        roleName = '4'
-    else:
-        roleName = 'Other'
+    return classifier.roleLetter(role)
 
-    return roleName
+# sets the rules used by isBlacklisted and roleStringToLetter, see schedulaClassify
+def setClassifier(c):
+    global classifier
+    classifier = c
 
 ################################
 ## Schedula xjx api functions ##
@@ -1460,8 +1898,7 @@ def JustClose(session, fixtureID, proxy=False, proxyDict={}):
     data = 'xjxfun=JustClose&xjxr=' + getXjxr() + '&xjxargs[]=N' + fixtureID
     print('    JustClose: ' + data)
     r = post(session, url, data, proxy, proxyDict)
-    text = r.text
-    t = text.split('func="')[1].split('"')[0]
+    t = r.text.split('func="')[1].split('"')[0]
 
     if t == ("confirmClose(" + fixtureID + ")"):
         print('Bad Close')
@@ -23,6 +23,12 @@
 # SOFTWARE.
 
 import sys
+import os
+import schedulaStartup
+
+# times the imports below, see schedulaStartup
+startup = schedulaStartup.StartupTimer(schedulaStartup.requested(sys.argv[1:]))
+
 import getopt
 import getpass
 import time
@@ -31,6 +37,16 @@ import csv
 import traceback
 from datetime import date
 import schedulaInterface as schedula
+import schedulaCache
+import schedulaClassify
+import schedulaRecord
+import schedulaTrace
+
+# seconds the match pages fetched by push to check for clashes can be used to appoint, older pages are fetched again
+PAGE_MAX_AGE = 60
+
+# columns of the csv written by pullAll and pullN
+CSV_HEADER = ['FixtureID','OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date', 'day','Time','Home','Away','Ground','Referee','AR1','AR2','Mentor','Assessor','4th Official','Other','Status','Rstatus','AR1status','AR2status','Mstatus','Astatus','4status']
 
 
 # print command line program usage
@@ -41,62 +57,112 @@ def usage():
     print(" pullAll     Gets all fixtures and appointments from schedula. Use -s to specify a season. Use -o to do pullP at the same time")
     print(" pullN       Gets all fixtures and appointments for the next 28 days. use -n to change the number of days, use -N to set the start date in the form yyyy-mm-dd")
     print(" pullP       Gets all the match officials from shcedula, exports to the file given by -o")
+    print(" export      Gets all fixtures and appointments of several seasons in one run, each season is written to <-f><season>.csv. Use -s to give the seasons as a list and/or range, e.g. 2016-2020 or 2018,2020")
     print(" push        Pushes the appointments in the file given by -i to schedula, using the file given by -o. Checks appointments have not changed compared to the file specified by -f.")
-    print("\nOptions:\n -f   filename\n -s   season (e.g. 2020)\n -u   username\n -p   password\n -i   File of fixtures. Used with command \"push\".\n -o   File of officials. Used with commands \"pullP\", \"push\" or \"pullAll\".\n -x   HTTP proxy address (e.g. localhost:8080)\n -n   Number of days to pull. Used with command \"pullN\"\n -N   Start date, used with command \"pullN\". Must be in the form yyyy-mm-dd\n -h   Display usage")
+    print(" serve       Logs in and runs as a background service, keeping the session and caches between commands. Commands are sent with schedulaClient.py, which takes the same commands and options as this tool. Use --port to pick the port")
+    print(" plan        Shows the changes push would make, using the appointments in the file specified by -f in place of schedula's. Does not connect to schedula. Same as push --dry-run")
+    print("\nOptions:\n -f   filename\n -s   season (e.g. 2020)\n -u   username\n -p   password\n -i   File of fixtures. Used with command \"push\".\n -o   File of officials. Used with commands \"pullP\", \"push\" or \"pullAll\".\n -x   HTTP proxy address (e.g. localhost:8080)\n -n   Number of days to pull. Used with command \"pullN\"\n -N   Start date, used with command \"pullN\". Must be in the form yyyy-mm-dd\n -j   Number of concurrent requests (default " + str(schedula.DEFAULT_WORKERS) + "). Used with commands \"pullAll\", \"pullN\", \"pullP\", \"export\" and \"push\"\n -c   Cache file for organisations, seasons and season weeks (default " + defaultCacheFile() + ")\n -r, --refresh   Discard the cache and get everything from schedula\n --incremental   Only get what could have changed since the last pull and merge it into the file given by -f. Used with commands \"pullAll\" and \"pullN\"\n --dry-run   Run plan instead of push\n --port   Port for the service to listen on (default any free port). Used with command \"serve\"\n --login   Login with the password instead of using the saved session (kept in " + defaultSessionFile() + ")\n --startup-times   Show the time taken by each import and each phase of start up\n --trace   Write the latency, size and retries of each request to the given file as json lines\n --record   Record every request to schedula and its response in the given archive file\n --replay   Answer the requests from an archive made by --record instead of schedula. Used with commands \"pullAll\", \"pullN\", \"pullP\" and \"export\"\n --db   Also write the pulled fixtures, appointments and officials to the given sqlite store (see schedulaStore.py). Used with commands \"pullAll\", \"pullN\", \"pullP\" and \"export\"\n --rules   File of blacklisted competitions and role names (default " + defaultRulesFile() + " if it exists)\n -h   Display usage")
+
+# returns the snapshot file used by incremental pulls of the given csv
+def snapshotFileName(filename):
+    return os.path.splitext(filename)[0] + '.snapshot.json'
+
+# returns the default location of the cache file, next to the tool
+def defaultCacheFile():
+    return os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'schedulaCache.json')
+
+# returns the default location of the saved session file, next to the tool
+def defaultSessionFile():
+    return os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'schedulaSession.json')
+
+# returns the default location of the rules file, next to the tool
+def defaultRulesFile():
+    return os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'schedulaRules.json')
 
 # pullP command
 # Gets all the names and person Ids from schedula
-def pullP(session, season, peopleFile, useProxy, proxyDict):
+def pullP(session, season, peopleFile, useProxy, proxyDict, workers=schedula.DEFAULT_WORKERS, store=None):
     print('Command: pullP')
     print(' peopleFile: ' + peopleFile)
     print(' season: ' + season)
-    p = schedula.getOfficials(session, year=season, pannel='', personsFile=peopleFile, useProxy=useProxy, proxyDict=proxyDict)
+    p = schedula.getOfficials(session, year=season, pannel='', personsFile=peopleFile, useProxy=useProxy, proxyDict=proxyDict, workers=workers)
+    if store is not None:
+        store.saveOfficials(p)
 
 # pullAll command
 # Gets all fixtures and appointments for the given season. If season is '' all avaliable records are pulled
-def pullAll(session, filename, season, useProxy, proxyDict):
+def pullAll(session, filename, season, useProxy, proxyDict, workers=schedula.DEFAULT_WORKERS, incremental=False, store=None):
     print('Command: pullAll')
     print(' filename: ' + filename)
     print(' season: ' + season)
 
-    # pull data from schedula
-    data = schedula.pullAll(session, year=season, fixturesFile='', appointmentsFile='', useProxy=False, proxyDict={})
+    # load the previous pull
+    snapshot = None
+    if incremental:
+        snapshot = schedula.loadSnapshot(snapshotFileName(filename))
+
+    # pull data from schedula, a full pull streams the appointments into the csv as they are found
+    data = schedula.pullAll(session, year=season, fixturesFile='', appointmentsFile='', useProxy=useProxy, proxyDict=proxyDict, workers=workers, snapshot=snapshot, stream=(filename != '') or (store is not None))
     
-    if data is not None:
-        fixtures = data['fixturesList']
-        appointments = data['appointmentList']
+    if incremental:
+        writeDelta(data, snapshot, filename, store)
+    elif data is not None:
+        writeStream(data, filename, store)
+
+# export command
+# Gets all fixtures and appointments for several seasons with one crawl, every season's appointments are looked up
+# together by the same workers. Each season is written to <prefix><season>.csv
+#       seasons  - list of season names, e.g. ['2019', '2020']
+def export(session, prefix, seasons, useProxy, proxyDict, workers=schedula.DEFAULT_WORKERS, store=None):
+    print('Command: export')
+    print(' prefix: ' + prefix)
+    print(' seasons: ' + ', '.join(seasons))
+
+    # pull data from schedula
+    data = schedula.pullAll(session, year=seasons, fixturesFile='', appointmentsFile='', useProxy=useProxy, proxyDict=proxyDict, workers=workers, stream=True)
+    if data is None:
+        print('No fixtures found for seasons ' + ', '.join(seasons))
+        return
 
-        # output to csv
-        if filename != '':
-            writeToCsv(fixtures, appointments, filename)
+    stream = data['appointmentStream']
+    if store is not None:
+        stream = store.storeStream(stream, data['weeks'], data['rawFixtures'])
+    written = writeSeasonsToCsv(stream, prefix)
+
+    for season in seasons:
+        if season not in written:
+            print('No fixtures found for season ' + season)
 
 # pullN command
 # Gets all fixtures and appointments form the start date plus N days. If no start date specified, the current date is used
-def pullN(session, filename, season, startDay, N, useProxy, proxyDict):
+def pullN(session, filename, season, startDay, N, useProxy, proxyDict, workers=schedula.DEFAULT_WORKERS, incremental=False, store=None):
     print('Command: pullN')
     print(' filename: ' + filename)
     print(' season: ' + season)
     print(' startDay: ' + str(startDay))
     print(' N:' + str(N))
 
-    # pull data from schedula
-    data = schedula.update28(session, season, fixturesFile='', appointmentsFile='', startDate=startDay, numberDays=N, useProxy=False, proxyDict={})
-    fixtures = data['fixturesList']
-    appointments = data['appointmentList']
+    # load the previous pull
+    snapshot = None
+    if incremental:
+        snapshot = schedula.loadSnapshot(snapshotFileName(filename))
 
-    # output to csv
-    if filename != '':
-        writeToCsv(fixtures, appointments, filename)
+    # pull data from schedula, a full pull streams the appointments into the csv as they are found
+    data = schedula.update28(session, season, fixturesFile='', appointmentsFile='', startDate=startDay, numberDays=N, useProxy=useProxy, proxyDict=proxyDict, workers=workers, snapshot=snapshot, stream=(filename != '') or (store is not None))
+    if incremental:
+        writeDelta(data, snapshot, filename, store)
+    elif data is not None:
+        writeStream(data, filename, store)
 
 # push command
 # Gets the appointments in the given push file and pushes them to schedula
 # Checkes for changes in schedula and does not appoint clashes
-def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
+def push(session, filename, pushFile, peopleFile, useProxy, proxyDict, workers=schedula.DEFAULT_WORKERS):
     print('Command: push')
 
     # Load filename - ['FixtureID','OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date', 'day','Time','Home','Away','Ground','Referee','AR1','AR2','Mentor','Assessor','4th Official','Other','Status']
     print(' filename: ' + filename)
-    storedAppointments = schedula.readCSV(filename)
+    storedAppointments = schedula.FixtureIndex(schedula.readCSV(filename), getFixtureID=lambda s: s['FixtureID'])
 
     # Load pushFile - ['FixtureID','R','AR1','AR2','M','A','4']
     print(' pushFile: ' + pushFile)
@@ -104,16 +170,61 @@ def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
 
     # Load people file
     print(' peopleFile: ' + peopleFile)
-    people = schedula.readCSV(peopleFile)
+    people = schedula.PersonResolver(schedula.readCSV(peopleFile))
+
+    # check every name in the push file before contacting schedula
+    people.resolveAppointments(pushData)
 
     # For each fixtureID in pushFile: check againsed schedula for changes, if change found does it clash with appointment? if yes don't apoint.
+    print(' Checking fixtures against schedula...')
+    # the pages are kept so the push does not need to get them again
+    pages = schedula.getMatchPages(session, [d['fixtureID'] for d in pushData], workers, useProxy, proxyDict)
+    fetched = time.time()
+    removeClashes(pushData, pages, storedAppointments)
+
+    # display changes that are about to occur
+    printPlan(schedula.planPush(pushData, storedAppointments, people))
+    print("Changes are about to be applied, this action cannot be undone")
+
+    # HOLD POINT - require user acknowledgment to continue
+    hold = True
+    strIn = input('Please Confirm (yes or no):')
+    while hold:
+        if strIn == 'yes':
+            hold = False
+
+        if strIn == 'no':
+            print('Abort, user permission denied')
+            sys.exit(0)
+
+        if strIn not in ['yes', 'no']:
+            strIn = input("Please enter 'yes' or 'no':")
+            if (strIn not in ['yes', 'no']) or (strIn == 'no'):
+                print('Abort, user permission not granted')
+                sys.exit(2)
+
+    # the pages may have changed while waiting for confirmation, get them again and check for clashes once more
+    if time.time() - fetched > PAGE_MAX_AGE:
+        print(' Checking fixtures against schedula again...')
+        pages = schedula.getMatchPages(session, [d['fixtureID'] for d in pushData], workers, useProxy, proxyDict)
+        removeClashes(pushData, pages, storedAppointments)
+
+    # For each ficture in pushfile: appoint fixture
+    updated = schedula.pushAppointments(session,pushData,people,useProxy=useProxy, proxyDict=proxyDict, workers=workers, pages=pages)
+
+    # TODO: update filename
+
+
+# function to remove the fixtures from the push data whose appointments in schedula differ from the stored ones
+#       pages    - dict of fixture id to appoint match page, see schedula.getMatchPages
+def removeClashes(pushData, pages, storedAppointments):
     clashes= []
     for d in pushData:
         # Extract fixture ID
         fixtureID = d['fixtureID']
 
         # get current fixture status
-        serverAppoints = schedula.lookupFixture(session, fixtureID) # ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+        serverAppoints = pages[fixtureID].appointments(fixtureID) # ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
         roles = ['R', 'AR1', 'AR2', 'M', 'A', '4', 'Other']
         serverRoles = {'R':'', 'AR1':'', 'AR2':'', 'M':'', 'A':'', '4':'', 'Other':''}
         
@@ -123,11 +234,7 @@ def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
             serverRoles[role] = a[1]
 
         # get stored data
-        storedFixture = {}
-        for s in storedAppointments:
-            if s['FixtureID'] == fixtureID:
-                storedFixture = s
-                break
+        storedFixture = storedAppointments.fixture(fixtureID, {})
 
         # fixture not stored, reject
         if not storedFixture:
@@ -139,7 +246,7 @@ def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
 
         else:
             # get stored roles
-            storedRoles = {'R':storedFixture['Referee'], 'AR1':storedFixture['AR1'], 'AR2':storedFixture['AR2'], 'M':storedFixture['Mentor'], 'A':storedFixture['Assessor'], '4':storedFixture['4th Official'], 'Other':storedFixture['Other']}
+            storedRoles = schedula.storedRoles(storedFixture)
 
             # Check sever and stored data matches, if not reject change
             for r in roles:
@@ -152,33 +259,100 @@ def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
         print(' Cannot appoint fixture:' + str(c))
         pushData.remove(c)
 
-    # display changes that are about to occur
-    print("Changes are about to be applied, this action cannot be undone")
-    # for p in pushData:
-    #    print(p) # prints all changes
+# plan command
+# Shows the changes push would make without connecting to schedula, the stored appointments in filename are used in
+# place of schedula's
+def plan(filename, pushFile, peopleFile):
+    print('Command: plan')
 
-    # HOLD POINT - require user acknowledgment to continue
-    hold = True
-    strIn = input('Please Confirm (yes or no):')
-    while hold:
-        if strIn == 'yes':
-            hold = False
+    print(' filename: ' + filename)
+    storedAppointments = schedula.FixtureIndex(schedula.readCSV(filename), getFixtureID=lambda s: s['FixtureID'])
 
-        if strIn == 'no':
-            print('Abort, user permission denied')
-            sys.exit(0)
+    print(' pushFile: ' + pushFile)
+    pushData = schedula.readAppointmentList(pushFile)
 
-        if strIn not in ['yes', 'no']:
-            strIn = input("Please enter 'yes' or 'no':")
-            if (strIn not in ['yes', 'no']) or (strIn == 'no'):
-                print('Abort, user permission not granted')
-                sys.exit(2)
+    print(' peopleFile: ' + peopleFile)
+    people = schedula.PersonResolver(schedula.readCSV(peopleFile))
+    people.resolveAppointments(pushData)
+
+    printPlan(schedula.planPush(pushData, storedAppointments, people))
+
+# function to print the operations of each fixture in a push plan, see schedula.planPush
+def printPlan(plans):
+    count = {'appoint':0, 'unappoint':0, 'keep':0}
+    rejected = 0
+    for p in plans:
+        if p['rejected'] != '':
+            print(' Fixture <' + p['fixtureID'] + '> rejected, ' + p['rejected'])
+            rejected = rejected + 1
+            continue
+
+        changes = [o for o in p['operations'] if o[0] != 'keep']
+        if not changes:
+            print(' Fixture <' + p['fixtureID'] + '> no changes')
+        else:
+            print(' Fixture <' + p['fixtureID'] + '>')
+        for o in p['operations']:
+            count[o[0]] = count[o[0]] + 1
+            if o[0] != 'keep':
+                print('  ' + o[0] + ' ' + o[1] + ': ' + o[2])
+
+    print(' ' + str(len(plans)) + ' fixtures: ' + str(count['appoint']) + ' to appoint, ' + str(count['unappoint']) + ' to unappoint, ' + str(count['keep']) + ' unchanged, ' + str(rejected) + ' rejected')
+
+# function to write a streamed pull to the csv and the store, as the appointments are found. Nothing is streamed
+# without a csv or a store, the pull has already looked up the appointments
+#       data     - result of schedulaInterface.pullAll or update28 with stream
+#       store    - schedulaStore.Store to write to, None for none
+def writeStream(data, filename, store=None):
+    if (filename == '') and (store is None):
+        return
+
+    stream = data['appointmentStream']
+    if store is not None:
+        stream = store.storeStream(stream, data['weeks'], data['rawFixtures'])
 
-    # For each ficture in pushfile: appoint fixture
-    updated = schedula.pushAppointments(session,pushData,people,useProxy=useProxy, proxyDict=proxyDict)
+    # output to csv
+    if filename != '':
+        writeStreamToCsv(stream, filename)
+    else:
+        for fix in stream:
+            pass
+
+# function to report the changes found by an incremental pull and write them to the csv and the store
+# The snapshot is saved. The csv has the fixtures of the pull, as a pull that is not incremental would write, and is
+# only rewritten if something changed or it has different fixtures (e.g. pullN on another day). Only the fixtures that
+# changed are written to the store
+#       data     - result of schedulaInterface.pullAll or update28 with a snapshot, its 'delta' is
+#                  {'added':fixtures, 'removed':fixtures, 'changed':fixtures, 'appointments':fixtureIDs}
+#       filename - csv to write, required as the snapshot is kept next to it (see snapshotFileName)
+#       store    - schedulaStore.Store to write to, None for none
+def writeDelta(data, snapshot, filename, store=None):
+    delta = data['delta']
+    fixtures = data['fixturesList']
+    print(' Changes since the last pull:')
+    print('  Added fixtures: ' + str(len(delta['added'])))
+    print('  Removed fixtures: ' + str([f[12] for f in delta['removed']]))
+    print('  Changed fixtures: ' + str([f[12] for f in delta['changed']]))
+    print('  Changed appointments: ' + str(delta['appointments']))
 
-    # TODO: update filename
+    schedula.saveSnapshot(snapshot, snapshotFileName(filename))
 
+    changed = len(delta['added']) + len(delta['removed']) + len(delta['changed']) + len(delta['appointments'])
+    if (changed != 0) or (csvFixtureIDs(filename) != set(f[12] for f in fixtures)):
+        writeToCsv(fixtures, data['appointmentList'], filename)
+    else:
+        print(' No changes, <' + filename + '> is up to date')
+
+    if store is not None:
+        store.removeFixtures([f[12] for f in delta['removed']])
+        changedFixtures = delta['added'] + delta['changed'] + [snapshot['fixtures'][fid] for fid in delta['appointments']]
+        store.saveFixtures((f, snapshot['appointments'].get(f[12], [])) for f in changedFixtures)
+
+# returns the set of fixture ids in a csv written by writeToCsv, None if there is no csv
+def csvFixtureIDs(filename):
+    if not os.path.exists(filename):
+        return None
+    return set(row['FixtureID'] for row in schedula.readCSV(filename))
 
 # function to write fixtures and appointments to a csv
 #       fixtures     - ['OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date','Time','Home','Away','Ground','FixtureID']
@@ -186,60 +360,125 @@ def push(session, filename, pushFile, peopleFile, useProxy, proxyDict):
 def writeToCsv(fixtures, appointments, filename):
     print(' Write to csv <' + filename + '>')
 
-    # output titles
-    headerRow = ['FixtureID','OrgID','OrgName','SeasonID','SeasonName','WeekID','WeekName','Competition','Date', 'day','Time','Home','Away','Ground','Referee','AR1','AR2','Mentor','Assessor','4th Official','Other','Status','Rstatus','AR1status','AR2status','Mstatus','Astatus','4status']
-    output = []
-    # output.append(headerRow)
-
-    # Apply format
-    for fix in fixtures:
-        fixID = fix[12]
-        roles = {'R':'', 'AR1':'', 'AR2':'', 'M':'', 'A':'', '4':'', 'Other':''}
-        status = {'R':'', 'AR1':'', 'AR2':'', 'M':'', 'A':'', '4':'', 'Other':''}
-        statusFlag = 'ok'
-
-        fixAppoints = []
-        # get appointments for this fixture
-        for a in appointments:
-            if a[0] == fixID:
-                fixAppoints.append(a)
-
-        # assign roles
-        for a in fixAppoints:
-            roleName = a[3]
-
-            # match role name to one of R,AR1,AR2,M,A,R4
-            roleName = schedula.roleStringToLetter(roleName)
-
-            # fill the role
-            if roles[roleName] == '':
-                roles[roleName] = a[1] # referee name
-                status[roleName] = a[5] # accept status
-            else:
-                statusFlag = 'Appointment Error, multiple appointments to ' + roleName
-                print('Warning: multiple appointments to ' + roleName + '. FixtureID: ' + fixID + '. See: https://schedula.mygameday.app/index.php?action=admin/appointments/appoint_match&fixtureid=' + fixID)
-
-        # convert date to somthing nicer (before: Sat Jun 27) (after: 27-Jun-2020)
-        dateStrs = fix[7].split(' ')
-        yearStr = fix[3]
-        niceDate = dateStrs[2] + '-' + dateStrs[1] + '-' + yearStr
-
-        # create the row of data
-        output.append([fixID,fix[0],fix[1],fix[2],fix[3],fix[4],fix[5],fix[6],niceDate,dateStrs[0],fix[8],fix[9],fix[10],fix[11],roles['R'],roles['AR1'],roles['AR2'],roles['M'],roles['A'],roles['4'],roles['Other'],statusFlag,status['R'],status['AR1'],status['AR2'],status['M'],status['A'],status['4']])
-        
-    getFixID = lambda a : a[0]
-
-    # sort by fixtureID
-    output.sort(key=getFixID)
+    # index the appointments by fixture id
+    index = schedula.FixtureIndex(appointments=appointments)
 
-    # output to csv
+    # sort by fixtureID, each row is then written as it is made rather than building every row first
     with open(filename,"w",newline='') as file:
         writer = csv.writer(file)
-        writer.writerows([headerRow])
-        writer.writerows(output)
+        writer.writerow(CSV_HEADER)
+
+        for fix in sorted(fixtures, key=lambda f: f[12]):
+            writer.writerow(csvRow(fix, index.appointmentsFor(fix[12])))
+
+# function to write the fixtures and appointments of a pull to a csv as they are streamed (see
+# schedulaInterface.streamAppointments), the fixtures must already be sorted by fixtureID. The rows are written to
+# <filename>.part, which replaces the csv once the pull has finished. If the pull fails the rows written so far are
+# kept in <filename>.part
+#       stream       - (fixture, appointments) for each fixture
+def writeStreamToCsv(stream, filename):
+    print(' Write to csv <' + filename + '>')
+    partName = filename + '.part'
+
+    try:
+        with open(partName,"w",newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+
+            for fix, fixAppoints in stream:
+                writer.writerow(csvRow(fix, fixAppoints))
+                file.flush()
+    except BaseException:
+        print('\nPull failed, the fixtures written so far are in <' + partName + '>')
+        raise
+
+    os.replace(partName, filename)
+
+# function to write the fixtures and appointments of a pull of several seasons to a csv for each season as they are
+# streamed, see writeStreamToCsv. Each season is written to <prefix><season>.part, which replaces <prefix><season>.csv
+# once the pull has finished
+#       stream       - (fixture, appointments) for each fixture
+#
+# returns the seasons written
+def writeSeasonsToCsv(stream, prefix):
+    files = {} # season -> [filename, file, writer]
+
+    try:
+        for fix, fixAppoints in stream:
+            out = files.get(fix[3])
+            if out is None:
+                filename = prefix + fix[3] + '.csv'
+                print('\n Write to csv <' + filename + '>')
+                file = open(filename + '.part',"w",newline='')
+                out = [filename, file, csv.writer(file)]
+                out[2].writerow(CSV_HEADER)
+                files[fix[3]] = out
+
+            out[2].writerow(csvRow(fix, fixAppoints))
+            out[1].flush()
+    except BaseException:
+        print('\nPull failed, the fixtures written so far are in <' + '>, <'.join(out[0] + '.part' for out in files.values()) + '>')
+        raise
+    finally:
+        for out in files.values():
+            out[1].close()
+
+    for out in files.values():
+        os.replace(out[0] + '.part', out[0])
+    return list(files)
+
+# returns the list of season names given by a list and/or range of seasons, e.g. '2016-2018,2020' gives
+# ['2016', '2017', '2018', '2020']. Only two years make a range, any other name is kept as it is, e.g. '2019-20'
+def parseSeasons(arg):
+    seasons = []
+    for part in arg.split(','):
+        part = part.strip()
+        m = re.match(r'^([0-9]{4})-([0-9]{4})$', part)
+        if (m is not None) and (int(m.group(1)) <= int(m.group(2))):
+            for year in range(int(m.group(1)), int(m.group(2)) + 1):
+                seasons.append(str(year))
+        elif part != '':
+            seasons.append(part)
+
+    if len(seasons) == 0:
+        raise ValueError(arg)
+    return seasons
+
+# function to make the csv row of a fixture and its appointments
+def csvRow(fix, fixAppoints):
+    fixID = fix[12]
+    roles = {'R':'', 'AR1':'', 'AR2':'', 'M':'', 'A':'', '4':'', 'Other':''}
+    status = {'R':'', 'AR1':'', 'AR2':'', 'M':'', 'A':'', '4':'', 'Other':''}
+    statusFlag = 'ok'
+
+    # assign roles
+    for a in fixAppoints:
+        roleName = a[3]
+
+        # match role name to one of R,AR1,AR2,M,A,R4
+        roleName = schedula.roleStringToLetter(roleName)
+
+        # fill the role
+        if roles[roleName] == '':
+            roles[roleName] = a[1] # referee name
+            status[roleName] = a[5] # accept status
+        else:
+            statusFlag = 'Appointment Error, multiple appointments to ' + roleName
+            print('Warning: multiple appointments to ' + roleName + '. FixtureID: ' + fixID + '. See: https://schedula.mygameday.app/index.php?action=admin/appointments/appoint_match&fixtureid=' + fixID)
+
+    # convert date to somthing nicer (before: Sat Jun 27) (after: 27-Jun-2020)
+    dateStrs = fix[7].split(' ')
+    yearStr = fix[3]
+    niceDate = dateStrs[2] + '-' + dateStrs[1] + '-' + yearStr
+
+    return [fixID,fix[0],fix[1],fix[2],fix[3],fix[4],fix[5],fix[6],niceDate,dateStrs[0],fix[8],fix[9],fix[10],fix[11],roles['R'],roles['AR1'],roles['AR2'],roles['M'],roles['A'],roles['4'],roles['Other'],statusFlag,status['R'],status['AR1'],status['AR2'],status['M'],status['A'],status['4']]
 
 # entry point, parse commandline arguments and call appropriate method
-def main(argv):
+#
+# session       - logged in session to use instead of logging in, e.g. when run by the service
+# cache         - cache to use instead of loading one, e.g. when run by the service
+# login         - [username, proxy] the session was logged in with, commands for another user or proxy are refused
+def main(argv, session=None, cache=None, login=None):
     # parameters
     command = ''
     filename = ''
@@ -252,11 +491,25 @@ def main(argv):
     numDaysToPull = 28
     startDate = date.today()
     useProxy = False
+    proxy = ''
     proxyDict = {}
+    workers = schedula.DEFAULT_WORKERS
+    cacheFile = defaultCacheFile()
+    refresh = False
+    incremental = False
+    rulesFile = ''
+    dryRun = False
+    port = 0
+    recordFile = ''
+    replayFile = ''
+    traceFile = ''
+    sessionFile = defaultSessionFile()
+    forceLogin = False
+    storeFile = ''
 
     # get commandline options
     try:
-        opts, args = getopt.gnu_getopt(argv,"f:s:u:p:i:x:n:o:N:rh")
+        opts, args = getopt.gnu_getopt(argv,"f:s:u:p:i:x:n:o:N:j:c:rh", ['refresh', 'incremental', 'rules=', 'dry-run', 'port=', 'login', 'startup-times', 'record=', 'replay=', 'trace=', 'db='])
     except getopt.GetoptError as err:
         print(str(err))
         usage()
@@ -268,7 +521,7 @@ def main(argv):
         sys.exit(2)
     else:
         command = args[0]
-        if command not in ['pullAll', 'pullN', 'push', 'pullP', 'help']:
+        if command not in ['pullAll', 'pullN', 'push', 'pullP', 'export', 'plan', 'serve', 'help']:
             print('Unknown command: ' + command)
             sys.exit(2)
         
@@ -290,12 +543,13 @@ def main(argv):
         elif opt == '-p':
             password = arg
         elif opt == '-i':
-            if command != 'push':
-                print("-i can only be used with command \"push\"")
+            if command not in ['push', 'plan']:
+                print("-i can only be used with commands \"push\" or \"plan\"")
                 sys.exit(2)
             pushFile = arg
         elif opt == '-x':
             useProxy = True
+            proxy = arg
             httpProxy = "http:" + arg
             httpsProxy = "https://" + arg
             proxyDict = {"http":httpProxy, "https":httpsProxy}
@@ -319,37 +573,195 @@ def main(argv):
                 print('-N, format must be yyyy-mm-dd')
                 sys.exit(2)
         elif opt == '-o':
-            if command not in ['pullP', 'push', 'pullAll']:
-                print("-o can only be used with commands \"pullN\", \"push\" or \"pullAll\"")
+            if command not in ['pullP', 'push', 'plan', 'pullAll']:
+                print("-o can only be used with commands \"pullP\", \"push\", \"plan\" or \"pullAll\"")
                 sys.exit(2)
             peopleFile = arg
             peopleFlag = True
+        elif opt == '-j':
+            if command not in ['pullAll', 'pullN', 'pullP', 'export', 'push']:
+                print("-j can only be used with commands \"pullAll\", \"pullN\", \"pullP\", \"export\" or \"push\"")
+                sys.exit(2)
+            try:
+                workers = int(arg)
+            except:
+                print('-j must specify an integer number of requests (e.g. -j8)')
+                sys.exit(2)
+            if workers < 1:
+                print('-j must be at least 1')
+                sys.exit(2)
+        elif opt == '-c':
+            cacheFile = arg
+        elif opt in ['-r', '--refresh']:
+            refresh = True
+        elif opt == '--incremental':
+            if command not in ['pullAll', 'pullN']:
+                print("--incremental can only be used with commands \"pullAll\" or \"pullN\"")
+                sys.exit(2)
+            incremental = True
+        elif opt == '--rules':
+            rulesFile = arg
+        elif opt == '--dry-run':
+            if command != 'push':
+                print("--dry-run can only be used with command \"push\"")
+                sys.exit(2)
+            dryRun = True
+        elif opt == '--port':
+            if command != 'serve':
+                print("--port can only be used with command \"serve\"")
+                sys.exit(2)
+            try:
+                port = int(arg)
+            except:
+                print('--port must specify an integer port number (e.g. --port 8765)')
+                sys.exit(2)
+        elif opt == '--login':
+            forceLogin = True
+        elif opt == '--trace':
+            traceFile = arg
+        elif opt == '--record':
+            recordFile = arg
+        elif opt == '--replay':
+            if command not in ['pullAll', 'pullN', 'pullP', 'export']:
+                print("--replay can only be used with commands \"pullAll\", \"pullN\", \"pullP\" or \"export\"")
+                sys.exit(2)
+            replayFile = arg
+        elif opt == '--db':
+            if command not in ['pullAll', 'pullN', 'pullP', 'export']:
+                print("--db can only be used with commands \"pullAll\", \"pullN\", \"pullP\" or \"export\"")
+                sys.exit(2)
+            storeFile = arg
+        elif opt == '--startup-times':
+            # already turned on before the imports, see startup
+            pass
+
+    # incremental pulls merge into the csv
+    if incremental and filename == '':
+        print('--incremental requires a file given by -f')
+        sys.exit(2)
 
-    # get schedula login details
-    if username == '':
-        print('Enter schedula login details')
-        username = input('Email:')
-    if password == '':
-        password = getpass.getpass('Password:')
+    # export takes a list and/or range of seasons
+    seasons = []
+    if command == 'export':
+        try:
+            seasons = parseSeasons(season)
+        except ValueError:
+            print('export requires the seasons given by -s, as a list and/or range (e.g. 2016-2020 or 2018,2020)')
+            sys.exit(2)
+    startup.mark('options')
+
+    # load the competition and role rules, the defaults are used if there is no rules file
+    if (rulesFile == '') and os.path.isfile(defaultRulesFile()):
+        rulesFile = defaultRulesFile()
+    if rulesFile != '':
+        print('Rules: ' + rulesFile)
+        schedula.setClassifier(schedulaClassify.loadRules(rulesFile))
+    startup.mark('rules')
+
+    # plans are worked out offline, no need to login
+    if (command == 'plan') or dryRun:
+        if (filename == '') or (pushFile == ''):
+            print('plan requires the files given by -f and -i')
+            sys.exit(2)
+        plan(filename, pushFile, peopleFile)
+        startup.mark('plan')
+        return
+
+    # replays are answered from the archive, no need to login
+    if replayFile != '':
+        session = schedulaRecord.ReplaySession(replayFile, schedula.SCHEDULA_BASE_URL)
+
+    # the service's session is for one user through one proxy, it cannot run a command as another
+    if (login is not None) and (replayFile == ''):
+        if (username != '') and (username != login[0]):
+            print('The schedula service is logged in as ' + login[0] + ', not ' + username + '. Stop the service to run commands as another user')
+            sys.exit(2)
+        if useProxy and (proxy != login[1]):
+            print('The schedula service uses ' + (('proxy ' + login[1]) if login[1] != '' else 'no proxy') + ', not proxy ' + proxy + '. Stop the service to run commands through another proxy')
+            sys.exit(2)
 
-    # login to schedula
-    session = schedula.getSession(username, password, useProxy, proxyDict)
+    # get schedula login details, the password is not needed if there is a saved session for the user
+    if session is None:
+        if username == '':
+            print('Enter schedula login details')
+            username = input('Email:')
+        if forceLogin:
+            schedula.clearSessionCookies(sessionFile, username)
+        if (password == '') and not schedula.hasSessionCookies(sessionFile, username):
+            password = getpass.getpass('Password:')
+    startup.mark('login details')
+
+    # load the cache, entries are kept per user as each user can see different organisations. Recordings must have
+    # every request the command makes, so nothing is cached while recording or replaying.
+    if (recordFile != '') or (replayFile != ''):
+        cache = schedulaCache.MetadataCache(cacheFile, namespace=username, ttl={})
+    elif cache is None:
+        cache = schedulaCache.MetadataCache(cacheFile, namespace=username, refresh=refresh)
+    elif refresh:
+        cache.invalidate()
+    schedula.setCache(cache)
+    startup.mark('cache')
+
+    # time each request, the summary is printed at the end
+    tracer = schedulaTrace.Tracer(traceFile)
+    schedula.setTracer(tracer)
+
+    # login to schedula, with a connection for each concurrent request
+    if session is None:
+        session = schedula.getSession(username, password, useProxy, proxyDict, poolSize=workers, sessionFile=sessionFile)
+    if recordFile != '':
+        session = schedulaRecord.RecordingSession(session, recordFile, schedula.SCHEDULA_BASE_URL)
+    startup.mark('login')
+
+    # open the store, sqlite is only loaded when it is used
+    store = None
+    if storeFile != '':
+        import schedulaStore
+        store = schedulaStore.Store(storeFile)
 
     # process the command
-    if command == 'pullAll':
-        pullAll(session, filename, season, useProxy, proxyDict)
-        if peopleFlag:
-            pullP(session, season, peopleFile, useProxy, proxyDict)
-    elif command == 'pullN':
-        pullN(session, filename, season, startDate, numDaysToPull, useProxy, proxyDict)
-    elif command == 'push':
-        push(session, filename, pushFile, peopleFile, useProxy, proxyDict)
-        i = input("Press enter to exit")
-    elif command == 'pullP':
-        pullP(session, season, peopleFile, useProxy, proxyDict)
+    try:
+        if command == 'serve':
+            import schedulaClient
+            import schedulaService
+            # the service's console is not the client's, never wait there for a password
+            schedula.setInteractive(False)
+            schedulaService.serve(lambda args: main(args, session, cache, [username, proxy]), schedulaClient.defaultServiceFile(), port)
+        elif command == 'pullAll':
+            pullAll(session, filename, season, useProxy, proxyDict, workers, incremental, store)
+            if peopleFlag:
+                pullP(session, season, peopleFile, useProxy, proxyDict, workers, store)
+        elif command == 'export':
+            export(session, filename, seasons, useProxy, proxyDict, workers, store)
+        elif command == 'pullN':
+            pullN(session, filename, season, startDate, numDaysToPull, useProxy, proxyDict, workers, incremental, store)
+        elif command == 'push':
+            push(session, filename, pushFile, peopleFile, useProxy, proxyDict, workers)
+            i = input("Press enter to exit")
+        elif command == 'pullP':
+            pullP(session, season, peopleFile, useProxy, proxyDict, workers, store)
+
+    # keep whatever was fetched, even if the command failed part way
+    finally:
+        if store is not None:
+            store.close()
+        print(tracer.summaryTable())
+        tracer.close()
+        print(cache.summary())
+        cache.save()
+        schedula.saveSessionCookies(session)
+        if recordFile != '':
+            session.closeArchive()
+        startup.mark(command)
 
 
 if __name__ == '__main__':
+    # send the command to the service if it is running, e.g. when run by the workbook
+    import schedulaClient
+    code = schedulaClient.runRemote(sys.argv[1:], schedulaClient.defaultServiceFile())
+    if code is not None:
+        sys.exit(code)
+
     try:
         main(sys.argv[1:])
     except:
@@ -362,4 +774,7 @@ if __name__ == '__main__':
             i = input("Press enter to exit")
 
         finally:
-            del exc_info
\ No newline at end of file
+            del exc_info
+
+    finally:
+        startup.report()
@@ -0,0 +1,355 @@
+# schedulaParser.py extracts data from the html and xajax responses returned by https://schedula.sportstg.com/
+#
+# Each parser makes a single pass over the response with precompiled patterns, only looking at the tags it needs.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import re
+
+################################################################################
+#########################           PATTERNS           #########################
+################################################################################
+# <option value="664">AHJSA - first quoted attribute and the text after the tag
+OPTION = re.compile(r'<option[^">]*"([^"]*)"[^<>]*>([^<>]*)')
+
+# <option value="3033">2020</option>
+CLOSED_OPTION = re.compile(r'<option[^">]*"([^"]*)"[^<>]*>([^<]*)</option>')
+
+# options in the panel and appointment type forms - value and text
+FORM_OPTION = re.compile(r'<option[^<>]*?alue="([^"]*)"[^<>]*>([^<>]*)')
+
+# tags of interest in the fixtures table - (tag, text after the tag, fixture id)
+#   <th colspan=...>competition name
+#   <td ...>cell data
+#   <u style=... fixtureid=...
+FIXTURE_TAG = re.compile(r'<(th colspan=[^<>]*>|td[^<>]*>|u style=[^<]*?fixtureid=)(?:(?<=>)([^<>]*)|([^&<]*))')
+
+# tags of interest in the appointments table, each alternative consumes the rest of the tag
+#   1 - end of a table
+#   2 - start of a table
+#   3 - start of a row
+#   4 - official's name
+#   5 - appointment type option
+#   6 - appointment select
+#   7 - acceptance status image
+APPOINTMENT_TAG = re.compile(r'<(?:(/table)[^<]*|(table)[^<]*|(tr)[^<]*|td>([^<>]*)[^<]*|(option value=[^<]*)|select([^<]*)|img src([^<]*))')
+
+LOGIN_REDIRECT = re.compile(r'CDATA[^"]*"([^"]*)"')
+
+# the button of the login form, schedula answers with the login form once the session has expired. Only the input
+# element is matched so a page that just mentions btnlogin (e.g. in a script) is not taken for the login form
+LOGGED_OUT = re.compile(r'<input[^>]*\bname=["\']?btnlogin\b')
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# Response wraps a requests response. The text and each parsed view are only worked out the first time they are
+# used and then kept, so a response is never parsed for data that is not needed or parsed twice for the same data.
+# Anything else (status_code, cookies, ...) is read from the wrapped response.
+#
+# The parsed views are shared by every caller, copy them before making changes.
+class Response:
+    def __init__(self, response):
+        self.response = response
+        self.views = {}
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    # returns the stored view, parsing it on first use
+    def view(self, key, parse, *args):
+        if key not in self.views:
+            self.views[key] = parse(*args)
+        return self.views[key]
+
+    @property
+    def text(self):
+        return self.view('text', getattr, self.response, 'text')
+
+    # true if schedula answered with the login page instead of the page asked for
+    @property
+    def loggedOut(self):
+        return self.view('loggedOut', isLoggedOut, self.text)
+
+    # referees in a ChangePanel (or similar) response - [[name, appointID, personID]]
+    @property
+    def referees(self):
+        return self.view('referees', parseReferees, self.text)
+
+    # panels in an appoint match page - [[value, string]]
+    @property
+    def panels(self):
+        return self.view('panels', parseOptions, self.text, 'panels_form')
+
+    # appointment types in an appoint match page - [[value, string]]
+    @property
+    def appointTypes(self):
+        return self.view('appointTypes', parseOptions, self.text, 'appointment_type_form')
+
+    # appointments in an appoint match page, see parseAppointments
+    def appointments(self, fixtureID):
+        return self.view('appointments ' + fixtureID, parseAppointments, self.text, fixtureID)
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# returns the text between start and the next end, or to the end of the text if end is not found
+def between(text, start, end, offset=0):
+    i = text.find(start, offset)
+    if i < 0:
+        return None
+    i = i + len(start)
+    j = text.find(end, i)
+    if j < 0:
+        return text[i:]
+    return text[i:j]
+
+# parseOrganisations returns the organisations in the appoint by week page - [[orgID, orgName]]
+def parseOrganisations(text):
+    start = text.find('<form name="search_fixture">')
+    if start < 0:
+        raise Exception('Organisations not found in page')
+
+    # the organisations are the options up to the end of the first select
+    end = text.find('</select', start)
+    if end < 0:
+        end = len(text)
+
+    organisations = []
+    for orgNum, orgName in OPTION.findall(text, start, end):
+        # Remove blank option
+        if orgNum != '':
+            organisations.append([orgNum, orgName])
+
+    return organisations
+
+# parseSeasons returns the seasons in a GetSeasons response - [[seasonID, seasonName]]
+def parseSeasons(text):
+    # the list ends at the end of the CDATA section
+    end = text.find(']]', text.find('</option>'))
+    if end < 0:
+        end = len(text)
+
+    # ignore the first one, it is the blank option
+    return [[seasonID, seasonName] for seasonID, seasonName in CLOSED_OPTION.findall(text, 0, end)[1:]]
+
+# parseSeasonWeeks returns the weeks in a GetSeasonWeeks response - [[weekID, weekName]]
+def parseSeasonWeeks(text):
+    end = text.find('</select')
+    if end < 0:
+        end = len(text)
+
+    return [[weekID, weekName] for weekID, weekName in OPTION.findall(text, 0, end)]
+
+# parseFixtures returns the fixtures in a ShowFixturesForWeek response - [[compName, date, time, home, away, ground, fixID]]
+def parseFixtures(text):
+    # only the first table
+    end = text.find('</table>')
+    if end < 0:
+        end = len(text)
+
+    fixtures = []
+    fixture = ['', '', '', '', '', '', '']
+    field = 1 # next field to fill
+    for tag, rowData, fixtureID in FIXTURE_TAG.findall(text, 0, end):
+        kind = tag[1]
+
+        # Check for data, fill the next field (date, time, home, away, ground)
+        if kind == 'd':
+            if (field < 6) and (rowData != '') and (rowData != 'v') and (rowData != '&nbsp;'):
+                fixture[field] = rowData
+                field = field + 1
+
+        # Check for fixture ID, this completes the fixture
+        elif kind == ' ':
+            fixture[6] = fixtureID
+            fixtures.append(fixture)
+            fixture = [fixture[0], '', '', '', '', '', '']
+            field = 1
+
+        # check for new competition
+        else:
+            fixture = [rowData, '', '', '', '', '', '']
+            field = 1
+
+    return fixtures
+
+# parseAppointments returns the appointments in the first table of an appoint match page
+#
+# text          - page text
+# fixtureID     - id of the fixture, added to the start of each appointment
+#
+# Returns a list of appointments - ['fixtureid','officialName','appointID','selectedRole','selectedRoleID','acceptStatus']
+def parseAppointments(text, fixtureID):
+    appointments = []
+    tableStart = False
+
+    # ['officialName','officialID','selectedRole','selectedRoleID','acceptStatus']
+    appointment = ['', '', '', '', '']
+
+    for m in APPOINTMENT_TAG.finditer(text):
+        tag = m.lastindex
+
+        # check for end of table
+        if tag == 1:
+            break
+
+        # check for start of table
+        if tag == 2:
+            tableStart = True
+            continue
+
+        if not tableStart:
+            continue
+
+        # check for new row
+        if tag == 3:
+            appointment = ['', '', '', '', '']
+            continue
+
+        # check for name
+        if tag == 4:
+            if appointment[0] == '':
+                appointment[0] = m.group(4)
+
+        # record appointment type
+        elif tag == 5:
+            t = m.group(5)
+            words = t.split(' ')
+            if (len(words) > 2) and words[2].startswith('selected'):
+                if '>' in t:
+                    appointment[2] = t.split('>')[1]
+                    quoted = t.split('"')
+                    if len(quoted) > 1:
+                        appointment[3] = quoted[1]
+
+        # record official ID
+        elif tag == 6:
+            officialID = between(m.group(6), 'xajax_AppointUmpire(', ',')
+            if officialID is not None:
+                appointment[1] = officialID
+
+        # record acceptance status
+        else:
+            parts = m.group(7).split('/')
+            if len(parts) > 4:
+                appointment[4] = parts[4].split('_')[0]
+            else:
+                appointment[4] = '?'
+
+        # check for data complete. The record is added at the next tag, unless that tag ends the table or starts a new row
+        if (appointment[0] != '') and (appointment[1] != '') and (appointment[2] != '') and (appointment[3] != '') and (appointment[4] != ''):
+            nextTag = m.end() + 1
+            if (m.end() < len(text)) and not (text.startswith('/table', nextTag) or text.startswith('tr', nextTag)):
+                appointments.append([fixtureID] + appointment)
+                appointment = ['', '', '', '', '']
+
+    return appointments
+
+# parseOptions returns the options in the first select of the named form - [[value, string]]
+# e.g. the panels ('panels_form') or appointment types ('appointment_type_form') of an appoint match page
+def parseOptions(text, formName):
+    start = text.find('<form name="' + formName + '">')
+    if start < 0:
+        raise Exception('Form ' + formName + ' not found in page')
+
+    # options end at the end of the select
+    end = text.find('</select>', start)
+    if end < 0:
+        end = len(text)
+
+    return [[value, string] for value, string in FORM_OPTION.findall(text, start, end)]
+
+# parseReferees returns the referees in a ChangePanel (or similar) response - [[name, appointID, personID]]
+#
+# The first table lists each referee's name, appointment id and person id. Referees already appointed are listed
+# again in a second table (after '<![CDATA[S<table>') with the appointment id to use for them.
+def parseReferees(text):
+    referees = []
+    name = None
+    appointID = None
+    table2 = False
+
+    for t in text.split('<td>'):
+        if table2:
+            # check for removed
+            if ('value="Removed"' in t) or ('<img src' in t):
+                continue
+
+            if t.count('</td') == 1:
+                name = t[:t.find('</td')]
+            else:
+                newID = between(t, 'AppointUmpire(', ',')
+                if newID is None:
+                    continue
+
+                # update
+                for r in referees:
+                    if r[0] == name:
+                        r[1] = newID
+                        name = ''
+                        appointID = ''
+                        break
+
+        else:
+            # name and appointment id
+            found = False
+            i = t.find('<b>')
+            if i >= 0:
+                j = t.find('</b>', i)
+                name = t[i+3:j] if j >= 0 else t[i+3:]
+                i = t.find('AppointUmpire(')
+                if i >= 0:
+                    j = t.find(',', i)
+                    appointID = t[i+14:j] if j >= 0 else t[i+14:]
+                    found = True
+
+            # person id, this completes the referee
+            if not found:
+                i = t.find('personid=')
+                if (i >= 0) and (name is not None) and (appointID is not None):
+                    j = t.find('&', i)
+                    referees.append([name, appointID, t[i+9:j] if j >= 0 else t[i+9:]])
+                    # clear fileds, this prevents duplicates
+                    appointID = ''
+                    name = ''
+
+            # check for end of table, start of new one
+            if '<![CDATA[S<table>' in t:
+                table2 = True
+
+    return referees
+
+# isLoggedOut returns true if the response is the login page
+def isLoggedOut(text):
+    # most pages do not mention it at all, skip the regular expression for them
+    return ('btnlogin' in text) and (LOGGED_OUT.search(text) is not None)
+
+# parseLoginRedirect returns the page a dologin response redirects to
+def parseLoginRedirect(text):
+    m = LOGIN_REDIRECT.search(text)
+    if m is None:
+        return ''
+    return m.group(1)
@@ -0,0 +1,160 @@
+# schedulaRecord.py records the requests made to schedula and their responses in an archive, and replays them
+#
+# A recorded pull can be run again from the archive without connecting to schedula, e.g. to try different rules or
+# output formats on a whole season, or to profile the parsers on the same data each time.
+#
+# The archive is a gzipped json lines file. The first line is a header, each other line is a request and its response
+# {"m":method, "u":url, "d":post data, "s":status code, "t":text}. Urls are stored without the schedula address. Login
+# requests are never recorded, so the archive holds no password.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import re
+import json
+import gzip
+import threading
+
+ARCHIVE_VERSION = 1
+
+# the xajax request time, it is different for every request so it is left out when matching requests
+XJXR = re.compile(r'xjxr=[0-9]*&?')
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# RecordingSession passes each get and post on to a session and writes the request and response to the archive.
+# Everything else (cookies, schedulaLogin, ...) is the session's.
+#
+# session       - session to record, e.g. from schedulaInterface.getSession
+# filename      - archive to write, it is replaced
+# baseUrl       - schedula address, left out of the recorded urls
+class RecordingSession:
+    def __init__(self, session, filename, baseUrl):
+        self.session = session
+        self.baseUrl = baseUrl
+        self.recorded = 0
+        self.archiveLock = threading.Lock()
+        self.archive = gzip.open(filename, mode='wt', encoding='utf-8')
+        self.archive.write(json.dumps({'version':ARCHIVE_VERSION}) + '\n')
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, **kwargs):
+        r = self.session.get(url, **kwargs)
+        self.record('GET', url, '', r)
+        return r
+
+    def post(self, url, data=None, **kwargs):
+        r = self.session.post(url, data=data, **kwargs)
+        self.record('POST', url, data or '', r)
+        return r
+
+    def record(self, method, url, data, r):
+        if isLogin(data):
+            return
+        line = json.dumps({'m':method, 'u':relativeUrl(url, self.baseUrl), 'd':data, 's':r.status_code, 't':r.text})
+        with self.archiveLock:
+            self.archive.write(line + '\n')
+            self.recorded = self.recorded + 1
+
+    # finishes the archive, the session stays open
+    def closeArchive(self):
+        with self.archiveLock:
+            self.archive.close()
+        print('Recorded ' + str(self.recorded) + ' requests')
+
+# ReplaySession answers gets and posts from an archive in place of schedula. A request made more than once gets the
+# recorded responses in order, then the last one again. A request that is not in the archive raises an error.
+#
+# filename      - archive to read
+# baseUrl       - schedula address, left out of the urls when looking up requests
+class ReplaySession:
+    def __init__(self, filename, baseUrl):
+        self.baseUrl = baseUrl
+        self.lock = threading.Lock()
+        self.responses = {} # key -> [ReplayResponse]
+        self.served = 0
+
+        with gzip.open(filename, mode='rt', encoding='utf-8') as archive:
+            header = json.loads(archive.readline())
+            if header.get('version') != ARCHIVE_VERSION:
+                raise Exception('Unknown archive version in ' + filename)
+            for line in archive:
+                entry = json.loads(line)
+                self.responses.setdefault(requestKey(entry['m'], entry['u'], entry['d']), []).append(ReplayResponse(entry['s'], entry['t']))
+        print('Replaying ' + str(sum(len(r) for r in self.responses.values())) + ' requests from ' + filename)
+
+    def get(self, url, **kwargs):
+        return self.replay('GET', url, '')
+
+    def post(self, url, data=None, **kwargs):
+        return self.replay('POST', url, data or '')
+
+    def replay(self, method, url, data):
+        key = requestKey(method, relativeUrl(url, self.baseUrl), data)
+        with self.lock:
+            responses = self.responses.get(key)
+            if not responses:
+                raise Exception('Request not in archive: ' + key)
+            self.served = self.served + 1
+            if len(responses) > 1:
+                return responses.pop(0)
+            return responses[0]
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+# ReplayResponse is a recorded response, it has the parts of a requests response that are used
+class ReplayResponse:
+    def __init__(self, status, text):
+        self.status_code = status
+        self.text = text
+        self.headers = {}
+        self.cookies = {}
+
+    @property
+    def content(self):
+        return self.text.encode('utf-8')
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# returns the key a request is recorded and looked up by
+def requestKey(method, url, data):
+    return method + ' ' + url + ' ' + XJXR.sub('', data)
+
+# returns the url without the schedula address
+def relativeUrl(url, baseUrl):
+    if url.startswith(baseUrl):
+        return url[len(baseUrl):]
+    return url
+
+# returns true for the login request, it has the password
+def isLogin(data):
+    return 'xjxfun=dologin' in data
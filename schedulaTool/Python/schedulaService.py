@@ -0,0 +1,188 @@
+# schedulaService.py runs the schedula tool as a background service, so one logged in session and its caches are
+# kept between commands. Commands are sent by schedulaClient.py over a local socket, see there for the messages.
+#
+# Only connections from this computer are accepted and each must give the token the service writes to its service
+# file, which only the user running the service can read.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import sys
+import os
+import json
+import socket
+import secrets
+import hmac
+import builtins
+import threading
+import traceback
+from schedulaClient import send
+from schedulaClient import receive
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# RemoteOutput replaces sys.stdout or sys.stderr while a command runs, sending what is written to the client
+#
+# stream        - file made by socket.makefile for the client connection
+# kind          - 'out' or 'err'
+# lock          - lock shared by everything sending to the client
+class RemoteOutput:
+    def __init__(self, stream, kind, lock):
+        self.stream = stream
+        self.kind = kind
+        self.lock = lock
+
+    def write(self, text):
+        if text:
+            with self.lock:
+                send(self.stream, {self.kind:text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# serve runs the service until a client sends stop. Commands are run one at a time in the order they arrive.
+#
+# run           - function taking the command line arguments of a command and running it with the logged in session
+# serviceFile   - file to write the port and token to, it is removed when the service stops
+# port          - port to listen on, 0 picks a free port
+def serve(run, serviceFile, port=0):
+    token = secrets.token_hex(16)
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', port))
+    listener.listen(5)
+    port = listener.getsockname()[1]
+
+    writeServiceFile(serviceFile, port, token)
+    print('Schedula service listening on port ' + str(port) + ', stop it with: schedulaClient.py stop')
+
+    try:
+        while True:
+            connection, address = listener.accept()
+            try:
+                if not handle(connection, token, run):
+                    break
+            except (OSError, ValueError) as err:
+                print('Client connection lost: ' + str(err))
+            finally:
+                connection.close()
+    finally:
+        listener.close()
+        try:
+            os.remove(serviceFile)
+        except OSError:
+            pass
+        print('Schedula service stopped')
+
+# handle runs the command sent on a connection, returns false if the service should stop
+def handle(connection, token, run):
+    stream = connection.makefile(mode='rw', encoding='utf-8', newline='\n')
+    request = receive(stream)
+    if request is None:
+        return True
+
+    if not hmac.compare_digest(str(request.get('token', '')), token):
+        send(stream, {'err':'Not authorised\n'})
+        send(stream, {'exit':2})
+        return True
+
+    argv = [str(a) for a in request.get('argv', [])]
+    if argv[:1] == ['stop']:
+        send(stream, {'out':'Schedula service stopping\n'})
+        send(stream, {'exit':0})
+        return False
+
+    if argv[:1] == ['serve']:
+        send(stream, {'err':'The schedula service is already running\n'})
+        send(stream, {'exit':2})
+        return True
+
+    # log the command, options are left out as they can include a password
+    print('Running: ' + ' '.join(argv[:1]))
+    code = runCommand(stream, run, argv, request.get('cwd'))
+    print(' exit code: ' + str(code))
+
+    send(stream, {'exit':code})
+    return True
+
+# runCommand runs a command with its output, errors and prompts sent to the client and returns its exit code
+#
+# cwd           - directory the client was run from, relative file names are relative to it
+def runCommand(stream, run, argv, cwd):
+    lock = threading.Lock()
+
+    # prompts are answered by the client
+    def remoteInput(prompt=''):
+        sys.stdout.flush()
+        with lock:
+            send(stream, {'input':str(prompt)})
+        message = receive(stream)
+        if message is None:
+            raise EOFError('Client disconnected')
+        return message.get('input', '')
+
+    stdout = sys.stdout
+    stderr = sys.stderr
+    localInput = builtins.input
+    directory = os.getcwd()
+
+    sys.stdout = RemoteOutput(stream, 'out', lock)
+    sys.stderr = RemoteOutput(stream, 'err', lock)
+    builtins.input = remoteInput
+    try:
+        if cwd:
+            os.chdir(cwd)
+        run(argv)
+        code = 0
+    except SystemExit as err:
+        if err.code is None:
+            code = 0
+        elif isinstance(err.code, int):
+            code = err.code
+        else:
+            print(err.code)
+            code = 1
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+        builtins.input = localInput
+        os.chdir(directory)
+
+    return code
+
+# writes the port and token to the service file, readable only by the current user
+def writeServiceFile(filename, port, token):
+    if os.path.exists(filename):
+        os.remove(filename)
+    handle = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(handle, mode='w') as file:
+        json.dump({'port':port, 'token':token, 'pid':os.getpid()}, file)
@@ -0,0 +1,106 @@
+# schedulaStartup.py measures where the start up time of the command line tool goes - the time taken by each import
+# and by each phase of main (reading options, loading the rules and cache, login, ...)
+#
+# Turned on with the --startup-times option or the SCHEDULA_STARTUP_TIMES environment variable. It works in the
+# packaged exe, where python -X importtime is not available.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports, only small modules that are already loaded by python itself
+import sys
+import os
+import time
+import builtins
+
+# imports nested deeper than this are included in the time of the import above them but not listed
+REPORT_DEPTH = 2
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# StartupTimer records the time of each new import and of each phase of start up
+#
+# enabled       - if false nothing is recorded and report prints nothing
+class StartupTimer:
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []    # [[name, seconds]]
+        self.imports = []   # [[name, seconds, depth]] in the order the imports started
+        self.depth = 0
+
+        if enabled:
+            self.original = builtins.__import__
+            builtins.__import__ = self.timedImport
+
+    # builtins.__import__ replacement, times the first import of each module including the modules it imports
+    def timedImport(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if (level != 0) or (name in sys.modules):
+            return self.original(name, globals, locals, fromlist, level)
+
+        record = [name, 0, self.depth]
+        self.imports.append(record)
+        self.depth = self.depth + 1
+        start = time.perf_counter()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            record[1] = time.perf_counter() - start
+            self.depth = self.depth - 1
+
+    # ends the current phase, it is recorded with the given name and the next phase starts now
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append([name, now - self.last])
+        self.last = now
+
+    # prints the import and phase times
+    def report(self):
+        if not self.enabled:
+            return
+        builtins.__import__ = self.original
+
+        print('\nStart up times (ms)')
+        print(' Imports:')
+        for name, seconds, depth in self.imports:
+            if depth < REPORT_DEPTH:
+                print('  ' + formatMs(seconds) + '  ' + '  '*depth + name)
+        print(' Phases:')
+        for name, seconds in self.phases:
+            print('  ' + formatMs(seconds) + '  ' + name)
+        print('  ' + formatMs(time.perf_counter() - self.start) + '  total')
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# returns true if the start up times were asked for by the command line or environment
+def requested(argv):
+    return ('--startup-times' in argv) or (os.environ.get('SCHEDULA_STARTUP_TIMES', '') not in ['', '0'])
+
+# returns seconds as milliseconds right aligned in 8 characters
+def formatMs(seconds):
+    return str(round(seconds*1000, 1)).rjust(8)
@@ -0,0 +1,182 @@
+# schedulaStore.py keeps pulled seasons, fixtures, appointments and officials in an indexed sqlite database
+#
+# The pull commands write to the store when given --db, as well as or instead of the csv. Each pull replaces what it
+# fetched and leaves everything else, so a store built up over several seasons can answer historical queries (e.g.
+# every fixture an official did in 2019) without pulling from schedula or reading whole csv's.
+#
+# Tables:
+#       seasons      - seasonID, orgID, orgName, seasonName
+#       fixtures     - fixtureID, seasonID, weekID, weekName, competition, date (yyyy-mm-dd), day, time, home, away, ground
+#       appointments - fixtureID, officialName, appointID, role, roleID, roleLetter (R, AR1, AR2, M, A, 4 or Other), status
+#       officials    - personID, name, panels (; separated)
+#
+# The view fixtureRows has a row for each fixture with the column names of the csv written by pullAll, but it is not the
+# same as the csv. Date is yyyy-mm-dd rather than d-Mon-yyyy, Status only says whether a role has more than one
+# appointment rather than which role, and such a role shows one of its officials rather than the first.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import sqlite3
+import schedulaInterface as schedula
+
+STORE_VERSION = 1
+
+# fixtures written between commits while a pull is streamed, a failed pull keeps what was committed
+COMMIT_EVERY = 200
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS seasons (seasonID TEXT PRIMARY KEY, orgID TEXT, orgName TEXT, seasonName TEXT)",
+    "CREATE TABLE IF NOT EXISTS fixtures (fixtureID TEXT PRIMARY KEY, seasonID TEXT, weekID TEXT, weekName TEXT, competition TEXT, date TEXT, day TEXT, time TEXT, home TEXT, away TEXT, ground TEXT)",
+    "CREATE TABLE IF NOT EXISTS appointments (fixtureID TEXT, officialName TEXT, appointID TEXT, role TEXT, roleID TEXT, roleLetter TEXT, status TEXT)",
+    "CREATE TABLE IF NOT EXISTS officials (personID TEXT PRIMARY KEY, name TEXT, panels TEXT)",
+    "CREATE INDEX IF NOT EXISTS fixturesByWeek ON fixtures (seasonID, weekID)",
+    "CREATE INDEX IF NOT EXISTS fixturesByDate ON fixtures (date)",
+    "CREATE INDEX IF NOT EXISTS fixturesByCompetition ON fixtures (competition)",
+    "CREATE INDEX IF NOT EXISTS appointmentsByFixture ON appointments (fixtureID)",
+    "CREATE INDEX IF NOT EXISTS appointmentsByOfficial ON appointments (officialName)",
+    "CREATE INDEX IF NOT EXISTS officialsByName ON officials (name)",
+    """CREATE VIEW IF NOT EXISTS fixtureRows AS
+        SELECT f.fixtureID AS FixtureID, s.orgID AS OrgID, s.orgName AS OrgName, f.seasonID AS SeasonID, s.seasonName AS SeasonName,
+            f.weekID AS WeekID, f.weekName AS WeekName, f.competition AS Competition, f.date AS Date, f.day AS day, f.time AS Time,
+            f.home AS Home, f.away AS Away, f.ground AS Ground,
+            MAX(CASE WHEN a.roleLetter = 'R' THEN a.officialName END) AS Referee,
+            MAX(CASE WHEN a.roleLetter = 'AR1' THEN a.officialName END) AS AR1,
+            MAX(CASE WHEN a.roleLetter = 'AR2' THEN a.officialName END) AS AR2,
+            MAX(CASE WHEN a.roleLetter = 'M' THEN a.officialName END) AS Mentor,
+            MAX(CASE WHEN a.roleLetter = 'A' THEN a.officialName END) AS Assessor,
+            MAX(CASE WHEN a.roleLetter = '4' THEN a.officialName END) AS "4th Official",
+            MAX(CASE WHEN a.roleLetter = 'Other' THEN a.officialName END) AS Other,
+            CASE WHEN COUNT(a.roleLetter) > COUNT(DISTINCT a.roleLetter) THEN 'Appointment Error, multiple appointments' ELSE 'ok' END AS Status,
+            MAX(CASE WHEN a.roleLetter = 'R' THEN a.status END) AS Rstatus,
+            MAX(CASE WHEN a.roleLetter = 'AR1' THEN a.status END) AS AR1status,
+            MAX(CASE WHEN a.roleLetter = 'AR2' THEN a.status END) AS AR2status,
+            MAX(CASE WHEN a.roleLetter = 'M' THEN a.status END) AS Mstatus,
+            MAX(CASE WHEN a.roleLetter = 'A' THEN a.status END) AS Astatus,
+            MAX(CASE WHEN a.roleLetter = '4' THEN a.status END) AS "4status"
+        FROM fixtures f
+        LEFT JOIN seasons s ON s.seasonID = f.seasonID
+        LEFT JOIN appointments a ON a.fixtureID = f.fixtureID
+        GROUP BY f.fixtureID""",
+]
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# Store is an open store database, it is created if it does not exist
+#
+# filename      - sqlite database file
+class Store:
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename, timeout=30)
+        self.seasons = set() # seasonIDs written by this store, each season row is only written once
+
+        version = None
+        try:
+            row = self.connection.execute("SELECT value FROM info WHERE key = 'version'").fetchone()
+            if row is not None:
+                version = int(row[0])
+        except sqlite3.OperationalError:
+            pass # a new database
+        if (version is not None) and (version != STORE_VERSION):
+            raise Exception('Unknown store version in ' + filename)
+
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            self.connection.execute("INSERT OR REPLACE INTO info VALUES ('version', ?)", (str(STORE_VERSION),))
+
+    # writes each fixture and its appointments as it passes through a stream of a pull, see
+    # schedulaInterface.streamAppointments. Fixtures that have gone from the weeks that were fetched are removed first.
+    #
+    # stream        - (fixture, appointments) for each fixture
+    # weeks         - the weeks that were fetched - ['OrgID','Org','SID','SName','WID','WName']
+    # rawFixtures   - every fixture found in those weeks, before any filtering
+    #
+    # yields - each (fixture, appointments) of the stream once it has been written
+    def storeStream(self, stream, weeks=[], rawFixtures=[]):
+        found = set(f[12] for f in rawFixtures if not schedula.isBlacklisted(f[6]))
+        for w in weeks:
+            ids = [row[0] for row in self.connection.execute("SELECT fixtureID FROM fixtures WHERE seasonID = ? AND weekID = ?", (w[2], w[4]))]
+            self.removeFixtures([fid for fid in ids if fid not in found])
+
+        count = 0
+        try:
+            for fixture, appointments in stream:
+                self.writeFixture(fixture, appointments)
+                count = count + 1
+                if count % COMMIT_EVERY == 0:
+                    self.connection.commit()
+                yield fixture, appointments
+        finally:
+            self.connection.commit()
+            print('\nStored ' + str(count) + ' fixtures in <' + self.filename + '>')
+
+    # writes each fixture and its appointments of a stream, see storeStream
+    def saveFixtures(self, stream):
+        for f in self.storeStream(stream):
+            pass
+
+    # writes a fixture and replaces its appointments, the caller commits
+    def writeFixture(self, fixture, appointments):
+        f = fixture
+        if f[2] not in self.seasons:
+            self.connection.execute("INSERT OR REPLACE INTO seasons VALUES (?, ?, ?, ?)", (f[2], f[0], f[1], f[3]))
+            self.seasons.add(f[2])
+
+        self.connection.execute("INSERT OR REPLACE INTO fixtures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (f[12], f[2], f[4], f[5], f[6], str(schedula.fixtureDate(f)), f[7].split(' ')[0], f[8], f[9], f[10], f[11]))
+        self.connection.execute("DELETE FROM appointments WHERE fixtureID = ?", (f[12],))
+        self.connection.executemany("INSERT INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?)", [(a[0], a[1], a[2], a[3], a[4], schedula.roleStringToLetter(a[3]), a[5]) for a in appointments])
+
+    # removes fixtures and their appointments
+    def removeFixtures(self, fixtureIDs):
+        with self.connection:
+            for fid in fixtureIDs:
+                self.connection.execute("DELETE FROM fixtures WHERE fixtureID = ?", (fid,))
+                self.connection.execute("DELETE FROM appointments WHERE fixtureID = ?", (fid,))
+
+    # writes the officials found by schedulaInterface.getOfficials, officials already in the store are replaced
+    #
+    # people        - [{'name':name, 'personID':pid, 'panels':[pannelName]}]
+    def saveOfficials(self, people):
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO officials VALUES (?, ?, ?)", [(p['personID'], p['name'], ';'.join(p['panels'])) for p in people])
+        print('Stored ' + str(len(people)) + ' officials in <' + self.filename + '>')
+
+    # returns the fixtures an official was appointed to, in date order - [[fixtureID, date, competition, home, away, ground, role, status]]
+    #
+    # officialName  - name as it appears in schedula, e.g. 'SMITH, John'
+    # seasonName    - season to look in, e.g. '2019', '' for every season
+    def officialFixtures(self, officialName, seasonName=''):
+        query = "SELECT f.fixtureID, f.date, f.competition, f.home, f.away, f.ground, a.role, a.status FROM appointments a JOIN fixtures f ON f.fixtureID = a.fixtureID JOIN seasons s ON s.seasonID = f.seasonID WHERE a.officialName = ?"
+        params = [officialName]
+        if seasonName != '':
+            query = query + " AND s.seasonName = ?"
+            params.append(seasonName)
+        return [list(row) for row in self.connection.execute(query + " ORDER BY f.date, f.time", params)]
+
+    def close(self):
+        self.connection.close()
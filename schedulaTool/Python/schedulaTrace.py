@@ -0,0 +1,153 @@
+# schedulaTrace.py records the latency, size and retries of each request made to schedula
+#
+# A summary of each endpoint (the xajax function, or the page for a GET) is printed at the end of each run. Each request
+# can also be written to a json lines trace file as it finishes:
+#
+# {"time":start (unix time), "method":"POST", "endpoint":"ChangePanel", "url":..., "status":200, "ms":83.2,
+#  "bytes":10412, "retries":0, "thread":"ThreadPoolExecutor-0_3"}
+#
+# followed by a last line {"summary":{endpoint:{"count", "p50", "p95", "p99", "bytes", "retries", "errors"}}}. Post data
+# is never written, the login request has the password.
+
+# MIT License
+#
+# Copyright (c) 2020 Ian Crossing
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# imports
+import re
+import json
+import time
+import threading
+
+# action=admin/appointments/appoint_match -> appoint_match
+ACTION = re.compile(r'action=(?:[^&]*/)?([^&/]*)')
+
+# xjxfun=ChangePanel -> ChangePanel
+XJXFUN = re.compile(r'xjxfun=([^&]*)')
+
+################################################################################
+#########################            CLASSES           #########################
+################################################################################
+# Tracer keeps the latency, size and retries of each request by endpoint
+#
+# filename      - json lines trace file to write, '' for none
+class Tracer:
+    def __init__(self, filename=''):
+        self.lock = threading.Lock()
+        self.endpoints = {} # endpoint -> {'ms':[latency], 'bytes':total, 'retries':total, 'errors':total}
+        self.file = None
+        if filename != '':
+            self.file = open(filename, mode='w')
+
+    # records a request
+    #
+    # method        - 'GET' or 'POST'
+    # url           - url of the request
+    # data          - post data, only used to find the xajax function
+    # start         - time.time() when the request was sent
+    # seconds       - time taken
+    # response      - requests response, None if the request failed
+    def record(self, method, url, data, start, seconds, response):
+        name = endpoint(url, data)
+        status = None
+        size = 0
+        retries = 0
+        if response is not None:
+            status = response.status_code
+            size = len(response.content)
+            retries = retryCount(response)
+
+        with self.lock:
+            e = self.endpoints.get(name)
+            if e is None:
+                e = {'ms':[], 'bytes':0, 'retries':0, 'errors':0}
+                self.endpoints[name] = e
+            e['ms'].append(seconds * 1000)
+            e['bytes'] = e['bytes'] + size
+            e['retries'] = e['retries'] + retries
+            if response is None:
+                e['errors'] = e['errors'] + 1
+
+            if self.file is not None:
+                self.file.write(json.dumps({'time':round(start, 3), 'method':method, 'endpoint':name, 'url':url, 'status':status, 'ms':round(seconds * 1000, 1), 'bytes':size, 'retries':retries, 'thread':threading.current_thread().name}) + '\n')
+
+    # returns the summary of each endpoint - {endpoint:{'count', 'p50', 'p95', 'p99', 'bytes', 'retries', 'errors'}}
+    def summary(self):
+        with self.lock:
+            summary = {}
+            for name in self.endpoints:
+                e = self.endpoints[name]
+                ms = sorted(e['ms'])
+                summary[name] = {'count':len(ms), 'p50':round(percentile(ms, 50), 1), 'p95':round(percentile(ms, 95), 1), 'p99':round(percentile(ms, 99), 1), 'bytes':e['bytes'], 'retries':e['retries'], 'errors':e['errors']}
+            return summary
+
+    # returns the summary as a table, the endpoints that took the most time first
+    def summaryTable(self):
+        summary = self.summary()
+        if not summary:
+            return 'Requests: none'
+
+        with self.lock:
+            totals = dict((name, sum(self.endpoints[name]['ms'])) for name in self.endpoints)
+        names = sorted(summary, key=lambda name: -totals[name])
+
+        lines = ['Requests:', ' ' + 'endpoint'.ljust(24) + 'count'.rjust(7) + 'total s'.rjust(9) + 'p50 ms'.rjust(9) + 'p95 ms'.rjust(9) + 'p99 ms'.rjust(9) + 'KB'.rjust(10) + 'retries'.rjust(8) + 'errors'.rjust(7)]
+        for name in names:
+            s = summary[name]
+            lines.append(' ' + name.ljust(24) + str(s['count']).rjust(7) + str(round(totals[name] / 1000, 1)).rjust(9) + str(round(s['p50'], 1)).rjust(9) + str(round(s['p95'], 1)).rjust(9) + str(round(s['p99'], 1)).rjust(9) + str(round(s['bytes'] / 1024, 1)).rjust(10) + str(s['retries']).rjust(8) + str(s['errors']).rjust(7))
+        return '\n'.join(lines)
+
+    # writes the summary to the trace file and closes it
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+            f = self.file
+            self.file = None
+        f.write(json.dumps({'summary':self.summary()}) + '\n')
+        f.close()
+
+################################################################################
+#########################           FUNCTIONS          #########################
+################################################################################
+# returns the endpoint name of a request - the xajax function of a post, or the page of a get
+def endpoint(url, data):
+    m = XJXFUN.search(data or '')
+    if m is None:
+        m = ACTION.search(url)
+    if m is None:
+        return 'login page'
+    return m.group(1)
+
+# returns the number of times the request was retried (see schedulaInterface.newSession)
+def retryCount(response):
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+    if retries is None:
+        return 0
+    return len(retries.history)
+
+# returns the p'th percentile of a sorted list, the nearest rank method
+def percentile(values, p):
+    if not values:
+        return 0
+    rank = max(1, int(-(-len(values) * p // 100)))
+    return values[min(rank, len(values)) - 1]
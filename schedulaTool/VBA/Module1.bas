@@ -155,12 +155,17 @@ Private Sub callSchedulaTool(command As String)
     
     ' Windows
     ' The tool is in .\schedulaTool\schedulaMain\schedulaMain.exe
+    ' Commands go through the client when it is there, it sends them to the service (schedulaMain.exe serve) if that
+    ' is running and runs them itself if not. schedulaMain.exe also sends commands to a running service.
     
     ' Mac
     ' TBA
     
     ' programName = ActiveWorkbook.path & "\schedulaTool\test\test.exe"
-    programName = ActiveWorkbook.path & "\schedulaTool\schedulaMain\schedulaMain.exe"
+    programName = ActiveWorkbook.path & "\schedulaTool\schedulaMain\schedulaClient.exe"
+    If Dir(programName) = "" Then
+        programName = ActiveWorkbook.path & "\schedulaTool\schedulaMain\schedulaMain.exe"
+    End If
     
     MsgBox programName & " " & command
     pid = Shell("""" & programName & """ " & command, vbNormalFocus)